@@ -0,0 +1,221 @@
+"""Benchmark the snapshot codec against json and orjson."""
+
+import argparse
+import dataclasses
+import json
+import random
+import timeit
+from typing import Any
+
+from systembridgemodels.modules.cpu import CPUFrequency, CPUStats, CPUTimes, PerCPU
+from systembridgemodels.modules.disks import DiskIOCounters, DiskPartition, DiskUsage
+from systembridgemodels.modules.memory import MemorySwap, MemoryVirtual
+from systembridgemodels.modules.networks import (
+    NetworkAddress,
+    NetworkConnection,
+    NetworkIO,
+    NetworkStats,
+)
+from systembridgemodels.modules.processes import Process
+
+from systembridgedata.codec import SnapshotDecoder, SnapshotEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+
+def _snapshot(rng: random.Random, args: argparse.Namespace, tick: int) -> Any:
+    """Build a realistic snapshot, drifting a little with each tick."""
+    return {
+        "cpu": {
+            "count": args.cpus,
+            "stats": CPUStats(
+                ctx_switches=10_000_000 + tick * 5000,
+                interrupts=5_000_000 + tick * 2000,
+                soft_interrupts=3_000_000 + tick * 1000,
+                syscalls=0,
+            ),
+            "per_cpu": [
+                PerCPU(
+                    id=index,
+                    frequency=CPUFrequency(current=3200.0, min=800.0, max=4800.0),
+                    times=CPUTimes(
+                        user=10_000.0 + index + tick * rng.random(),
+                        system=2_000.0 + index + tick * rng.random(),
+                        idle=90_000.0 + index + tick,
+                    ),
+                    usage=round(rng.random() * 100, 1) if rng.random() < 0.3 else 0.0,
+                )
+                for index in range(args.cpus)
+            ],
+        },
+        "memory": {
+            "virtual": MemoryVirtual(
+                total=68_719_476_736,
+                available=30_000_000_000 - tick * 4096,
+                percent=56.3,
+                used=38_000_000_000 + tick * 4096,
+                free=20_000_000_000,
+            ),
+            "swap": MemorySwap(total=0, used=0, free=0, percent=0.0, sin=0, sout=0),
+        },
+        "disks": {
+            "io_counters": {
+                f"nvme{index}n1": DiskIOCounters(
+                    read_count=1_000_000 + tick * index,
+                    write_count=2_000_000 + tick * index * 2,
+                    read_bytes=10_000_000_000 + tick * index * 4096,
+                    write_bytes=20_000_000_000 + tick * index * 8192,
+                    read_time=100_000 + tick,
+                    write_time=200_000 + tick,
+                )
+                for index in range(args.disks)
+            },
+            "partitions": [
+                DiskPartition(
+                    device=f"/dev/nvme{index}n1p1",
+                    mount_point=f"/mnt/volume{index}",
+                    filesystem_type="ext4",
+                    options="rw,relatime",
+                    max_file_size=-1,
+                    max_path_length=-1,
+                    usage=DiskUsage(
+                        total=1_000_000_000_000,
+                        used=400_000_000_000 + index,
+                        free=600_000_000_000 - index,
+                        percent=40.0,
+                    ),
+                )
+                for index in range(args.disks)
+            ],
+        },
+        "networks": {
+            "io": NetworkIO(
+                bytes_sent=10**12 + tick * 100_000,
+                bytes_recv=2 * 10**12 + tick * 200_000,
+                packets_sent=10**9 + tick * 100,
+                packets_recv=2 * 10**9 + tick * 200,
+                errin=0,
+                errout=0,
+                dropin=0,
+                dropout=0,
+            ),
+            "addresses": {
+                f"veth{index}": [
+                    NetworkAddress(
+                        address=f"10.0.{index // 256}.{index % 256}",
+                        netmask="255.255.255.0",
+                    )
+                ]
+                for index in range(args.interfaces)
+            },
+            "stats": {
+                f"veth{index}": NetworkStats(
+                    isup=True, duplex="2", speed=10000, mtu=1500, flags=["up"]
+                )
+                for index in range(args.interfaces)
+            },
+            "connections": [
+                NetworkConnection(
+                    fd=index,
+                    family=2,
+                    type=1,
+                    laddr=f"addr(ip='10.0.0.1', port={1024 + index})",
+                    raddr=f"addr(ip='10.0.1.{index % 256}', port=443)",
+                    status="ESTABLISHED",
+                    pid=1000 + index % 50,
+                )
+                for index in range(args.connections)
+            ],
+        },
+        "processes": [
+            Process(
+                id=pid,
+                name=rng.choice(("java", "nginx", "postgres", "python3", "node")),
+                cpu_usage=round(rng.random() * 10, 1) if pid % 7 == 0 else 0.0,
+                created=1_700_000_000.0 + pid,
+                memory_usage=round(rng.random(), 3),
+                path="/usr/bin/app",
+                status="sleeping",
+                username="app",
+            )
+            for pid in range(1, args.processes + 1)
+        ],
+    }
+
+
+def _to_json(snapshot: Any) -> bytes:
+    """Serialize with the standard library json."""
+    return json.dumps(snapshot, default=dataclasses.asdict).encode()
+
+
+def _time(function, number: int) -> float:
+    """Best time per call in microseconds."""
+    return min(timeit.repeat(function, number=number, repeat=5)) / number * 1e6
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cpus", type=int, default=64)
+    parser.add_argument("--disks", type=int, default=24)
+    parser.add_argument("--interfaces", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=400)
+    parser.add_argument("--processes", type=int, default=800)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    snapshots = [_snapshot(rng, args, tick) for tick in range(args.number + 1)]
+    snapshot = snapshots[0]
+
+    print(f"{'format':<14}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+
+    encoded_json = _to_json(snapshot)
+    print(
+        f"{'json':<14}{len(encoded_json):>10}"
+        f"{_time(lambda: _to_json(snapshot), args.number):>12.0f}"
+        f"{_time(lambda: json.loads(encoded_json), args.number):>12.0f}"
+    )
+
+    if orjson is not None:
+        encoded_orjson = orjson.dumps(snapshot)
+        print(
+            f"{'orjson':<14}{len(encoded_orjson):>10}"
+            f"{_time(lambda: orjson.dumps(snapshot), args.number):>12.0f}"
+            f"{_time(lambda: orjson.loads(encoded_orjson), args.number):>12.0f}"
+        )
+
+    encoder = SnapshotEncoder()
+    frame = encoder.encode(snapshot)
+    print(
+        f"{'codec':<14}{len(frame):>10}"
+        f"{_time(lambda: encoder.encode(snapshot), args.number):>12.0f}"
+        f"{_time(lambda: SnapshotDecoder().decode(frame), args.number):>12.0f}"
+    )
+
+    # Delta frames over a drifting sequence of snapshots
+    delta_encoder = SnapshotEncoder(delta=True, key_frame_interval=args.number + 1)
+    frames = [delta_encoder.encode(item) for item in snapshots]
+    delta_encoder = SnapshotEncoder(delta=True, key_frame_interval=args.number + 1)
+    delta_encoder.encode(snapshots[0])
+    encode_time = _time(
+        lambda: [delta_encoder.encode(item) for item in snapshots[1:]], 1
+    ) / len(snapshots[1:])
+
+    def decode_frames() -> None:
+        decoder = SnapshotDecoder()
+        for item in frames:
+            decoder.decode(item)
+
+    decode_time = _time(decode_frames, 1) / len(frames)
+    delta_size = sum(len(item) for item in frames[1:]) // len(frames[1:])
+    print(
+        f"{'codec delta':<14}{delta_size:>10}{encode_time:>12.0f}{decode_time:>12.0f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
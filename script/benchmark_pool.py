@@ -0,0 +1,100 @@
+"""Benchmark allocations with and without model reuse on a synthetic host."""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import psutil
+
+from systembridgedata.filewatch import FileWatcher
+from systembridgedata.module.cpu import CPU
+from systembridgedata.module.disks import Disks
+from systembridgedata.module.networks import Networks
+from systembridgedata.module.processes import Processes
+from tests.fake import FakePsutil, create_procfs
+
+GETTERS = (
+    ("CPU", "get_frequency_per_cpu"),
+    ("CPU", "get_times_per_cpu"),
+    ("Disks", "get_io_counters_per_disk"),
+    ("Disks", "get_partitions"),
+    ("Networks", "get_connections"),
+    ("Networks", "get_stats"),
+    ("Processes", "get_processes"),
+)
+
+
+def _measure(getter, rounds: int) -> tuple[int, float]:
+    """Mean bytes allocated and best time per call.
+
+    The previous result is held during each call, as a caller would.
+    """
+    result = getter()
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = getter()
+        best = min(best, time.perf_counter() - start)
+
+    allocated = 0
+    for _ in range(rounds):
+        tracemalloc.start()
+        result = getter()
+        allocated += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    del result
+    return allocated // rounds, best
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cpus", type=int, default=128)
+    parser.add_argument("--processes", type=int, default=5000)
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--interfaces", type=int, default=200)
+    parser.add_argument("--disks", type=int, default=32)
+    parser.add_argument("--mounts", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Creating synthetic /proc with {args.processes} processes")
+        psutil.PROCFS_PATH = create_procfs(
+            directory,
+            args.processes,
+            cpu_count=args.cpus,
+            interface_count=args.interfaces,
+            disk_count=args.disks,
+            mount_count=args.mounts,
+        )
+        fake = FakePsutil(
+            cpu_count=args.cpus,
+            interface_count=args.interfaces,
+            connection_count=args.connections,
+        )
+        file_watcher = FileWatcher()
+        with fake.patch():
+            for module, name in GETTERS:
+                results = []
+                for reuse in (False, True):
+                    instance = {
+                        "CPU": lambda reuse=reuse: CPU(reuse=reuse),
+                        "Disks": lambda reuse=reuse: Disks(file_watcher, reuse=reuse),
+                        "Networks": lambda reuse=reuse: Networks(reuse=reuse),
+                        "Processes": lambda reuse=reuse: Processes(reuse=reuse),
+                    }[module]()
+                    results.append(_measure(getattr(instance, name), args.rounds))
+                (allocated, took), (reused, reused_took) = results
+                print(
+                    f"{module}.{name}: {allocated / 1024:.0f} KiB -> "
+                    f"{reused / 1024:.0f} KiB "
+                    f"({1 - reused / allocated:.0%} less), "
+                    f"{took * 1000:.1f}ms -> {reused_took * 1000:.1f}ms"
+                )
+        file_watcher.close()
+
+
+if __name__ == "__main__":
+    main()
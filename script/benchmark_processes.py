@@ -0,0 +1,52 @@
+"""Benchmark serial and sharded process scanning on a synthetic /proc."""
+
+import argparse
+import os
+import tempfile
+import time
+
+import psutil
+
+from systembridgedata.module.processes import Processes
+from tests.fake import create_procfs
+
+
+def _time(processes: Processes, rounds: int) -> float:
+    """Best time of a number of scans."""
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        processes.get_processes()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--processes", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"Creating synthetic /proc with {args.processes} processes")
+        psutil.PROCFS_PATH = create_procfs(directory, args.processes)
+
+        serial = _time(Processes(), args.rounds)
+        print(f"serial: {serial:.3f}s")
+
+        for executor in ("thread", "process"):
+            processes = Processes(workers=args.workers, executor=executor)
+            # Warm up the pool so start-up cost is not measured
+            processes.get_processes()
+            parallel = _time(processes, args.rounds)
+            processes.close()
+            print(
+                f"{executor} x{args.workers}: {parallel:.3f}s "
+                f"({serial / parallel:.2f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
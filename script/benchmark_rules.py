@@ -0,0 +1,90 @@
+"""Benchmark the rule engine evaluating 10,000 rules per cycle."""
+
+import argparse
+import random
+import time
+
+from systembridgedata.collector import CollectorData
+from systembridgedata.rules import Rule, RuleEngine, get_metrics
+
+
+def _data(args: argparse.Namespace) -> CollectorData:
+    """Build a large cycle of collected data."""
+    return CollectorData(
+        scalars={"cpu_usage": 10.0, "memory_percent": 50.0, "swap_percent": 0.0},
+        per_cpu_usage=[10.0] * args.cpus,
+        partitions=[
+            (f"/dev/sd{index}", f"/mnt/{index}", 100, 50, 50, 50.0)
+            for index in range(args.partitions)
+        ],
+        processes=[
+            (pid, 1.0, 0.1, f"service{pid % args.services}")
+            for pid in range(args.processes)
+        ],
+        sensors=[
+            ("coretemp", f"Core {index}", "temperature", 50.0)
+            for index in range(args.sensors)
+        ],
+    )
+
+
+def _rules(args: argparse.Namespace, data: CollectorData) -> list[Rule]:
+    """Build rules over every metric, cycling through the kinds of rule."""
+    metrics = sorted(get_metrics(data))
+    rules = [
+        Rule.parse("any_core", "any cpu_usage.* > 95 for 30s hysteresis 5"),
+        Rule.parse("all_cores", "all cpu_usage.* > 90 for 10s"),
+    ]
+    for index in range(args.rules - len(rules)):
+        metric = metrics[index % len(metrics)]
+        if metric.startswith("process_count."):
+            expression = f"{metric} < 1 default 0"
+        else:
+            expression = f"{metric} > {90 + index % 10} for {index % 60}s hysteresis 2"
+        rules.append(Rule.parse(f"rule{index}", expression))
+    return rules
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, default=10_000)
+    parser.add_argument("--cpus", type=int, default=256)
+    parser.add_argument("--partitions", type=int, default=500)
+    parser.add_argument("--processes", type=int, default=5000)
+    parser.add_argument("--services", type=int, default=1000)
+    parser.add_argument("--sensors", type=int, default=64)
+    parser.add_argument("--cycles", type=int, default=50)
+    parser.add_argument(
+        "--changed", type=float, default=0.1, help="Fraction of values changing"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    data = _data(args)
+    rules = _rules(args, data)
+    metrics = get_metrics(data)
+    print(f"{len(rules)} rules over {len(metrics)} metrics")
+
+    for label, changed in (("changed", args.changed), ("all changed", 1.0)):
+        engine = RuleEngine(rules)
+        values = dict(metrics)
+        engine.evaluate(values, 0.0)
+        evaluated = engine.evaluated
+        events = 0
+        took = 0.0
+        for cycle in range(1, args.cycles + 1):
+            for name in rng.sample(list(values), int(len(values) * changed)):
+                values[name] = rng.uniform(0, 100)
+            started = time.perf_counter()
+            events += len(engine.evaluate(values, float(cycle)))
+            took += time.perf_counter() - started
+        print(
+            f"{label}: {took / args.cycles * 1000:.2f}ms per cycle, "
+            f"{(engine.evaluated - evaluated) / args.cycles:.0f} rules evaluated "
+            f"per cycle, {events / args.cycles:.0f} events per cycle"
+        )
+
+
+if __name__ == "__main__":
+    main()
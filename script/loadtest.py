@@ -0,0 +1,202 @@
+"""Load test the data modules against a synthetic host of a given size.
+
+Builds a fake /proc for psutil to read, replaces the psutil calls that read
+/sys or make syscalls with fakes, then runs full refresh cycles of each
+module and prints the results as JSON. By default the host has 100,000
+processes on 512 CPUs, which takes a while to build.
+
+Per module, the report holds p50_ms, p99_ms and max_ms latencies over the
+cycles. It also holds these numbers from one extra cycle run under
+tracemalloc:
+
+- allocated_blocks and allocated_bytes count the allocations made during
+  the cycle that are still alive afterwards, which is mostly the models
+  returned. tracemalloc cannot count blocks that were freed again, so
+  temporary allocations only show in the next number.
+- peak_bytes is the most memory traced at once during the cycle.
+"""
+
+import argparse
+from collections.abc import Callable
+import inspect
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+import psutil
+
+from systembridgedata._version import __version__
+from systembridgedata.filewatch import FileWatcher
+from systembridgedata.module.cpu import CPU
+from systembridgedata.module.disks import Disks
+from systembridgedata.module.networks import Networks
+from systembridgedata.module.processes import Processes
+from systembridgedata.module.sensors import Sensors
+from tests.fake import FakePsutil, create_procfs
+
+try:
+    import resource
+except ImportError:
+    resource = None  # type: ignore[assignment]
+
+
+def _getters(module: Any) -> list[Callable[[], Any]]:
+    """Get the getters of a module that take no arguments."""
+    getters: list[Callable[[], Any]] = []
+    for name in sorted(dir(module)):
+        if not name.startswith("get_"):
+            continue
+        getter = getattr(module, name)
+        if inspect.iscoroutinefunction(getter):
+            continue
+        parameters = inspect.signature(getter).parameters.values()
+        if all(parameter.default is not parameter.empty for parameter in parameters):
+            getters.append(getter)
+    return getters
+
+
+def _percentile(values: list[float], percent: float) -> float:
+    """Nearest rank percentile."""
+    ordered = sorted(values)
+    return ordered[
+        max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+    ]
+
+
+def _summary(values: list[float]) -> dict[str, float]:
+    """Summarise latencies in milliseconds."""
+    return {
+        "p50_ms": round(_percentile(values, 50) * 1000, 3),
+        "p99_ms": round(_percentile(values, 99) * 1000, 3),
+        "max_ms": round(max(values) * 1000, 3),
+    }
+
+
+def _peak_rss() -> int | None:
+    """Peak resident set size in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cpus", type=int, default=512)
+    parser.add_argument("--processes", type=int, default=100_000)
+    parser.add_argument("--mounts", type=int, default=2000)
+    parser.add_argument("--interfaces", type=int, default=500)
+    parser.add_argument("--disks", type=int, default=64)
+    parser.add_argument("--connections", type=int, default=10_000)
+    parser.add_argument("--sensors", type=int, default=64)
+    parser.add_argument("--cycles", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--output", help="Write the results here, not stdout")
+    args = parser.parse_args(argv)
+
+    procfs_path = psutil.PROCFS_PATH
+    file_watcher = FileWatcher()
+    modules: dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            started = time.perf_counter()
+            psutil.PROCFS_PATH = create_procfs(
+                directory,
+                args.processes,
+                cpu_count=args.cpus,
+                interface_count=args.interfaces,
+                disk_count=args.disks,
+                mount_count=args.mounts,
+            )
+            print(
+                f"Created synthetic host in {time.perf_counter() - started:.1f}s",
+                file=sys.stderr,
+            )
+
+            fake = FakePsutil(
+                cpu_count=args.cpus,
+                interface_count=args.interfaces,
+                connection_count=args.connections,
+                sensor_count=args.sensors,
+            )
+            with fake.patch():
+                modules.update(
+                    CPU=CPU(),
+                    Processes=Processes(workers=args.workers),
+                    Disks=Disks(file_watcher=file_watcher),
+                    Networks=Networks(),
+                    Sensors=Sensors(),
+                )
+                getters = {name: _getters(module) for name, module in modules.items()}
+
+                # Warm up, so first call costs like cpu_percent priming are excluded
+                for module_getters in getters.values():
+                    for getter in module_getters:
+                        getter()
+
+                cycles: list[float] = []
+                latencies: dict[str, list[float]] = {name: [] for name in modules}
+                for cycle in range(args.cycles):
+                    cycle_started = time.perf_counter()
+                    for name, module_getters in getters.items():
+                        module_started = time.perf_counter()
+                        for getter in module_getters:
+                            getter()
+                        latencies[name].append(time.perf_counter() - module_started)
+                    cycles.append(time.perf_counter() - cycle_started)
+                    print(f"Cycle {cycle + 1}: {cycles[-1]:.3f}s", file=sys.stderr)
+
+                # A separate cycle under tracemalloc, which slows everything down
+                allocations: dict[str, dict[str, int]] = {}
+                tracemalloc.start()
+                for name, module_getters in getters.items():
+                    tracemalloc.clear_traces()
+                    results = [getter() for getter in module_getters]
+                    peak_bytes = tracemalloc.get_traced_memory()[1]
+                    traces = tracemalloc.take_snapshot().traces
+                    allocations[name] = {
+                        "allocated_blocks": len(traces),
+                        "allocated_bytes": sum(trace.size for trace in traces),
+                        "peak_bytes": peak_bytes,
+                    }
+                    del results, traces
+                tracemalloc.stop()
+        finally:
+            # Restore the host even when a run fails partway
+            tracemalloc.stop()
+            for module in modules.values():
+                if isinstance(module, (Disks, Processes)):
+                    module.close()
+            file_watcher.close()
+            psutil.PROCFS_PATH = procfs_path
+
+    report = {
+        "version": __version__.public(),
+        "python": platform.python_version(),
+        "psutil": psutil.__version__,
+        "cpu_count": os.cpu_count(),
+        "config": vars(args),
+        "cycle": _summary(cycles),
+        "modules": {
+            name: _summary(values) | allocations[name]
+            for name, values in latencies.items()
+        },
+        "peak_rss_bytes": _peak_rss(),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
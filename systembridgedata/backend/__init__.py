@@ -0,0 +1,34 @@
+"""Data backends."""
+
+from __future__ import annotations
+
+from typing import Final
+
+from .base import Backend
+from .linux import LinuxBackend
+from .psutil import PsutilBackend
+
+BACKENDS: Final[dict[str, type[Backend]]] = {
+    PsutilBackend.name: PsutilBackend,
+    LinuxBackend.name: LinuxBackend,
+}
+
+_instances: dict[str, Backend] = {}
+
+
+def get_backend(name: str = PsutilBackend.name) -> Backend:
+    """Get the shared backend of a name, so modules share its state."""
+    if (backend := _instances.get(name)) is None:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown backend: {name}")
+        backend = _instances[name] = BACKENDS[name]()
+    return backend
+
+
+__all__ = [
+    "BACKENDS",
+    "Backend",
+    "LinuxBackend",
+    "PsutilBackend",
+    "get_backend",
+]
@@ -0,0 +1,173 @@
+"""Backend interface."""
+
+from __future__ import annotations
+
+import abc
+from collections.abc import Iterator
+import json
+import subprocess
+import sys
+from typing import Any
+
+from psutil._common import (
+    scpustats,
+    sdiskpart,
+    sdiskusage,
+    sfan,
+    shwtemp,
+    snicaddr,
+    snicstats,
+    suser,
+)
+
+from systembridgeshared.base import Base
+
+
+class Backend(Base, abc.ABC):
+    """Raw data behind the data modules.
+
+    Results have the same fields as psutil's, so modules read every backend
+    alike. Processes need psutil's Process accessors, and missing or
+    inaccessible processes raise psutil's NoSuchProcess and AccessDenied.
+    """
+
+    name = ""
+
+    @abc.abstractmethod
+    def boot_time(self) -> float:
+        """Boot time, in seconds since the epoch."""
+
+    @abc.abstractmethod
+    def cpu_count(self) -> int:
+        """Count logical CPUs."""
+
+    @abc.abstractmethod
+    def cpu_freq(self, percpu: bool = False) -> Any:
+        """CPU frequencies, in MHz."""
+
+    @abc.abstractmethod
+    def cpu_percent(self, interval: float | None = None, percpu: bool = False) -> Any:
+        """CPU usage, over the interval or since the previous call."""
+
+    @abc.abstractmethod
+    def cpu_stats(self) -> scpustats:
+        """CPU context switches and interrupts."""
+
+    @abc.abstractmethod
+    def cpu_times(self, percpu: bool = False) -> Any:
+        """CPU times, in seconds."""
+
+    @abc.abstractmethod
+    def cpu_times_percent(
+        self,
+        interval: float | None = None,
+        percpu: bool = False,
+    ) -> Any:
+        """CPU times usage, over the interval or since the previous call."""
+
+    @abc.abstractmethod
+    def getloadavg(self) -> tuple[float, float, float]:
+        """Load average over 1, 5 and 15 minutes."""
+
+    @abc.abstractmethod
+    def virtual_memory(self) -> Any:
+        """Virtual memory."""
+
+    @abc.abstractmethod
+    def swap_memory(self) -> Any:
+        """Swap memory."""
+
+    @abc.abstractmethod
+    def disk_io_counters(self, perdisk: bool = False) -> Any:
+        """Disk I/O counters, in total or per disk."""
+
+    @abc.abstractmethod
+    def disk_partitions(self, all: bool = False) -> list[sdiskpart]:  # noqa: A002
+        """Mounted partitions."""
+
+    @abc.abstractmethod
+    def disk_usage(self, path: str) -> sdiskusage:
+        """Usage of the filesystem holding a path."""
+
+    @abc.abstractmethod
+    def net_connections(self, kind: str = "inet") -> list:
+        """Network connections."""
+
+    @abc.abstractmethod
+    def net_if_addrs(self) -> dict[str, list[snicaddr]]:
+        """Network interface addresses."""
+
+    @abc.abstractmethod
+    def net_if_stats(self) -> dict[str, snicstats]:
+        """Network interface stats."""
+
+    @abc.abstractmethod
+    def net_io_counters(self, pernic: bool = False) -> Any:
+        """Network I/O counters, in total or per interface."""
+
+    @abc.abstractmethod
+    def pids(self) -> list[int]:
+        """Get the running process IDs."""
+
+    @abc.abstractmethod
+    def process(self, pid: int) -> Any:
+        """Get a process, with psutil's Process accessors."""
+
+    @abc.abstractmethod
+    def process_iter(self) -> Iterator[Any]:
+        """Every running process, reused between calls while it runs."""
+
+    @abc.abstractmethod
+    def sensors_fans(self) -> dict[str, list[sfan]] | None:
+        """Fan speeds, or None where not supported."""
+
+    @abc.abstractmethod
+    def sensors_temperatures(self) -> dict[str, list[shwtemp]] | None:
+        """Temperatures in celsius, or None where not supported."""
+
+    @abc.abstractmethod
+    def users(self) -> list[suser]:
+        """Get the logged in users."""
+
+    def windows_sensors(self) -> dict | None:
+        """Sensors from the Windows sensors binary, or None elsewhere."""
+        if sys.platform != "win32":
+            return None
+
+        try:
+            # Import here to not raise error when importing file on linux
+            # pylint: disable=import-error, import-outside-toplevel
+            from systembridgewindowssensors import get_windowssensors_path
+        except (ImportError, ModuleNotFoundError) as exception:
+            self._logger.warning("Windows sensors not found", exc_info=exception)
+            return None
+
+        path = get_windowssensors_path()
+
+        self._logger.debug("Windows sensors path: %s", path)
+        try:
+            with subprocess.Popen(
+                [path],
+                stdout=subprocess.PIPE,
+            ) as pipe:
+                result = pipe.communicate()[0].decode()
+            self._logger.debug("Windows sensors result: %s", result)
+        except Exception as exception:  # pylint: disable=broad-except
+            self._logger.error(
+                "Windows sensors error for path: %s", path, exc_info=exception
+            )
+            return None
+
+        try:
+            return json.loads(result)
+        except json.decoder.JSONDecodeError as exception:
+            self._logger.error("JSONDecodeError", exc_info=exception)
+            return None
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle a backend's settings for worker processes, not its state."""
+        return {}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        """Restore a pickled backend."""
+        self.__init__(**state)  # type: ignore[misc]
@@ -0,0 +1,955 @@
+"""Native Linux backend."""
+
+from __future__ import annotations
+
+from collections import namedtuple
+from collections.abc import Callable, Iterator
+import contextlib
+import os
+import re
+import socket
+import struct
+import sys
+import time
+from typing import Any, Final, NamedTuple
+
+from psutil import AccessDenied, NoSuchProcess
+from psutil._common import (
+    CONN_CLOSE,
+    CONN_CLOSE_WAIT,
+    CONN_CLOSING,
+    CONN_ESTABLISHED,
+    CONN_FIN_WAIT1,
+    CONN_FIN_WAIT2,
+    CONN_LAST_ACK,
+    CONN_LISTEN,
+    CONN_NONE,
+    CONN_SYN_RECV,
+    CONN_SYN_SENT,
+    CONN_TIME_WAIT,
+    NIC_DUPLEX_FULL,
+    NIC_DUPLEX_HALF,
+    NIC_DUPLEX_UNKNOWN,
+    STATUS_DEAD,
+    STATUS_DISK_SLEEP,
+    STATUS_IDLE,
+    STATUS_PARKED,
+    STATUS_RUNNING,
+    STATUS_SLEEPING,
+    STATUS_STOPPED,
+    STATUS_TRACING_STOP,
+    STATUS_WAKE_KILL,
+    STATUS_WAKING,
+    STATUS_ZOMBIE,
+    addr,
+    pcputimes,
+    sconn,
+    scpufreq,
+    scpustats,
+    sdiskpart,
+    sdiskusage,
+    snetio,
+    snicstats,
+    sswap,
+)
+
+from .psutil import PsutilBackend
+
+# Named like psutil's Linux tuples, which are not importable elsewhere
+scputimes = namedtuple(
+    "scputimes",
+    [
+        "user",
+        "nice",
+        "system",
+        "idle",
+        "iowait",
+        "irq",
+        "softirq",
+        "steal",
+        "guest",
+        "guest_nice",
+    ],
+)
+svmem = namedtuple(
+    "svmem",
+    [
+        "total",
+        "available",
+        "percent",
+        "used",
+        "free",
+        "active",
+        "inactive",
+        "buffers",
+        "cached",
+        "shared",
+        "slab",
+    ],
+)
+sdiskio = namedtuple(
+    "sdiskio",
+    [
+        "read_count",
+        "write_count",
+        "read_bytes",
+        "write_bytes",
+        "read_time",
+        "write_time",
+        "read_merged_count",
+        "write_merged_count",
+        "busy_time",
+    ],
+)
+pmem = namedtuple("pmem", ["rss", "vms", "shared", "text", "lib", "data", "dirty"])
+pio = namedtuple(
+    "pio",
+    [
+        "read_count",
+        "write_count",
+        "read_bytes",
+        "write_bytes",
+        "read_chars",
+        "write_chars",
+    ],
+)
+
+CLOCK_TICKS: Final[int] = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PAGE_SIZE: Final[int] = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+SECTOR_SIZE: Final[int] = 512
+LITTLE_ENDIAN: Final[bool] = sys.byteorder == "little"
+
+PROCESS_STATUSES: Final[dict[str, str]] = {
+    "R": STATUS_RUNNING,
+    "S": STATUS_SLEEPING,
+    "D": STATUS_DISK_SLEEP,
+    "T": STATUS_STOPPED,
+    "t": STATUS_TRACING_STOP,
+    "Z": STATUS_ZOMBIE,
+    "X": STATUS_DEAD,
+    "x": STATUS_DEAD,
+    "K": STATUS_WAKE_KILL,
+    "W": STATUS_WAKING,
+    "I": STATUS_IDLE,
+    "P": STATUS_PARKED,
+}
+
+TCP_STATUSES: Final[dict[str, str]] = {
+    "01": CONN_ESTABLISHED,
+    "02": CONN_SYN_SENT,
+    "03": CONN_SYN_RECV,
+    "04": CONN_FIN_WAIT1,
+    "05": CONN_FIN_WAIT2,
+    "06": CONN_TIME_WAIT,
+    "07": CONN_CLOSE,
+    "08": CONN_CLOSE_WAIT,
+    "09": CONN_LAST_ACK,
+    "0A": CONN_LISTEN,
+    "0B": CONN_CLOSING,
+}
+
+# /proc/net files for each connection kind
+CONNECTION_FILES: Final[dict[str, tuple[tuple[str, int, int | None], ...]]] = {}
+_TCP4 = ("tcp", socket.AF_INET, socket.SOCK_STREAM)
+_TCP6 = ("tcp6", socket.AF_INET6, socket.SOCK_STREAM)
+_UDP4 = ("udp", socket.AF_INET, socket.SOCK_DGRAM)
+_UDP6 = ("udp6", socket.AF_INET6, socket.SOCK_DGRAM)
+_UNIX = ("unix", socket.AF_UNIX, None)
+CONNECTION_FILES.update(
+    {
+        "all": (_TCP4, _TCP6, _UDP4, _UDP6, _UNIX),
+        "tcp": (_TCP4, _TCP6),
+        "tcp4": (_TCP4,),
+        "tcp6": (_TCP6,),
+        "udp": (_UDP4, _UDP6),
+        "udp4": (_UDP4,),
+        "udp6": (_UDP6,),
+        "unix": (_UNIX,),
+        "inet": (_TCP4, _TCP6, _UDP4, _UDP6),
+        "inet4": (_TCP4, _UDP4),
+        "inet6": (_TCP6, _UDP6),
+    }
+)
+
+# Interface flags, in the order psutil lists them
+INTERFACE_FLAGS: Final[tuple[tuple[str, int], ...]] = (
+    ("up", 0x1),
+    ("broadcast", 0x2),
+    ("debug", 0x4),
+    ("loopback", 0x8),
+    ("pointopoint", 0x10),
+    ("notrailers", 0x20),
+    ("running", 0x40),
+    ("noarp", 0x80),
+    ("promisc", 0x100),
+    ("allmulti", 0x200),
+    ("master", 0x400),
+    ("slave", 0x800),
+    ("multicast", 0x1000),
+    ("portsel", 0x2000),
+    ("automedia", 0x4000),
+    ("dynamic", 0x8000),
+)
+DUPLEXES: Final[dict[str, int]] = {
+    "full": NIC_DUPLEX_FULL,
+    "half": NIC_DUPLEX_HALF,
+}
+
+_MOUNT_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+class _Stat(NamedTuple):
+    """The fields of /proc/<pid>/stat that are used."""
+
+    name: str
+    state: str
+    utime: int
+    stime: int
+    cutime: int
+    cstime: int
+    threads: int
+    start: int
+    vsize: int
+    rss: int
+    blkio: int
+
+
+def _read_stat(path: str, pid: int) -> _Stat:
+    """Read a process's stat file."""
+    try:
+        with open(f"{path}/{pid}/stat", "rb") as file:
+            data = file.read()
+    except (FileNotFoundError, ProcessLookupError):
+        raise NoSuchProcess(pid) from None
+    except PermissionError:
+        raise AccessDenied(pid) from None
+    # The name may hold spaces and parentheses, so split around the last one
+    end = data.rindex(b")")
+    fields = data[end + 2 :].split()
+    return _Stat(
+        name=data[data.index(b"(") + 1 : end].decode(errors="replace"),
+        state=fields[0].decode(),
+        utime=int(fields[11]),
+        stime=int(fields[12]),
+        cutime=int(fields[13]),
+        cstime=int(fields[14]),
+        threads=int(fields[17]),
+        start=int(fields[19]),
+        vsize=int(fields[20]),
+        rss=int(fields[21]),
+        blkio=int(fields[39]) if len(fields) > 39 else 0,
+    )
+
+
+def _usage_percent(used: float, total: float) -> float:
+    """Percentage, rounded like psutil."""
+    try:
+        return round(used / total * 100, 1)
+    except ZeroDivisionError:
+        return 0.0
+
+
+def _total_time(times: scputimes) -> float:
+    """Total CPU time, without guest time already counted in user and nice."""
+    return sum(times) - times.guest - times.guest_nice
+
+
+def _busy_percent(before: scputimes, after: scputimes) -> float:
+    """CPU usage between two readings."""
+    deltas = scputimes(*(max(0, end - start) for start, end in zip(before, after)))
+    total = _total_time(deltas)
+    if not total:
+        return 0.0
+    return round((total - deltas.idle - deltas.iowait) / total * 100, 1)
+
+
+def _times_percent(before: scputimes, after: scputimes) -> scputimes:
+    """CPU times usage between two readings."""
+    deltas = scputimes(*(max(0, end - start) for start, end in zip(before, after)))
+    scale = 100.0 / max(1, _total_time(deltas))
+    return scputimes(
+        *(min(max(0.0, round(delta * scale, 1)), 100.0) for delta in deltas)
+    )
+
+
+def _decode_address(address: str, family: int) -> addr | tuple:
+    """Decode a /proc/net address, like 0100007F:0016 for 127.0.0.1:22."""
+    ip, port = address.split(":")
+    if not (port_number := int(port, 16)):
+        return ()
+    raw = bytes.fromhex(ip)
+    if family == socket.AF_INET:
+        return addr(
+            socket.inet_ntop(family, raw[::-1] if LITTLE_ENDIAN else raw), port_number
+        )
+    # Four host order 32 bit words
+    if LITTLE_ENDIAN:
+        raw = struct.pack(">4I", *struct.unpack("<4I", raw))
+    return addr(socket.inet_ntop(family, raw), port_number)
+
+
+class LinuxProcess:
+    """A process read from /proc, with psutil's Process accessors.
+
+    Most fields come from the stat file, which is read once per oneshot
+    block, and once per process per process_iter pass.
+    """
+
+    __slots__ = (
+        "_backend",
+        "_last_cpu",
+        "_name",
+        "_oneshot",
+        "_path",
+        "_start",
+        "_stat",
+        "pid",
+    )
+
+    def __init__(self, backend: LinuxBackend, pid: int, start: int | None = None):
+        """Initialise, raising NoSuchProcess if it is not running."""
+        self.pid = pid
+        self._backend = backend
+        self._path = f"{backend.procfs_path}/{pid}"
+        self._oneshot = False
+        self._stat: _Stat | None = None
+        # The full name, and the name in stat it extends
+        self._name: tuple[str, str] | None = None
+        # (monotonic time, CPU seconds) at the previous cpu_percent
+        self._last_cpu: tuple[float, float] | None = None
+        self._start = (
+            start if start is not None else _read_stat(backend.procfs_path, pid).start
+        )
+
+    def __repr__(self) -> str:
+        """Represent."""
+        return f"LinuxProcess(pid={self.pid})"
+
+    def _get_stat(self) -> _Stat:
+        """Read the stat file, cached while in a oneshot block."""
+        if self._stat is not None:
+            return self._stat
+        stat = _read_stat(self._backend.procfs_path, self.pid)
+        if self._oneshot:
+            self._stat = stat
+        return stat
+
+    def _read(self, name: str) -> bytes:
+        """Read one of the process's files."""
+        try:
+            with open(f"{self._path}/{name}", "rb") as file:
+                return file.read()
+        except (FileNotFoundError, ProcessLookupError):
+            raise NoSuchProcess(self.pid) from None
+        except PermissionError:
+            raise AccessDenied(self.pid) from None
+
+    @contextlib.contextmanager
+    def _cached(self, stat: _Stat | None) -> Iterator[None]:
+        """Hold the stat file for the block."""
+        if self._oneshot:
+            yield
+            return
+        self._oneshot = True
+        self._stat = stat
+        try:
+            yield
+        finally:
+            self._oneshot = False
+            self._stat = None
+
+    def oneshot(self) -> contextlib.AbstractContextManager[None]:
+        """Read each file once for the block."""
+        return self._cached(None)
+
+    def is_running(self) -> bool:
+        """Whether the process is still running, and has not been replaced."""
+        try:
+            return self._get_stat().start == self._start
+        except NoSuchProcess:
+            return False
+
+    def name(self) -> str:
+        """Name, extended from the command line when the kernel truncated it."""
+        name = self._get_stat().name
+        if self._name is not None and self._name[1] == name:
+            return self._name[0]
+        full_name = name
+        if len(name) >= 15:
+            with contextlib.suppress(AccessDenied):
+                if arguments := self._read("cmdline").split(b"\0"):
+                    extended = os.path.basename(arguments[0].decode(errors="replace"))
+                    if extended.startswith(name):
+                        full_name = extended
+        self._name = (full_name, name)
+        return full_name
+
+    def status(self) -> str:
+        """Status."""
+        state = self._get_stat().state
+        return PROCESS_STATUSES.get(state, "?")
+
+    def create_time(self) -> float:
+        """Start time, in seconds since the epoch."""
+        return self._backend.boot_time() + self._start / CLOCK_TICKS
+
+    def cpu_times(self) -> pcputimes:
+        """CPU times, in seconds."""
+        stat = self._get_stat()
+        return _pcputimes(
+            stat.utime / CLOCK_TICKS,
+            stat.stime / CLOCK_TICKS,
+            stat.cutime / CLOCK_TICKS,
+            stat.cstime / CLOCK_TICKS,
+            stat.blkio / CLOCK_TICKS,
+        )
+
+    def cpu_percent(self, interval: float | None = None) -> float:
+        """CPU usage since the previous call, where 100 is one CPU."""
+        if interval:
+            self.cpu_percent()
+            time.sleep(interval)
+        stat = self._get_stat()
+        now = time.monotonic()
+        cpu = (stat.utime + stat.stime) / CLOCK_TICKS
+        last, self._last_cpu = self._last_cpu, (now, cpu)
+        if last is None or now <= last[0]:
+            return 0.0
+        return round((cpu - last[1]) / (now - last[0]) * 100, 1)
+
+    def memory_info(self) -> pmem:
+        """Memory, in bytes."""
+        # statm lists the virtual size first, then the resident size
+        vms, rss, *rest = (
+            int(value) * PAGE_SIZE for value in self._read("statm").split()[:7]
+        )
+        return pmem(rss, vms, *rest)
+
+    def memory_percent(self) -> float:
+        """Resident memory as a percentage of total memory."""
+        return self._get_stat().rss * PAGE_SIZE / self._backend.memory_total() * 100
+
+    def num_threads(self) -> int:
+        """Thread count."""
+        return self._get_stat().threads
+
+    def num_fds(self) -> int:
+        """Open file count."""
+        try:
+            return len(os.listdir(f"{self._path}/fd"))
+        except (FileNotFoundError, ProcessLookupError):
+            raise NoSuchProcess(self.pid) from None
+        except PermissionError:
+            raise AccessDenied(self.pid) from None
+
+    def io_counters(self) -> pio:
+        """I/O counters."""
+        values = {}
+        for line in self._read("io").splitlines():
+            name, _, value = line.partition(b":")
+            values[name] = int(value)
+        return pio(
+            values[b"syscr"],
+            values[b"syscw"],
+            values[b"read_bytes"],
+            values[b"write_bytes"],
+            values[b"rchar"],
+            values[b"wchar"],
+        )
+
+    def exe(self) -> str:
+        """Get the executable path, empty for kernel threads."""
+        try:
+            path = os.readlink(f"{self._path}/exe")
+        except (FileNotFoundError, ProcessLookupError):
+            if os.path.lexists(self._path):
+                return ""
+            raise NoSuchProcess(self.pid) from None
+        except PermissionError:
+            raise AccessDenied(self.pid) from None
+        if path.endswith(" (deleted)") and not os.path.exists(path):
+            path = path[: -len(" (deleted)")]
+        return path
+
+    def username(self) -> str:
+        """Name of the real user."""
+        for line in self._read("status").splitlines():
+            if line.startswith(b"Uid:"):
+                uid = int(line.split()[1])
+                break
+        else:
+            raise AccessDenied(self.pid)
+        try:
+            import pwd  # pylint: disable=import-outside-toplevel
+
+            return pwd.getpwuid(uid).pw_name
+        except KeyError:
+            return str(uid)
+
+
+# psutil's Linux process CPU times add I/O wait
+_pcputimes = namedtuple("pcputimes", [*pcputimes._fields, "iowait"])
+# Found by this name when unpickled, so traces can hold it
+_pcputimes.__qualname__ = "_pcputimes"
+
+
+class LinuxBackend(PsutilBackend):
+    """Raw data read from /proc and /sys directly, in bulk.
+
+    Each call reads its files once, and process_iter reads one stat file per
+    process for the name, status, CPU time, start time, memory and threads.
+    Unlike psutil, counters are not corrected for wrapping. Interface
+    addresses, users and sensors come from psutil, which reads them with
+    syscalls or from /sys already.
+    """
+
+    name = "linux"
+
+    def __init__(self, procfs_path: str = "/proc", sysfs_path: str = "/sys") -> None:
+        """Initialise."""
+        super().__init__()
+        self.procfs_path = procfs_path
+        self.sysfs_path = sysfs_path
+        self._boot_time: float | None = None
+        self._memory_total: int | None = None
+        # Readings at the previous cpu_percent and cpu_times_percent calls
+        self._last_cpu_times: dict[tuple[str, bool], Any] = {}
+        self._processes: dict[int, LinuxProcess] = {}
+        self._root: str | None = None
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Pickle the paths only."""
+        return {"procfs_path": self.procfs_path, "sysfs_path": self.sysfs_path}
+
+    def _read_lines(self, name: str) -> list[str]:
+        """Read the lines of a file under /proc."""
+        with open(f"{self.procfs_path}/{name}", encoding="utf-8") as file:
+            return file.readlines()
+
+    def _read_sysfs(self, name: str) -> str | None:
+        """Read a file under /sys, or None if it cannot be read."""
+        try:
+            with open(f"{self.sysfs_path}/{name}", encoding="utf-8") as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def _read_meminfo(self) -> dict[str, int]:
+        """Read /proc/meminfo, in bytes."""
+        values: dict[str, int] = {}
+        for line in self._read_lines("meminfo"):
+            fields = line.split()
+            values[fields[0].rstrip(":")] = int(fields[1]) * 1024
+        return values
+
+    def boot_time(self) -> float:
+        """Boot time, in seconds since the epoch."""
+        if self._boot_time is None:
+            for line in self._read_lines("stat"):
+                if line.startswith("btime"):
+                    self._boot_time = float(line.split()[1])
+                    break
+            else:
+                raise RuntimeError(f"No btime in {self.procfs_path}/stat")
+        return self._boot_time
+
+    def memory_total(self) -> int:
+        """Total memory in bytes, read once."""
+        if self._memory_total is None:
+            self._memory_total = self._read_meminfo()["MemTotal"]
+        return self._memory_total
+
+    def cpu_count(self) -> int:
+        """Count online CPUs."""
+        return sum(
+            1
+            for line in self._read_lines("stat")
+            if line.startswith("cpu") and line[3].isdigit()
+        )
+
+    def cpu_times(self, percpu: bool = False) -> Any:
+        """CPU times, in seconds."""
+        times: list[scputimes] = []
+        for line in self._read_lines("stat"):
+            if not line.startswith("cpu"):
+                break
+            if (line[3] == " ") == percpu:
+                continue
+            values = [int(value) / CLOCK_TICKS for value in line.split()[1:11]]
+            values.extend([0.0] * (10 - len(values)))
+            times.append(scputimes(*values))
+        return times if percpu else times[0]
+
+    def _cpu_delta(
+        self,
+        function: str,
+        interval: float | None,
+        percpu: bool,
+        calculate: Callable[[scputimes, scputimes], Any],
+    ) -> Any:
+        """Compare CPU times over an interval, or with the previous call."""
+        if interval:
+            before = self.cpu_times(percpu)
+            time.sleep(interval)
+        else:
+            before = self._last_cpu_times.get((function, percpu))
+        after = self._last_cpu_times[(function, percpu)] = self.cpu_times(percpu)
+        if before is None:
+            before = after
+        if percpu:
+            return [calculate(start, end) for start, end in zip(before, after)]
+        return calculate(before, after)
+
+    def cpu_percent(self, interval: float | None = None, percpu: bool = False) -> Any:
+        """CPU usage, over the interval or since the previous call."""
+        return self._cpu_delta("percent", interval, percpu, _busy_percent)
+
+    def cpu_times_percent(
+        self,
+        interval: float | None = None,
+        percpu: bool = False,
+    ) -> Any:
+        """CPU times usage, over the interval or since the previous call."""
+        return self._cpu_delta("times_percent", interval, percpu, _times_percent)
+
+    def cpu_stats(self) -> scpustats:
+        """CPU context switches and interrupts."""
+        values: dict[str, int] = {}
+        for line in self._read_lines("stat"):
+            name, _, rest = line.partition(" ")
+            if name in ("ctxt", "intr", "softirq"):
+                values[name] = int(rest.split()[0])
+        return scpustats(
+            values.get("ctxt"), values.get("intr"), values.get("softirq"), 0
+        )
+
+    def cpu_freq(self, percpu: bool = False) -> Any:
+        """CPU frequencies, in MHz."""
+        frequencies: list[scpufreq] = []
+        directory = f"{self.sysfs_path}/devices/system/cpu"
+        with contextlib.suppress(OSError):
+            cpus = sorted(
+                (int(name[3:]), name)
+                for name in os.listdir(directory)
+                if name.startswith("cpu") and name[3:].isdigit()
+            )
+            for _, name in cpus:
+                policy = f"devices/system/cpu/{name}/cpufreq"
+                if (current := self._read_sysfs(f"{policy}/scaling_cur_freq")) is None:
+                    continue
+                minimum = self._read_sysfs(f"{policy}/scaling_min_freq")
+                maximum = self._read_sysfs(f"{policy}/scaling_max_freq")
+                frequencies.append(
+                    scpufreq(
+                        int(current) / 1000,
+                        int(minimum) / 1000 if minimum else 0.0,
+                        int(maximum) / 1000 if maximum else 0.0,
+                    )
+                )
+        if not frequencies:
+            # Virtual machines often only have /proc/cpuinfo
+            frequencies = [
+                scpufreq(float(line.split(":")[1]), 0.0, 0.0)
+                for line in self._read_lines("cpuinfo")
+                if line.lower().startswith("cpu mhz")
+            ]
+        if percpu:
+            return frequencies
+        if not frequencies:
+            return None
+        count = len(frequencies)
+        return scpufreq(
+            sum(item.current for item in frequencies) / count,
+            sum(item.min for item in frequencies) / count,
+            sum(item.max for item in frequencies) / count,
+        )
+
+    def getloadavg(self) -> tuple[float, float, float]:
+        """Load average over 1, 5 and 15 minutes."""
+        values = self._read_lines("loadavg")[0].split()
+        return (float(values[0]), float(values[1]), float(values[2]))
+
+    def virtual_memory(self) -> svmem:
+        """Virtual memory, calculated like psutil and free."""
+        values = self._read_meminfo()
+        total = values["MemTotal"]
+        free = values["MemFree"]
+        buffers = values.get("Buffers", 0)
+        cached = values.get("Cached", 0) + values.get("SReclaimable", 0)
+        used = total - free - cached - buffers
+        if used < 0:
+            used = total - free
+        available = values.get("MemAvailable") or free + cached + buffers
+        available = min(max(available, 0), total)
+        return svmem(
+            total,
+            available,
+            _usage_percent(total - available, total),
+            used,
+            free,
+            values.get("Active", 0),
+            values.get("Inactive", 0),
+            buffers,
+            cached,
+            values.get("Shmem", 0),
+            values.get("Slab", 0),
+        )
+
+    def swap_memory(self) -> sswap:
+        """Swap memory."""
+        values = self._read_meminfo()
+        total = values.get("SwapTotal", 0)
+        free = values.get("SwapFree", 0)
+        swapped = {"pswpin": 0, "pswpout": 0}
+        with contextlib.suppress(OSError):
+            for line in self._read_lines("vmstat"):
+                name, _, value = line.partition(" ")
+                if name in swapped:
+                    swapped[name] = int(value) * 4 * 1024
+        used = total - free
+        return sswap(
+            total,
+            used,
+            free,
+            _usage_percent(used, total),
+            swapped["pswpin"],
+            swapped["pswpout"],
+        )
+
+    def disk_io_counters(self, perdisk: bool = False) -> Any:
+        """Disk I/O counters, in total or per disk."""
+        disks: dict[str, sdiskio] = {}
+        for line in self._read_lines("diskstats"):
+            fields = line.split()
+            if len(fields) == 14 or len(fields) >= 18:
+                name = fields[2]
+                reads, reads_merged, read_sectors, read_time, writes = map(
+                    int, fields[3:8]
+                )
+                writes_merged, write_sectors, write_time = map(int, fields[8:11])
+                busy_time = int(fields[12])
+            elif len(fields) == 7:
+                name = fields[2]
+                reads, read_sectors, writes, write_sectors = map(int, fields[3:])
+                read_time = write_time = reads_merged = writes_merged = busy_time = 0
+            else:
+                continue
+            disks[name] = sdiskio(
+                reads,
+                writes,
+                read_sectors * SECTOR_SIZE,
+                write_sectors * SECTOR_SIZE,
+                read_time,
+                write_time,
+                reads_merged,
+                writes_merged,
+                busy_time,
+            )
+        if perdisk:
+            return disks
+        # Sum whole disks only, as partitions are counted in their disk
+        whole = [
+            counters
+            for name, counters in disks.items()
+            if os.path.exists(f"{self.sysfs_path}/block/{name.replace('/', '!')}")
+        ]
+        if not whole:
+            return None
+        return sdiskio(*(sum(values) for values in zip(*whole)))
+
+    def _root_device(self) -> str | None:
+        """Find the device behind /dev/root, which some kernels mount / as."""
+        if self._root is None:
+            device = os.stat("/").st_dev
+            uevent = self._read_sysfs(
+                f"dev/block/{os.major(device)}:{os.minor(device)}/uevent"
+            )
+            for line in (uevent or "").splitlines():
+                if line.startswith("DEVNAME="):
+                    self._root = f"/dev/{line[8:]}"
+        return self._root
+
+    def disk_partitions(self, all: bool = False) -> list[sdiskpart]:  # noqa: A002
+        """Mounted partitions."""
+        filesystems: set[str] = set()
+        if not all:
+            for line in self._read_lines("filesystems"):
+                if not line.startswith("nodev"):
+                    filesystems.add(line.strip())
+                elif line.split()[1] == "zfs":
+                    filesystems.add("zfs")
+
+        partitions: list[sdiskpart] = []
+        for line in self._read_lines("self/mounts"):
+            fields = line.split()
+            if len(fields) < 4:
+                continue
+            device, mount_point, filesystem, options = (
+                _MOUNT_ESCAPE.sub(lambda match: chr(int(match[1], 8)), field)
+                for field in fields[:4]
+            )
+            if device == "none":
+                device = ""
+            elif device == "/dev/root":
+                device = self._root_device() or device
+            if not all and (not device or filesystem not in filesystems):
+                continue
+            partitions.append(sdiskpart(device, mount_point, filesystem, options))
+        return partitions
+
+    def disk_usage(self, path: str) -> sdiskusage:
+        """Usage of the filesystem holding a path."""
+        stat = os.statvfs(path)
+        total = stat.f_blocks * stat.f_frsize
+        used = total - stat.f_bfree * stat.f_frsize
+        free = stat.f_bavail * stat.f_frsize
+        return sdiskusage(total, used, free, _usage_percent(used, used + free))
+
+    def net_io_counters(self, pernic: bool = False) -> Any:
+        """Network I/O counters, in total or per interface."""
+        interfaces: dict[str, snetio] = {}
+        for line in self._read_lines("net/dev")[2:]:
+            name, _, rest = line.partition(":")
+            fields = [int(value) for value in rest.split()]
+            interfaces[name.strip()] = snetio(
+                fields[8],
+                fields[0],
+                fields[9],
+                fields[1],
+                fields[2],
+                fields[10],
+                fields[3],
+                fields[11],
+            )
+        if pernic:
+            return interfaces
+        return snetio(*(sum(values) for values in zip(*interfaces.values())))
+
+    def net_if_stats(self) -> dict[str, snicstats]:
+        """Network interface stats."""
+        stats: dict[str, snicstats] = {}
+        for name in self.net_io_counters(pernic=True):
+            directory = f"class/net/{name}"
+            if (flags_value := self._read_sysfs(f"{directory}/flags")) is None:
+                continue
+            flags = int(flags_value, 16)
+            # The running flag is only reported by the ioctl psutil uses
+            if flags & 0x1 and self._read_sysfs(f"{directory}/operstate") in (
+                "up",
+                "unknown",
+            ):
+                flags |= 0x40
+            speed = self._read_sysfs(f"{directory}/speed")
+            mtu = self._read_sysfs(f"{directory}/mtu")
+            stats[name] = snicstats(
+                bool(flags & 0x40),
+                DUPLEXES.get(
+                    self._read_sysfs(f"{directory}/duplex") or "",
+                    NIC_DUPLEX_UNKNOWN,
+                ),
+                max(int(speed), 0) if speed else 0,
+                int(mtu) if mtu else 0,
+                ",".join(name for name, bit in INTERFACE_FLAGS if flags & bit),
+            )
+        return stats
+
+    def _socket_inodes(self) -> dict[str, list[tuple[int, int]]]:
+        """Map socket inodes to the (pid, fd) pairs holding them."""
+        inodes: dict[str, list[tuple[int, int]]] = {}
+        for pid in self.pids():
+            try:
+                with os.scandir(f"{self.procfs_path}/{pid}/fd") as entries:
+                    for entry in entries:
+                        try:
+                            target = os.readlink(entry.path)
+                        except OSError:
+                            continue
+                        if target.startswith("socket:["):
+                            inodes.setdefault(target[8:-1], []).append(
+                                (pid, int(entry.name))
+                            )
+            except OSError:
+                # Gone, or another user's without privileges
+                continue
+        return inodes
+
+    def net_connections(self, kind: str = "inet") -> list:
+        """Network connections."""
+        if kind not in CONNECTION_FILES:
+            raise ValueError(f"Invalid connection kind: {kind}")
+        inodes = self._socket_inodes()
+        connections: set = set()
+        for file_name, family, kind_type in CONNECTION_FILES[kind]:
+            try:
+                lines = self._read_lines(f"net/{file_name}")[1:]
+            except FileNotFoundError:
+                # No IPv6
+                continue
+            for line in lines:
+                fields = line.split()
+                if kind_type is None:
+                    if len(fields) < 7:
+                        continue
+                    path = fields[7] if len(fields) == 8 else ""
+                    socket_type = socket.SocketKind(int(fields[4]))
+                    for pid, fd in inodes.get(fields[6], [(None, -1)]):
+                        connections.add(
+                            sconn(
+                                fd,
+                                family,
+                                socket_type,
+                                path,
+                                "",
+                                CONN_NONE,
+                                pid,
+                            )
+                        )
+                    continue
+                pid, fd = inodes.get(fields[9], [(None, -1)])[0]
+                connections.add(
+                    sconn(
+                        fd,
+                        family,
+                        kind_type,
+                        _decode_address(fields[1], family),
+                        _decode_address(fields[2], family),
+                        (
+                            TCP_STATUSES.get(fields[3], CONN_NONE)
+                            if kind_type == socket.SOCK_STREAM
+                            else CONN_NONE
+                        ),
+                        pid,
+                    )
+                )
+        return list(connections)
+
+    def pids(self) -> list[int]:
+        """Get the running process IDs."""
+        return sorted(
+            int(name) for name in os.listdir(self.procfs_path) if name.isdigit()
+        )
+
+    def process(self, pid: int) -> LinuxProcess:
+        """Get a process."""
+        return LinuxProcess(self, pid)
+
+    def process_iter(self) -> Iterator[LinuxProcess]:
+        """Every running process, reused between calls while it runs.
+
+        Each process's stat file is held while the caller handles it.
+        """
+        previous = self._processes
+        current: dict[int, LinuxProcess] = {}
+        self._processes = current
+        for pid in self.pids():
+            try:
+                stat = _read_stat(self.procfs_path, pid)
+            except (AccessDenied, NoSuchProcess):
+                continue
+            process = previous.get(pid)
+            if process is None or process._start != stat.start:
+                # New, or the pid was reused
+                process = LinuxProcess(self, pid, stat.start)
+            current[pid] = process
+            with process._cached(stat):  # pylint: disable=protected-access
+                yield process
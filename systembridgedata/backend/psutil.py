@@ -0,0 +1,153 @@
+"""psutil backend."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from typing import Any
+
+import psutil
+from psutil import (
+    Process,
+    boot_time,
+    cpu_count,
+    cpu_freq,
+    cpu_percent,
+    cpu_stats,
+    cpu_times,
+    cpu_times_percent,
+    disk_io_counters,
+    disk_partitions,
+    disk_usage,
+    getloadavg,
+    net_connections,
+    net_if_addrs,
+    net_if_stats,
+    net_io_counters,
+    pids,
+    process_iter,
+    swap_memory,
+    users,
+    virtual_memory,
+)
+from psutil._common import (
+    scpustats,
+    sdiskpart,
+    sdiskusage,
+    sfan,
+    shwtemp,
+    snicaddr,
+    snicstats,
+    suser,
+)
+
+from .base import Backend
+
+# Only on some platforms
+sensors_fans = getattr(psutil, "sensors_fans", None)
+sensors_temperatures = getattr(psutil, "sensors_temperatures", None)
+
+
+class PsutilBackend(Backend):
+    """Raw data from psutil, on every platform it supports."""
+
+    name = "psutil"
+
+    def boot_time(self) -> float:
+        """Boot time, in seconds since the epoch."""
+        return boot_time()
+
+    def cpu_count(self) -> int:
+        """Count logical CPUs."""
+        return cpu_count()
+
+    def cpu_freq(self, percpu: bool = False) -> Any:
+        """CPU frequencies, in MHz."""
+        return cpu_freq(percpu=percpu)
+
+    def cpu_percent(self, interval: float | None = None, percpu: bool = False) -> Any:
+        """CPU usage, over the interval or since the previous call."""
+        return cpu_percent(interval=interval, percpu=percpu)
+
+    def cpu_stats(self) -> scpustats:
+        """CPU context switches and interrupts."""
+        return cpu_stats()
+
+    def cpu_times(self, percpu: bool = False) -> Any:
+        """CPU times, in seconds."""
+        return cpu_times(percpu=percpu)
+
+    def cpu_times_percent(
+        self,
+        interval: float | None = None,
+        percpu: bool = False,
+    ) -> Any:
+        """CPU times usage, over the interval or since the previous call."""
+        return cpu_times_percent(interval=interval, percpu=percpu)
+
+    def getloadavg(self) -> tuple[float, float, float]:
+        """Load average over 1, 5 and 15 minutes."""
+        return getloadavg()
+
+    def virtual_memory(self) -> Any:
+        """Virtual memory."""
+        return virtual_memory()
+
+    def swap_memory(self) -> Any:
+        """Swap memory."""
+        return swap_memory()
+
+    def disk_io_counters(self, perdisk: bool = False) -> Any:
+        """Disk I/O counters, in total or per disk."""
+        return disk_io_counters(perdisk=perdisk)
+
+    def disk_partitions(self, all: bool = False) -> list[sdiskpart]:  # noqa: A002
+        """Mounted partitions."""
+        return disk_partitions(all=all)
+
+    def disk_usage(self, path: str) -> sdiskusage:
+        """Usage of the filesystem holding a path."""
+        return disk_usage(path)
+
+    def net_connections(self, kind: str = "inet") -> list:
+        """Network connections."""
+        return net_connections(kind)
+
+    def net_if_addrs(self) -> dict[str, list[snicaddr]]:
+        """Network interface addresses."""
+        return net_if_addrs()
+
+    def net_if_stats(self) -> dict[str, snicstats]:
+        """Network interface stats."""
+        return net_if_stats()
+
+    def net_io_counters(self, pernic: bool = False) -> Any:
+        """Network I/O counters, in total or per interface."""
+        return net_io_counters(pernic=pernic)
+
+    def pids(self) -> list[int]:
+        """Get the running process IDs."""
+        return pids()
+
+    def process(self, pid: int) -> Process:
+        """Get a process."""
+        return Process(pid)
+
+    def process_iter(self) -> Iterator[Process]:
+        """Every running process, reused between calls while it runs."""
+        return process_iter()
+
+    def sensors_fans(self) -> dict[str, list[sfan]] | None:
+        """Fan speeds, or None where not supported."""
+        if sensors_fans is None:
+            return None
+        return sensors_fans()
+
+    def sensors_temperatures(self) -> dict[str, list[shwtemp]] | None:
+        """Temperatures in celsius, or None where not supported."""
+        if sensors_temperatures is None:
+            return None
+        return sensors_temperatures(fahrenheit=False)
+
+    def users(self) -> list[suser]:
+        """Get the logged in users."""
+        return users()
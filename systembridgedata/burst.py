@@ -0,0 +1,300 @@
+"""Burst sampling of CPU and memory."""
+
+from __future__ import annotations
+
+from array import array
+from collections import deque
+from dataclasses import dataclass
+import math
+import os
+import threading
+import time
+from typing import Final
+
+from systembridgeshared.base import Base
+
+from .history import MetricHistory
+
+# Enough for the aggregate cpu line of /proc/stat, and the first lines of
+# /proc/meminfo, which hold MemTotal, MemFree and MemAvailable
+READ_SIZE: Final[int] = 512
+
+
+@dataclass(slots=True)
+class BurstSample:
+    """A CPU and memory sample."""
+
+    timestamp: float
+    cpu_usage: float
+    memory_usage: float
+
+
+@dataclass(slots=True)
+class BurstSummary:
+    """CPU and memory usage over one second of samples."""
+
+    # Start of the second, in seconds since the epoch
+    timestamp: float
+    samples: int
+    cpu_min: float
+    cpu_max: float
+    cpu_p99: float
+    memory_min: float
+    memory_max: float
+    memory_p99: float
+
+
+@dataclass(slots=True)
+class BurstOverhead:
+    """CPU time spent by the sampler itself."""
+
+    cpu_seconds: float
+    wall_seconds: float
+    # Of one CPU
+    percent: float
+    samples: int
+    # Samples skipped because the sampler fell behind
+    missed: int
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    """Nearest rank percentile of sorted values."""
+    return values[max(0, math.ceil(percentile / 100 * len(values)) - 1)]
+
+
+class BurstSampler(Base):
+    """Sample CPU and memory usage many times a second.
+
+    /proc/stat and /proc/meminfo are held open and re-read into preallocated
+    buffers, and samples go into fixed size rings, so a sample makes two
+    reads and allocates little. Samples are summarised per second as they
+    arrive. CPU usage is measured in clock ticks, usually 100 a second per
+    CPU, so with few CPUs and high rates each sample is coarse while the
+    per second summaries stay accurate.
+    """
+
+    def __init__(
+        self,
+        rate: float = 50.0,
+        buffer_seconds: float = 60.0,
+        summary_seconds: int = 3600,
+        procfs_path: str = "/proc",
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self.rate = rate
+        self._procfs_path = procfs_path
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._stat_fd: int | None = None
+        self._meminfo_fd: int | None = None
+        self._read_buffer = bytearray(READ_SIZE)
+
+        # Rings of raw samples
+        self._capacity = max(1, int(rate * buffer_seconds))
+        self._timestamps = array("d", bytes(8 * self._capacity))
+        self._cpu = array("d", bytes(8 * self._capacity))
+        self._memory = array("d", bytes(8 * self._capacity))
+        self._next = 0
+        self._count = 0
+
+        # The second being summarised, and its samples so far
+        self._second: int | None = None
+        self._second_cpu: list[float] = []
+        self._second_memory: list[float] = []
+        self._summaries: deque[BurstSummary] = deque(maxlen=summary_seconds)
+
+        # Busy and total CPU ticks at the previous sample
+        self._previous_cpu: tuple[int, int] | None = None
+
+        self._started: float | None = None
+        self._cpu_seconds = 0.0
+        self.samples = 0
+        self.missed = 0
+        self.history: MetricHistory | None = None
+
+    @property
+    def available(self) -> bool:
+        """Whether /proc/stat and /proc/meminfo can be read."""
+        return os.path.exists(os.path.join(self._procfs_path, "stat")) and (
+            os.path.exists(os.path.join(self._procfs_path, "meminfo"))
+        )
+
+    def _read(self, fd: int) -> bytes:
+        """Read the start of a held open file through the buffer."""
+        size = os.preadv(fd, [self._read_buffer], 0)
+        return bytes(memoryview(self._read_buffer)[:size])
+
+    def _read_cpu(self) -> float:
+        """Read CPU usage since the previous sample."""
+        data = self._read(self._stat_fd)  # type: ignore[arg-type]
+        ticks = [int(value) for value in data[: data.index(b"\n")].split()[1:9]]
+        # Guest time is already counted in user and nice
+        total = sum(ticks[:8])
+        busy = total - ticks[3] - ticks[4]
+        previous, self._previous_cpu = self._previous_cpu, (busy, total)
+        if previous is None or total <= previous[1]:
+            return 0.0
+        return (busy - previous[0]) / (total - previous[1]) * 100
+
+    def _read_memory(self) -> float:
+        """Read the percentage of memory in use."""
+        data = self._read(self._meminfo_fd)  # type: ignore[arg-type]
+        values: dict[bytes, int] = {}
+        for line in data.split(b"\n", 3)[:3]:
+            name, _, value = line.partition(b":")
+            values[name] = int(value.split()[0])
+        total = values[b"MemTotal"]
+        available = values.get(b"MemAvailable", values[b"MemFree"])
+        return (total - available) / total * 100 if total else 0.0
+
+    def _open(self) -> None:
+        """Open the files to sample."""
+        if self._stat_fd is None:
+            self._stat_fd = os.open(
+                os.path.join(self._procfs_path, "stat"), os.O_RDONLY | os.O_CLOEXEC
+            )
+            self._meminfo_fd = os.open(
+                os.path.join(self._procfs_path, "meminfo"),
+                os.O_RDONLY | os.O_CLOEXEC,
+            )
+
+    def sample(self, timestamp: float | None = None) -> BurstSample:
+        """Take a sample, summarising the previous second once it ends."""
+        self._open()
+        if timestamp is None:
+            timestamp = time.time()
+        cpu_usage = self._read_cpu()
+        memory_usage = self._read_memory()
+
+        with self._lock:
+            index = self._next
+            self._timestamps[index] = timestamp
+            self._cpu[index] = cpu_usage
+            self._memory[index] = memory_usage
+            self._next = (index + 1) % self._capacity
+            self._count = min(self._count + 1, self._capacity)
+
+            second = int(timestamp)
+            if second != self._second:
+                self._summarise()
+                self._second = second
+            self._second_cpu.append(cpu_usage)
+            self._second_memory.append(memory_usage)
+        self.samples += 1
+        return BurstSample(timestamp, cpu_usage, memory_usage)
+
+    def _summarise(self) -> None:
+        """Summarise the second being sampled."""
+        if self._second is None or not self._second_cpu:
+            return
+        cpu = sorted(self._second_cpu)
+        memory = sorted(self._second_memory)
+        summary = BurstSummary(
+            timestamp=float(self._second),
+            samples=len(cpu),
+            cpu_min=cpu[0],
+            cpu_max=cpu[-1],
+            cpu_p99=_percentile(cpu, 99),
+            memory_min=memory[0],
+            memory_max=memory[-1],
+            memory_p99=_percentile(memory, 99),
+        )
+        self._summaries.append(summary)
+        self._second_cpu.clear()
+        self._second_memory.clear()
+        if self.history is not None:
+            self.history.append_many(
+                {
+                    "burst.cpu.max": summary.cpu_max,
+                    "burst.cpu.p99": summary.cpu_p99,
+                    "burst.memory.max": summary.memory_max,
+                },
+                summary.timestamp,
+            )
+
+    def get_summaries(self, since: float | None = None) -> list[BurstSummary]:
+        """Get the summaries of the seconds starting at or after since."""
+        with self._lock:
+            return [
+                summary
+                for summary in self._summaries
+                if since is None or summary.timestamp >= since
+            ]
+
+    def get_samples(self, seconds: float | None = None) -> list[BurstSample]:
+        """Get the raw samples in the buffer, oldest first."""
+        with self._lock:
+            start = (self._next - self._count) % self._capacity
+            samples = [
+                BurstSample(
+                    self._timestamps[index], self._cpu[index], self._memory[index]
+                )
+                for index in (
+                    (start + offset) % self._capacity for offset in range(self._count)
+                )
+            ]
+        if seconds is not None and samples:
+            cutoff = samples[-1].timestamp - seconds
+            samples = [sample for sample in samples if sample.timestamp >= cutoff]
+        return samples
+
+    def get_overhead(self) -> BurstOverhead:
+        """Get the CPU time the sampling thread has spent."""
+        wall_seconds = (
+            time.monotonic() - self._started if self._started is not None else 0.0
+        )
+        return BurstOverhead(
+            cpu_seconds=self._cpu_seconds,
+            wall_seconds=wall_seconds,
+            percent=self._cpu_seconds / wall_seconds * 100 if wall_seconds else 0.0,
+            samples=self.samples,
+            missed=self.missed,
+        )
+
+    def start(self) -> None:
+        """Start sampling on a background thread."""
+        if self._thread is not None:
+            return
+        if not self.available:
+            self._logger.warning("Burst sampling needs %s", self._procfs_path)
+            return
+        self._open()
+        self._stopped.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(
+            target=self._run, name="BurstSampler", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Sample at the rate until stopped."""
+        interval = 1 / self.rate
+        thread_started = time.thread_time()
+        next_sample = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self.sample()
+            except (OSError, ValueError, IndexError) as error:
+                self._logger.warning("Burst sample failed: %s", error)
+            self._cpu_seconds = time.thread_time() - thread_started
+            next_sample += interval
+            now = time.monotonic()
+            if next_sample < now:
+                # Fell behind, so skip the missed samples rather than bunch up
+                missed = int((now - next_sample) / interval) + 1
+                self.missed += missed
+                next_sample += missed * interval
+            self._stopped.wait(next_sample - now)
+
+    def close(self) -> None:
+        """Stop sampling and close the files."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        for fd in (self._stat_fd, self._meminfo_fd):
+            if fd is not None:
+                os.close(fd)
+        self._stat_fd = self._meminfo_fd = None
@@ -0,0 +1,587 @@
+"""Compact binary snapshot codec."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+import dataclasses
+from enum import Enum
+import importlib
+import struct
+from typing import Any, Final
+import zlib
+
+MAGIC: Final[bytes] = b"SBC1"
+
+# magic, flags, schema fingerprint, sequence, base sequence
+HEADER: Final[struct.Struct] = struct.Struct("<4sBIII")
+FLAG_DELTA: Final[int] = 1
+
+DOUBLE: Final[struct.Struct] = struct.Struct("<d")
+
+# Value tags
+NONE: Final[int] = 0
+TRUE: Final[int] = 1
+FALSE: Final[int] = 2
+INT: Final[int] = 3
+FLOAT: Final[int] = 4
+STR: Final[int] = 5
+LIST: Final[int] = 6
+TUPLE: Final[int] = 7
+DICT: Final[int] = 8
+MODEL: Final[int] = 9
+MODEL_LIST: Final[int] = 10
+MODEL_DICT: Final[int] = 11
+COLUMN_LIST: Final[int] = 12
+
+# Column tags
+C_ANY: Final[int] = 0
+C_INT: Final[int] = 1
+C_FLOAT: Final[int] = 2
+C_STR: Final[int] = 3
+C_BOOL: Final[int] = 4
+C_MODEL: Final[int] = 5
+C_SAME: Final[int] = 6
+C_INT_DELTA: Final[int] = 7
+C_FLOAT_DELTA: Final[int] = 8
+
+# Largest values that fit a fixed width int64 column
+INT64_MIN: Final[int] = -(2**63)
+INT64_MAX: Final[int] = 2**63 - 1
+
+DEFAULT_MODEL_MODULES: Final[tuple[str, ...]] = (
+    "systembridgemodels.modules.cpu",
+    "systembridgemodels.modules.disks",
+    "systembridgemodels.modules.memory",
+    "systembridgemodels.modules.networks",
+    "systembridgemodels.modules.processes",
+    "systembridgemodels.modules.sensors",
+    "systembridgemodels.modules.system",
+    "systembridgedata.module.cgroup",
+)
+
+
+class Schema:
+    """Model classes known to both ends of the codec, in a fixed order."""
+
+    def __init__(self, classes: Iterable[type]) -> None:
+        """Initialise."""
+        self.classes: list[type] = sorted(
+            set(classes), key=lambda cls: f"{cls.__module__}.{cls.__qualname__}"
+        )
+        self.ids: dict[type, int] = {
+            cls: index for index, cls in enumerate(self.classes)
+        }
+        self.fields: list[tuple[str, ...]] = [
+            tuple(field.name for field in dataclasses.fields(cls))
+            for cls in self.classes
+        ]
+        self.fingerprint: int = zlib.crc32(
+            ";".join(
+                f"{cls.__qualname__}:{','.join(names)}"
+                for cls, names in zip(self.classes, self.fields, strict=True)
+            ).encode()
+        )
+
+
+def default_schema() -> Schema:
+    """Get the schema with every model this package produces."""
+    classes: list[type] = []
+    for module_name in DEFAULT_MODEL_MODULES:
+        module = importlib.import_module(module_name)
+        classes.extend(
+            value
+            for value in vars(module).values()
+            if isinstance(value, type)
+            and dataclasses.is_dataclass(value)
+            and value.__module__ == module_name
+        )
+    return Schema(classes)
+
+
+def _zigzag(value: int) -> int:
+    """Map signed to unsigned integers, keeping small magnitudes small."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    """Reverse of _zigzag."""
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def _column_kind(values: list[Any]) -> int:
+    """Pick the most compact column type that keeps the values exact."""
+    kind: int | None = None
+    for value in values:
+        if value is None:
+            continue
+        value_type = type(value)
+        if value_type is bool:
+            value_kind = C_BOOL
+        elif value_type is int:
+            if not INT64_MIN <= value <= INT64_MAX:
+                return C_ANY
+            value_kind = C_INT
+        elif value_type is float:
+            value_kind = C_FLOAT
+        elif value_type is str:
+            value_kind = C_STR
+        elif dataclasses.is_dataclass(value):
+            value_kind = C_MODEL
+        else:
+            return C_ANY
+        if kind is None:
+            kind = value_kind
+        elif kind != value_kind:
+            return C_ANY
+    if kind == C_MODEL:
+        model_types = {type(value) for value in values if value is not None}
+        if len(model_types) != 1:
+            return C_ANY
+    return C_ANY if kind is None else kind
+
+
+def _id_width(count: int) -> str:
+    """Get the narrowest struct format for ids below count."""
+    if count <= 0xFF:
+        return "B"
+    if count <= 0xFFFF:
+        return "H"
+    return "I"
+
+
+def _bitmap(flags: list[bool]) -> bytes:
+    """Pack flags into a bitmap."""
+    bitmap = bytearray((len(flags) + 7) // 8)
+    for index, flag in enumerate(flags):
+        if flag:
+            bitmap[index >> 3] |= 1 << (index & 7)
+    return bytes(bitmap)
+
+
+def _unbitmap(data: bytes | memoryview, count: int) -> list[bool]:
+    """Unpack a bitmap into flags."""
+    return [bool(data[index >> 3] & (1 << (index & 7))) for index in range(count)]
+
+
+class SnapshotEncoder:
+    """Encode snapshots of model objects into compact binary frames.
+
+    With delta enabled, numeric columns are encoded against the previous frame:
+    unchanged columns cost one byte, integer counters are written as variable
+    length differences and float columns only carry the changed values.
+    """
+
+    def __init__(
+        self,
+        schema: Schema | None = None,
+        delta: bool = False,
+        key_frame_interval: int = 60,
+    ) -> None:
+        """Initialise."""
+        self._schema = schema or default_schema()
+        self._delta = delta
+        self._key_frame_interval = key_frame_interval
+        self._sequence = 0
+        self._columns: dict[str, tuple[int, list[Any]]] = {}
+        self._previous_columns: dict[str, tuple[int, list[Any]]] = {}
+        self._buffer = bytearray()
+        self._strings: dict[str, int] = {}
+
+    def encode(self, snapshot: Any) -> bytes:
+        """Encode a snapshot, usually a dict of module name to model data."""
+        self._sequence += 1
+        use_delta = (
+            self._delta
+            and self._sequence > 1
+            and (self._sequence - 1) % self._key_frame_interval != 0
+        )
+        self._previous_columns = self._columns if use_delta else {}
+        self._columns = {}
+        self._buffer = bytearray()
+        self._strings = {}
+
+        self._value(snapshot, "")
+
+        header = bytearray(
+            HEADER.pack(
+                MAGIC,
+                FLAG_DELTA if use_delta else 0,
+                self._schema.fingerprint,
+                self._sequence,
+                self._sequence - 1 if use_delta else 0,
+            )
+        )
+        self._write_varint(len(self._strings), header)
+        for string in self._strings:
+            encoded = string.encode()
+            self._write_varint(len(encoded), header)
+            header += encoded
+        return bytes(header + self._buffer)
+
+    def _write_varint(self, value: int, buffer: bytearray | None = None) -> None:
+        """Write an unsigned LEB128 integer."""
+        if buffer is None:
+            buffer = self._buffer
+        while value > 0x7F:
+            buffer.append((value & 0x7F) | 0x80)
+            value >>= 7
+        buffer.append(value)
+
+    def _string_id(self, value: str) -> int:
+        """Intern a string, returning its id in the frame's string table."""
+        if (string_id := self._strings.get(value)) is None:
+            string_id = self._strings[value] = len(self._strings)
+        return string_id
+
+    def _model_id(self, value: Any) -> int:
+        """Get the schema id of a model class, or the model it extends."""
+        ids = self._schema.ids
+        for cls in type(value).__mro__:
+            if (model_id := ids.get(cls)) is not None:
+                return model_id
+        raise TypeError(f"{type(value).__qualname__} is not in the snapshot schema")
+
+    def _value(self, value: Any, path: str) -> None:
+        """Write a single value."""
+        buffer = self._buffer
+        value_type = type(value)
+        if value is None:
+            buffer.append(NONE)
+        elif value_type is bool:
+            buffer.append(TRUE if value else FALSE)
+        elif value_type is int:
+            buffer.append(INT)
+            self._write_varint(_zigzag(value))
+        elif value_type is float:
+            buffer.append(FLOAT)
+            buffer += DOUBLE.pack(value)
+        elif isinstance(value, str):
+            buffer.append(STR)
+            self._write_varint(self._string_id(str(value)))
+        elif isinstance(value, Enum):
+            self._value(value.value, path)
+        elif dataclasses.is_dataclass(value):
+            model_id = self._model_id(value)
+            buffer.append(MODEL)
+            self._write_varint(model_id)
+            for name in self._schema.fields[model_id]:
+                self._value(getattr(value, name), f"{path}.{name}")
+        elif isinstance(value, (list, tuple)):
+            self._sequence_value(value, path)
+        elif isinstance(value, dict):
+            self._dict_value(value, path)
+        else:
+            raise TypeError(f"Cannot encode {value_type.__qualname__}")
+
+    def _sequence_value(self, value: list | tuple, path: str) -> None:
+        """Write a list or tuple, as columns when homogeneous."""
+        if isinstance(value, list) and value:
+            kind = _column_kind(value)
+            if kind == C_MODEL and None not in value:
+                model_id = self._model_id(value[0])
+                self._buffer.append(MODEL_LIST)
+                self._write_varint(model_id)
+                self._write_varint(len(value))
+                self._model_columns(model_id, value, path)
+                return
+            if kind in (C_INT, C_FLOAT, C_STR, C_BOOL):
+                self._buffer.append(COLUMN_LIST)
+                self._write_varint(len(value))
+                self._column(value, f"{path}[]")
+                return
+        self._buffer.append(TUPLE if isinstance(value, tuple) else LIST)
+        self._write_varint(len(value))
+        for index, item in enumerate(value):
+            self._value(item, f"{path}[{index}]")
+
+    def _dict_value(self, value: dict, path: str) -> None:
+        """Write a dict, as columns when the values are models of one type."""
+        for key in value:
+            if not isinstance(key, str):
+                raise TypeError("Dict keys must be strings")
+        items = list(value.values())
+        if items and _column_kind(items) == C_MODEL and None not in items:
+            model_id = self._model_id(items[0])
+            self._buffer.append(MODEL_DICT)
+            self._write_varint(model_id)
+            self._write_varint(len(items))
+            self._column(list(value), f"{path}{{}}")
+            self._model_columns(model_id, items, path)
+            return
+        self._buffer.append(DICT)
+        self._write_varint(len(value))
+        for key, item in value.items():
+            self._write_varint(self._string_id(key))
+            self._value(item, f"{path}.{key}")
+
+    def _model_columns(self, model_id: int, items: list[Any], path: str) -> None:
+        """Write the fields of same-typed models as columns."""
+        for name in self._schema.fields[model_id]:
+            self._column([getattr(item, name) for item in items], f"{path}[].{name}")
+
+    def _column(self, values: list[Any], path: str) -> None:
+        """Write a column of values."""
+        buffer = self._buffer
+        kind = _column_kind(values)
+        self._columns[path] = (kind, values)
+        previous_kind, previous = self._previous_columns.get(path, (None, None))
+        nulls = [value is None for value in values]
+        has_nulls = any(nulls)
+
+        if (
+            previous is not None
+            and previous_kind == kind
+            and kind in (C_INT, C_FLOAT, C_STR, C_BOOL)
+            and len(previous) == len(values)
+        ):
+            if previous == values:
+                buffer.append(C_SAME)
+                return
+            if kind in (C_INT, C_FLOAT) and not has_nulls and None not in previous:
+                if kind == C_INT:
+                    buffer.append(C_INT_DELTA)
+                    for value, old in zip(values, previous, strict=True):
+                        self._write_varint(_zigzag(value - old))
+                else:
+                    buffer.append(C_FLOAT_DELTA)
+                    changed = [
+                        value != old
+                        for value, old in zip(values, previous, strict=True)
+                    ]
+                    buffer += _bitmap(changed)
+                    changed_values = [
+                        value
+                        for value, is_changed in zip(values, changed, strict=True)
+                        if is_changed
+                    ]
+                    buffer += struct.pack(f"<{len(changed_values)}d", *changed_values)
+                return
+
+        buffer.append(kind)
+        if kind == C_ANY:
+            for index, value in enumerate(values):
+                self._value(value, f"{path}[{index}]")
+            return
+
+        buffer.append(1 if has_nulls else 0)
+        if has_nulls:
+            buffer += _bitmap(nulls)
+        present = [value for value in values if value is not None]
+        if kind == C_INT:
+            buffer += struct.pack(f"<{len(present)}q", *present)
+        elif kind == C_FLOAT:
+            buffer += struct.pack(f"<{len(present)}d", *present)
+        elif kind == C_STR:
+            # Fixed width string ids, as narrow as the string table allows
+            string_ids = [self._string_id(value) for value in present]
+            width = _id_width(len(self._strings))
+            buffer.append(ord(width))
+            buffer += struct.pack(f"<{len(string_ids)}{width}", *string_ids)
+        elif kind == C_BOOL:
+            buffer += _bitmap(present)
+        elif kind == C_MODEL:
+            model_id = self._model_id(present[0])
+            self._write_varint(model_id)
+            self._model_columns(model_id, present, path)
+
+
+class SnapshotDecoder:
+    """Decode frames produced by SnapshotEncoder."""
+
+    def __init__(self, schema: Schema | None = None) -> None:
+        """Initialise."""
+        self._schema = schema or default_schema()
+        self._sequence = 0
+        self._columns: dict[str, list[Any]] = {}
+        self._previous_columns: dict[str, list[Any]] = {}
+        self._data: memoryview = memoryview(b"")
+        self._offset = 0
+        self._strings: list[str] = []
+
+    def decode(self, frame: bytes) -> Any:
+        """Decode a frame. Delta frames need the previous frame decoded first."""
+        magic, flags, fingerprint, sequence, base = HEADER.unpack_from(frame, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a snapshot frame")
+        if fingerprint != self._schema.fingerprint:
+            raise ValueError("Snapshot schema does not match")
+        if flags & FLAG_DELTA and base != self._sequence:
+            raise ValueError(
+                f"Delta frame {sequence} needs frame {base}, last was {self._sequence}"
+            )
+
+        self._previous_columns = self._columns if flags & FLAG_DELTA else {}
+        self._columns = {}
+        self._data = memoryview(frame)
+        self._offset = HEADER.size
+        self._strings = []
+        for _ in range(self._read_varint()):
+            length = self._read_varint()
+            self._strings.append(
+                str(self._data[self._offset : self._offset + length], "utf-8")
+            )
+            self._offset += length
+
+        value = self._value("")
+        self._sequence = sequence
+        self._data = memoryview(b"")
+        return value
+
+    def _read_varint(self) -> int:
+        """Read an unsigned LEB128 integer."""
+        data = self._data
+        result = 0
+        shift = 0
+        while True:
+            byte = data[self._offset]
+            self._offset += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    def _read_byte(self) -> int:
+        """Read a single byte."""
+        byte = self._data[self._offset]
+        self._offset += 1
+        return byte
+
+    def _read_bytes(self, length: int) -> memoryview:
+        """Read a run of bytes."""
+        data = self._data[self._offset : self._offset + length]
+        self._offset += length
+        return data
+
+    def _new_model(self, model_id: int) -> Any:
+        """Create a model without running its initialiser."""
+        return object.__new__(self._schema.classes[model_id])
+
+    def _value(self, path: str) -> Any:
+        """Read a single value."""
+        tag = self._read_byte()
+        if tag == NONE:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == INT:
+            return _unzigzag(self._read_varint())
+        if tag == FLOAT:
+            (value,) = DOUBLE.unpack_from(self._data, self._offset)
+            self._offset += DOUBLE.size
+            return value
+        if tag == STR:
+            return self._strings[self._read_varint()]
+        if tag == MODEL:
+            model_id = self._read_varint()
+            model = self._new_model(model_id)
+            for name in self._schema.fields[model_id]:
+                setattr(model, name, self._value(f"{path}.{name}"))
+            return model
+        if tag in (LIST, TUPLE):
+            items = [
+                self._value(f"{path}[{index}]") for index in range(self._read_varint())
+            ]
+            return tuple(items) if tag == TUPLE else items
+        if tag == DICT:
+            result: dict[str, Any] = {}
+            for _ in range(self._read_varint()):
+                key = self._strings[self._read_varint()]
+                result[key] = self._value(f"{path}.{key}")
+            return result
+        if tag == COLUMN_LIST:
+            return self._column(self._read_varint(), f"{path}[]")
+        if tag == MODEL_LIST:
+            model_id = self._read_varint()
+            count = self._read_varint()
+            return self._model_columns(model_id, count, path)
+        if tag == MODEL_DICT:
+            model_id = self._read_varint()
+            count = self._read_varint()
+            keys = self._column(count, f"{path}{{}}")
+            return dict(
+                zip(keys, self._model_columns(model_id, count, path), strict=True)
+            )
+        raise ValueError(f"Unknown value tag: {tag}")
+
+    def _model_columns(self, model_id: int, count: int, path: str) -> list[Any]:
+        """Read columns back into models."""
+        models = [self._new_model(model_id) for _ in range(count)]
+        for name in self._schema.fields[model_id]:
+            for model, value in zip(
+                models, self._column(count, f"{path}[].{name}"), strict=True
+            ):
+                setattr(model, name, value)
+        return models
+
+    def _column(self, count: int, path: str) -> list[Any]:
+        """Read a column of values."""
+        kind = self._read_byte()
+        values: list[Any]
+        if kind == C_SAME:
+            values = list(self._previous_columns[path])
+        elif kind == C_INT_DELTA:
+            values = [
+                old + _unzigzag(self._read_varint())
+                for old in self._previous_columns[path]
+            ]
+        elif kind == C_FLOAT_DELTA:
+            previous = self._previous_columns[path]
+            changed = _unbitmap(self._read_bytes((count + 7) // 8), count)
+            changed_count = sum(changed)
+            changed_values = iter(
+                struct.unpack(f"<{changed_count}d", self._read_bytes(changed_count * 8))
+            )
+            values = [
+                next(changed_values) if is_changed else old
+                for old, is_changed in zip(previous, changed, strict=True)
+            ]
+        elif kind == C_ANY:
+            values = [self._value(f"{path}[{index}]") for index in range(count)]
+        else:
+            nulls = (
+                _unbitmap(self._read_bytes((count + 7) // 8), count)
+                if self._read_byte()
+                else [False] * count
+            )
+            present_count = count - sum(nulls)
+            present: list[Any]
+            if kind == C_INT:
+                present = list(
+                    struct.unpack(
+                        f"<{present_count}q", self._read_bytes(present_count * 8)
+                    )
+                )
+            elif kind == C_FLOAT:
+                present = list(
+                    struct.unpack(
+                        f"<{present_count}d", self._read_bytes(present_count * 8)
+                    )
+                )
+            elif kind == C_STR:
+                width = chr(self._read_byte())
+                strings = self._strings
+                present = [
+                    strings[string_id]
+                    for string_id in struct.unpack(
+                        f"<{present_count}{width}",
+                        self._read_bytes(present_count * struct.calcsize(width)),
+                    )
+                ]
+            elif kind == C_BOOL:
+                present = _unbitmap(
+                    self._read_bytes((present_count + 7) // 8), present_count
+                )
+            elif kind == C_MODEL:
+                present = self._model_columns(self._read_varint(), present_count, path)
+            else:
+                raise ValueError(f"Unknown column tag: {kind}")
+            if present_count == count:
+                values = present
+            else:
+                present_values = iter(present)
+                values = [None if null else next(present_values) for null in nulls]
+
+        self._columns[path] = values
+        return values
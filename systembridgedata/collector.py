@@ -0,0 +1,540 @@
+"""Out-of-process collector publishing snapshots through shared memory."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+import logging
+import math
+import multiprocessing
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.synchronize import Event
+import struct
+import time
+from typing import Final
+
+from systembridgeshared.base import Base
+
+from .module.cgroup import Cgroup
+from .module.cpu import CPU
+from .module.disks import Disks
+from .module.memory import Memory
+from .module.networks import Networks
+from .module.processes import Processes
+from .module.sensors import Sensors
+
+_LOGGER = logging.getLogger(__name__)
+
+MAGIC: Final[bytes] = b"SBDS"
+LAYOUT_VERSION: Final[int] = 1
+DEFAULT_SIZE: Final[int] = 16 * 1024 * 1024
+
+# magic, layout version, section count, sequence, version, collected at, length
+HEADER: Final[struct.Struct] = struct.Struct("<4sHHQQdI4x")
+SEQUENCE: Final[struct.Struct] = struct.Struct("<Q")
+SEQUENCE_OFFSET: Final[int] = 8
+SECTION: Final[struct.Struct] = struct.Struct("<II")
+COUNT: Final[struct.Struct] = struct.Struct("<I")
+DOUBLE: Final[struct.Struct] = struct.Struct("<d")
+STRING_LENGTH: Final[struct.Struct] = struct.Struct("<H")
+MAX_STRING_LENGTH: Final[int] = 65535
+
+PARTITION: Final[struct.Struct] = struct.Struct("<QQQd")
+PROCESS: Final[struct.Struct] = struct.Struct("<qdd")
+CONNECTION: Final[struct.Struct] = struct.Struct("<BBq")
+
+SCALARS: Final[tuple[str, ...]] = (
+    "cpu_usage",
+    "cpu_frequency",
+    "cpu_load_average",
+    "memory_total",
+    "memory_available",
+    "memory_used",
+    "memory_percent",
+    "swap_total",
+    "swap_used",
+    "swap_percent",
+    "disk_read_bytes",
+    "disk_write_bytes",
+    "network_bytes_sent",
+    "network_bytes_recv",
+)
+
+SECTIONS: Final[tuple[str, ...]] = (
+    "scalars",
+    "per_cpu_usage",
+    "partitions",
+    "processes",
+    "connections",
+    "sensors",
+)
+
+READ_RETRIES: Final[int] = 100
+
+
+@dataclass(slots=True)
+class CollectorData:
+    """Data gathered by one collection cycle."""
+
+    scalars: dict[str, float | None] = field(default_factory=dict)
+    per_cpu_usage: list[float] = field(default_factory=list)
+    # (device, mount point, total, used, free, percent)
+    partitions: list[tuple[str, str, int, int, int, float]] = field(
+        default_factory=list
+    )
+    # (pid, cpu usage, memory usage, name)
+    processes: list[tuple[int, float, float, str]] = field(default_factory=list)
+    # (family, type, pid, status, local address, remote address)
+    connections: list[tuple[int, int, int, str, str, str]] = field(default_factory=list)
+    # (group, name, type, value)
+    sensors: list[tuple[str, str, str, float]] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class CollectorSnapshot:
+    """Snapshot read from shared memory."""
+
+    version: int
+    collected_at: float
+    data: CollectorData
+
+
+def _pack_string(buffer: bytearray, value: str | None) -> None:
+    """Append a length prefixed string, truncated to fit its length."""
+    encoded = (value or "").encode()
+    if len(encoded) > MAX_STRING_LENGTH:
+        # Cut on a character boundary, so the string still decodes
+        encoded = encoded[:MAX_STRING_LENGTH].decode(errors="ignore").encode()
+    buffer += STRING_LENGTH.pack(len(encoded))
+    buffer += encoded
+
+
+def _unpack_string(buffer: memoryview, offset: int) -> tuple[str, int]:
+    """Read a length prefixed string."""
+    (length,) = STRING_LENGTH.unpack_from(buffer, offset)
+    offset += STRING_LENGTH.size
+    return (str(buffer[offset : offset + length], "utf-8"), offset + length)
+
+
+def _optional(value: float | None) -> float:
+    """Encode a missing number as NaN."""
+    return math.nan if value is None else float(value)
+
+
+def encode_data(data: CollectorData) -> bytes:
+    """Encode collected data into the compact binary layout."""
+    sections: list[bytearray] = [bytearray() for _ in SECTIONS]
+    scalars, per_cpu, partitions, processes, connections, sensors = sections
+
+    for key in SCALARS:
+        scalars += DOUBLE.pack(_optional(data.scalars.get(key)))
+
+    per_cpu += COUNT.pack(len(data.per_cpu_usage))
+    per_cpu += struct.pack(f"<{len(data.per_cpu_usage)}d", *data.per_cpu_usage)
+
+    partitions += COUNT.pack(len(data.partitions))
+    for device, mount_point, total, used, free, percent in data.partitions:
+        partitions += PARTITION.pack(total, used, free, percent)
+        _pack_string(partitions, device)
+        _pack_string(partitions, mount_point)
+
+    processes += COUNT.pack(len(data.processes))
+    for pid, cpu_usage, memory_usage, name in data.processes:
+        processes += PROCESS.pack(pid, cpu_usage, memory_usage)
+        _pack_string(processes, name)
+
+    connections += COUNT.pack(len(data.connections))
+    for family, kind, pid, status, laddr, raddr in data.connections:
+        connections += CONNECTION.pack(family, kind, pid)
+        _pack_string(connections, status)
+        _pack_string(connections, laddr)
+        _pack_string(connections, raddr)
+
+    sensors += COUNT.pack(len(data.sensors))
+    for group, name, kind, value in data.sensors:
+        sensors += DOUBLE.pack(value)
+        _pack_string(sensors, group)
+        _pack_string(sensors, name)
+        _pack_string(sensors, kind)
+
+    # Section table, then the sections
+    payload = bytearray()
+    offset = SECTION.size * len(sections)
+    for section in sections:
+        payload += SECTION.pack(offset, len(section))
+        offset += len(section)
+    for section in sections:
+        payload += section
+    return bytes(payload)
+
+
+def decode_data(
+    buffer: memoryview, sections: tuple[str, ...] = SECTIONS
+) -> CollectorData:
+    """Decode the requested sections straight from a buffer."""
+    data = CollectorData()
+    offsets = {
+        name: SECTION.unpack_from(buffer, index * SECTION.size)[0]
+        for index, name in enumerate(SECTIONS)
+    }
+
+    if "scalars" in sections:
+        offset = offsets["scalars"]
+        for key in SCALARS:
+            (value,) = DOUBLE.unpack_from(buffer, offset)
+            data.scalars[key] = None if math.isnan(value) else value
+            offset += DOUBLE.size
+
+    if "per_cpu_usage" in sections:
+        offset = offsets["per_cpu_usage"]
+        (count,) = COUNT.unpack_from(buffer, offset)
+        data.per_cpu_usage = list(
+            struct.unpack_from(f"<{count}d", buffer, offset + COUNT.size)
+        )
+
+    if "partitions" in sections:
+        offset = offsets["partitions"]
+        (count,) = COUNT.unpack_from(buffer, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            total, used, free, percent = PARTITION.unpack_from(buffer, offset)
+            device, offset = _unpack_string(buffer, offset + PARTITION.size)
+            mount_point, offset = _unpack_string(buffer, offset)
+            data.partitions.append((device, mount_point, total, used, free, percent))
+
+    if "processes" in sections:
+        offset = offsets["processes"]
+        (count,) = COUNT.unpack_from(buffer, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            pid, cpu_usage, memory_usage = PROCESS.unpack_from(buffer, offset)
+            name, offset = _unpack_string(buffer, offset + PROCESS.size)
+            data.processes.append((pid, cpu_usage, memory_usage, name))
+
+    if "connections" in sections:
+        offset = offsets["connections"]
+        (count,) = COUNT.unpack_from(buffer, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            family, kind, pid = CONNECTION.unpack_from(buffer, offset)
+            status, offset = _unpack_string(buffer, offset + CONNECTION.size)
+            laddr, offset = _unpack_string(buffer, offset)
+            raddr, offset = _unpack_string(buffer, offset)
+            data.connections.append((family, kind, pid, status, laddr, raddr))
+
+    if "sensors" in sections:
+        offset = offsets["sensors"]
+        (count,) = COUNT.unpack_from(buffer, offset)
+        offset += COUNT.size
+        for _ in range(count):
+            (value,) = DOUBLE.unpack_from(buffer, offset)
+            group, offset = _unpack_string(buffer, offset + DOUBLE.size)
+            name, offset = _unpack_string(buffer, offset)
+            kind, offset = _unpack_string(buffer, offset)
+            data.sensors.append((group, name, kind, value))
+
+    return data
+
+
+class SnapshotWriter:
+    """Write snapshots into a shared memory segment under a seqlock."""
+
+    def __init__(self, shared_memory: SharedMemory) -> None:
+        """Initialise."""
+        self._shared_memory = shared_memory
+        self._version = 0
+
+    def write(self, payload: bytes, collected_at: float) -> bool:
+        """Publish a payload, returns False if it does not fit."""
+        buffer = self._shared_memory.buf
+        if HEADER.size + len(payload) > len(buffer):
+            return False
+        (sequence,) = SEQUENCE.unpack_from(buffer, SEQUENCE_OFFSET)
+        # An odd sequence marks a write in progress
+        SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, sequence + 1)
+        self._version += 1
+        buffer[HEADER.size : HEADER.size + len(payload)] = payload
+        HEADER.pack_into(
+            buffer,
+            0,
+            MAGIC,
+            LAYOUT_VERSION,
+            len(SECTIONS),
+            sequence + 1,
+            self._version,
+            collected_at,
+            len(payload),
+        )
+        SEQUENCE.pack_into(buffer, SEQUENCE_OFFSET, sequence + 2)
+        return True
+
+
+class SnapshotReader(Base):
+    """Read the latest snapshot from a shared memory segment."""
+
+    def __init__(self, shared_memory: SharedMemory) -> None:
+        """Initialise."""
+        super().__init__()
+        self._shared_memory = shared_memory
+        # Last consistent snapshot per sections read, for when a write is
+        # in progress for longer than the retries
+        self._last: dict[tuple[str, ...], CollectorSnapshot] = {}
+        self.torn_reads = 0
+
+    @property
+    def version(self) -> int:
+        """Version of the latest published snapshot, 0 if none."""
+        buffer = self._shared_memory.buf
+        magic, _, _, _, version, _, _ = HEADER.unpack_from(buffer, 0)
+        return version if magic == MAGIC else 0
+
+    def read(self, sections: tuple[str, ...] = SECTIONS) -> CollectorSnapshot | None:
+        """Read the latest snapshot, retrying reads torn by a concurrent write.
+
+        If every retry is torn, the last consistent snapshot is returned.
+        """
+        buffer = self._shared_memory.buf
+        for _ in range(READ_RETRIES):
+            (before,) = SEQUENCE.unpack_from(buffer, SEQUENCE_OFFSET)
+            if before & 1:
+                self.torn_reads += 1
+                time.sleep(0)
+                continue
+            magic, layout, _, _, version, collected_at, length = HEADER.unpack_from(
+                buffer, 0
+            )
+            if magic != MAGIC:
+                return None
+            if layout != LAYOUT_VERSION:
+                self._logger.error("Unsupported snapshot layout: %s", layout)
+                return None
+            try:
+                data = decode_data(buffer[HEADER.size : HEADER.size + length], sections)
+            except (struct.error, UnicodeDecodeError, ValueError):
+                data = None
+            (after,) = SEQUENCE.unpack_from(buffer, SEQUENCE_OFFSET)
+            if data is not None and after == before:
+                snapshot = self._last[sections] = CollectorSnapshot(
+                    version=version,
+                    collected_at=collected_at,
+                    data=data,
+                )
+                return snapshot
+            self.torn_reads += 1
+        snapshot = self._last.get(sections)
+        self._logger.warning(
+            "Could not get a consistent snapshot, returning version %s",
+            snapshot.version if snapshot is not None else None,
+        )
+        return snapshot
+
+
+def _collect_cpu(data: CollectorData, cpu: CPU) -> None:
+    """Collect CPU data."""
+    # Non-blocking: usage since the previous cycle
+    data.scalars["cpu_usage"] = cpu.get_usage(interval=None)
+    data.per_cpu_usage = list(cpu.get_usage_per_cpu(interval=None))
+    data.scalars["cpu_frequency"] = cpu.get_frequency().current
+    data.scalars["cpu_load_average"] = cpu.get_load_average()
+
+
+def _collect_memory(data: CollectorData, memory: Memory) -> None:
+    """Collect memory data."""
+    virtual = memory.get_virtual()
+    data.scalars["memory_total"] = virtual.total
+    data.scalars["memory_available"] = virtual.available
+    data.scalars["memory_used"] = virtual.used
+    data.scalars["memory_percent"] = virtual.percent
+    swap = memory.get_swap()
+    data.scalars["swap_total"] = swap.total
+    data.scalars["swap_used"] = swap.used
+    data.scalars["swap_percent"] = swap.percent
+
+
+def _collect_disks(data: CollectorData, disks: Disks) -> None:
+    """Collect disks data."""
+    if (disk_io := disks.get_io_counters()) is not None:
+        data.scalars["disk_read_bytes"] = disk_io.read_bytes
+        data.scalars["disk_write_bytes"] = disk_io.write_bytes
+    for partition in disks.get_partitions():
+        if partition.usage is not None:
+            data.partitions.append(
+                (
+                    partition.device,
+                    partition.mount_point,
+                    partition.usage.total,
+                    partition.usage.used,
+                    partition.usage.free,
+                    partition.usage.percent,
+                )
+            )
+
+
+def _collect_networks(data: CollectorData, networks: Networks) -> None:
+    """Collect networks data."""
+    network_io = networks.get_io_counters()
+    data.scalars["network_bytes_sent"] = network_io.bytes_sent
+    data.scalars["network_bytes_recv"] = network_io.bytes_recv
+    for connection in networks.get_connections():
+        data.connections.append(
+            (
+                int(connection.family or 0),
+                int(connection.type or 0),
+                connection.pid if connection.pid is not None else -1,
+                connection.status or "",
+                connection.laddr or "",
+                connection.raddr or "",
+            )
+        )
+
+
+def _collect_processes(data: CollectorData, processes: Processes) -> None:
+    """Collect processes data."""
+    for process in processes.get_processes():
+        data.processes.append(
+            (
+                int(process.id),
+                process.cpu_usage or 0.0,
+                process.memory_usage or 0.0,
+                process.name or "",
+            )
+        )
+
+
+def _collect_sensors(data: CollectorData, sensors: Sensors) -> None:
+    """Collect sensors data."""
+    for group, items in (sensors.get_temperatures() or {}).items():
+        for item in items:
+            data.sensors.append((group, item.label, "temperature", item.current))
+    for group, items in (sensors.get_fans() or {}).items():
+        for item in items:
+            data.sensors.append((group, item.label, "fan", float(item.current)))
+    if (windows_sensors := sensors.get_windows_sensors()) is not None:
+        for hardware in windows_sensors.get("hardware") or []:
+            for sensor in hardware.get("sensors") or []:
+                if isinstance(value := sensor.get("value"), (int, float)):
+                    data.sensors.append(
+                        (
+                            hardware.get("name", ""),
+                            sensor.get("name", ""),
+                            sensor.get("type", ""),
+                            float(value),
+                        )
+                    )
+
+
+def collect(
+    cpu: CPU,
+    disks: Disks,
+    memory: Memory,
+    networks: Networks,
+    processes: Processes,
+    sensors: Sensors,
+) -> CollectorData:
+    """Run one collection cycle with the data modules."""
+    data = CollectorData()
+    for collect_source, module in (
+        (_collect_cpu, cpu),
+        (_collect_memory, memory),
+        (_collect_disks, disks),
+        (_collect_networks, networks),
+        (_collect_processes, processes),
+        (_collect_sensors, sensors),
+    ):
+        try:
+            collect_source(data, module)  # type: ignore[operator]
+        except Exception as exception:  # pylint: disable=broad-except
+            # A failing source must not stop the others from publishing
+            _LOGGER.error(
+                "Error collecting %s", type(module).__name__, exc_info=exception
+            )
+    return data
+
+
+def _run_collector(name: str, interval: float, stop_event: Event) -> None:
+    """Collector process entry point."""
+    shared_memory = SharedMemory(name=name)
+    writer = SnapshotWriter(shared_memory)
+    # Models are copied into the snapshot straight away, so reuse them
+    cgroup = Cgroup()
+    modules = (
+        CPU(cgroup=cgroup, reuse=True),
+        Disks(reuse=True),
+        Memory(cgroup=cgroup),
+        Networks(reuse=True),
+        Processes(reuse=True),
+        Sensors(),
+    )
+    try:
+        while not stop_event.is_set():
+            started = time.monotonic()
+            payload = encode_data(collect(*modules))
+            if not writer.write(payload, time.time()):
+                _LOGGER.warning("Snapshot too large: %s bytes", len(payload))
+            stop_event.wait(max(interval - (time.monotonic() - started), 0))
+    finally:
+        shared_memory.close()
+
+
+class Collector(Base):
+    """Run the data modules in a dedicated child process."""
+
+    def __init__(
+        self,
+        interval: float = 5.0,
+        size: int = DEFAULT_SIZE,
+        target: Callable[[str, float, Event], None] = _run_collector,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._interval = interval
+        self._size = size
+        self._target = target
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self._process: multiprocessing.process.BaseProcess | None = None
+        self._shared_memory: SharedMemory | None = None
+        self._reader: SnapshotReader | None = None
+
+    @property
+    def running(self) -> bool:
+        """Is the collector process running."""
+        return self._process is not None and self._process.is_alive()
+
+    def read(self, sections: tuple[str, ...] = SECTIONS) -> CollectorSnapshot | None:
+        """Read the latest snapshot."""
+        if self._reader is None:
+            return None
+        return self._reader.read(sections)
+
+    def start(self) -> None:
+        """Start the collector process."""
+        if self._process is not None:
+            return
+        self._shared_memory = SharedMemory(create=True, size=self._size)
+        self._reader = SnapshotReader(self._shared_memory)
+        self._stop_event.clear()
+        self._process = self._context.Process(
+            target=self._target,
+            args=(self._shared_memory.name, self._interval, self._stop_event),
+            name="systembridge-collector",
+            daemon=True,
+        )
+        self._process.start()
+        self._logger.info("Collector started: %s", self._shared_memory.name)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Stop the collector process and release the shared memory."""
+        if self._process is not None:
+            self._stop_event.set()
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._logger.warning("Collector did not stop, terminating")
+                self._process.terminate()
+                self._process.join()
+            self._process = None
+        self._reader = None
+        if self._shared_memory is not None:
+            self._shared_memory.close()
+            self._shared_memory.unlink()
+            self._shared_memory = None
@@ -0,0 +1,171 @@
+"""Deadline bounded collection cycles."""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from collections.abc import Awaitable, Callable
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from dataclasses import dataclass
+import inspect
+import threading
+import time
+from typing import Any, Final
+
+from systembridgeshared.base import Base
+
+HISTORY_SIZE: Final[int] = 100
+
+
+@dataclass(slots=True)
+class SourceResult:
+    """Result of a source for one collection cycle."""
+
+    value: Any = None
+    # Seconds since the value was collected, None if never collected
+    age: float | None = None
+    # The source missed the deadline, or failed, and value is the last known one
+    stale: bool = False
+
+
+@dataclass(slots=True)
+class SourceTiming:
+    """Timing of a call to a source."""
+
+    started_at: float
+    # None while the call is still running
+    duration: float | None = None
+    timed_out: bool = False
+    failed: bool = False
+
+
+@dataclass(slots=True)
+class _Source:
+    """A registered source and its state."""
+
+    function: Callable[[], Any]
+    future: Future | None = None
+    timing: SourceTiming | None = None
+    value: Any = None
+    collected_at: float | None = None
+
+
+class DeadlineCollector(Base):
+    """Collect sources concurrently, never waiting longer than a deadline.
+
+    A source that misses the deadline reports its last known value as stale,
+    while the call keeps running in the background. Only one call per source is
+    in flight at a time, so a hung source never piles up threads.
+    """
+
+    def __init__(self, history_size: int = HISTORY_SIZE) -> None:
+        """Initialise."""
+        super().__init__()
+        self._history_size = history_size
+        self._sources: dict[str, _Source] = {}
+        self._history: dict[str, deque[SourceTiming]] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        function: Callable[[], Any] | Callable[[], Awaitable[Any]],
+    ) -> None:
+        """Register a source, which may be a coroutine function."""
+        if inspect.iscoroutinefunction(function):
+            coroutine_function = function
+
+            def function() -> Any:
+                return asyncio.run(coroutine_function())
+
+        self._sources[name] = _Source(function=function)  # type: ignore[arg-type]
+        self._history[name] = deque(maxlen=self._history_size)
+
+    def _call(self, name: str, source: _Source, future: Future) -> None:
+        """Call a source in its own thread, storing the result even if late."""
+        try:
+            value = source.function()
+        except Exception as exception:  # pylint: disable=broad-except
+            self._logger.warning("Error collecting %s", name, exc_info=exception)
+            with self._lock:
+                if source.timing is not None:
+                    source.timing.duration = time.monotonic() - source.timing.started_at
+                    source.timing.failed = True
+            future.set_exception(exception)
+            return
+        with self._lock:
+            source.value = value
+            source.collected_at = time.monotonic()
+            if source.timing is not None:
+                source.timing.duration = source.collected_at - source.timing.started_at
+        future.set_result(value)
+
+    def _start(self, name: str, source: _Source) -> None:
+        """Start a call, unless the previous one is still running."""
+        with self._lock:
+            if source.timing is not None and source.timing.duration is None:
+                return
+        future: Future = Future()
+        source.future = future
+        source.timing = SourceTiming(started_at=time.monotonic())
+        self._history[name].append(source.timing)
+        # Daemon threads, so a hung call never blocks interpreter exit
+        threading.Thread(
+            target=self._call,
+            args=(name, source, future),
+            name=f"deadline-{name}",
+            daemon=True,
+        ).start()
+
+    def collect(self, deadline: float) -> dict[str, SourceResult]:
+        """Collect all sources, waiting at most deadline seconds."""
+        started = time.monotonic()
+        for name, source in self._sources.items():
+            self._start(name, source)
+
+        pending = {
+            source.future
+            for source in self._sources.values()
+            if source.future is not None
+        }
+        while pending and (remaining := deadline - (time.monotonic() - started)) > 0:
+            _, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+
+        now = time.monotonic()
+        results: dict[str, SourceResult] = {}
+        with self._lock:
+            for name, source in self._sources.items():
+                timing = source.timing
+                if timing is None:
+                    continue
+                if timing.duration is None and not timing.timed_out:
+                    timing.timed_out = True
+                    self._logger.warning("%s missed the %ss deadline", name, deadline)
+                fresh = (
+                    timing.started_at >= started
+                    and timing.duration is not None
+                    and not timing.failed
+                )
+                results[name] = SourceResult(
+                    value=source.value,
+                    age=(
+                        now - source.collected_at
+                        if source.collected_at is not None
+                        else None
+                    ),
+                    stale=not fresh,
+                )
+        return results
+
+    def get_history(self, name: str) -> list[SourceTiming]:
+        """Get the timing of recent calls to a source, oldest first."""
+        with self._lock:
+            return list(self._history.get(name, ()))
+
+    def get_timeout_counts(self) -> dict[str, int]:
+        """Get the number of recent calls that missed their deadline, per source."""
+        with self._lock:
+            return {
+                name: sum(1 for timing in history if timing.timed_out)
+                for name, history in self._history.items()
+            }
@@ -0,0 +1,398 @@
+"""File watching, to cache file backed facts until their files change."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Sequence
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Final, Generic, TypeVar
+
+from systembridgeshared.base import Base
+
+T = TypeVar("T")
+
+IN_MODIFY: Final[int] = 0x00000002
+IN_ATTRIB: Final[int] = 0x00000004
+IN_CLOSE_WRITE: Final[int] = 0x00000008
+IN_MOVED_FROM: Final[int] = 0x00000040
+IN_MOVED_TO: Final[int] = 0x00000080
+IN_CREATE: Final[int] = 0x00000100
+IN_DELETE: Final[int] = 0x00000200
+IN_DELETE_SELF: Final[int] = 0x00000400
+IN_MOVE_SELF: Final[int] = 0x00000800
+IN_Q_OVERFLOW: Final[int] = 0x00004000
+IN_IGNORED: Final[int] = 0x00008000
+IN_NONBLOCK: Final[int] = 0o4000
+IN_CLOEXEC: Final[int] = 0o2000000
+
+WATCH_MASK: Final[int] = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+)
+
+EVENT: Final = struct.Struct("iIII")
+
+# Files under /proc cannot be watched with inotify; the kernel signals
+# changes to the mount table with POLLPRI instead
+PRIORITY_FILES: Final[tuple[str, ...]] = ("/proc/self/mountinfo",)
+
+
+class WatchedValue(Generic[T]):
+    """A value loaded from files, cached until one of them changes."""
+
+    __slots__ = (
+        "_watcher",
+        "_loader",
+        "_cost",
+        "_valid",
+        "_value",
+        "_watched",
+        "cacheable",
+        "paths",
+    )
+
+    def __init__(
+        self,
+        watcher: FileWatcher,
+        paths: tuple[str, ...],
+        loader: Callable[[], T],
+        cost: int,
+    ) -> None:
+        """Initialise."""
+        self._watcher = watcher
+        self._loader = loader
+        self._cost = cost
+        self._valid = False
+        self._value: T | None = None
+        self._watched = False
+        # False when a file cannot be watched, so every get loads
+        self.cacheable = True
+        self.paths = paths
+
+    def get(self) -> T:
+        """Get the value, loading it if a watched file changed."""
+        if self._valid and self.cacheable:
+            self._watcher.hit(self._cost)
+            return self._value  # type: ignore[return-value]
+        if not self._watched:
+            # Watch before the first load, so a change during it is seen
+            self._watched = True
+            self._watcher.watch(self)
+        # Mark valid before loading, so a change during the load is not lost
+        self._valid = True
+        try:
+            self._value = self._loader()
+        except BaseException:
+            self._valid = False
+            raise
+        self._watcher.loaded()
+        return self._value
+
+    def invalidate(self) -> None:
+        """Load the value again on the next get."""
+        self._valid = False
+
+
+def _load_inotify() -> ctypes.CDLL | None:
+    """Load the libc inotify functions."""
+    if sys.platform != "linux":
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [
+            ctypes.c_int,
+            ctypes.c_char_p,
+            ctypes.c_uint32,
+        ]
+    except (AttributeError, OSError):
+        return None
+    return libc
+
+
+class FileWatcher(Base):
+    """Watch files and invalidate the values loaded from them.
+
+    Uses inotify on each file's parent directory, so files being created,
+    replaced or deleted are seen. Files under /proc that support it are
+    watched with POLLPRI. Everything else, or everything when inotify is
+    unavailable, falls back to checking the file's mtime every poll
+    interval. Events are handled on a background thread, so a cached get
+    makes no syscalls at all. Nothing is opened or started until a value
+    is first read.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._values: dict[str, list[WatchedValue]] = defaultdict(list)
+        self._use_inotify = use_inotify
+        self._libc: ctypes.CDLL | None = None
+        self._inotify_fd: int | None = None
+        self._directories: dict[str, int] = {}
+        self._watch_descriptors: dict[int, str] = {}
+        self._priority_files: dict[int, str] = {}
+        self._polled: dict[str, tuple[int, int, int] | None] = {}
+        self._next_poll = 0.0
+        self._poller: select.poll | None = None
+        self._wake_read: int | None = None
+        self._wake_write: int | None = None
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+        self.hits = 0
+        self.loads = 0
+        # Syscalls made by the watcher, and saved by cache hits
+        self.syscalls_spent = 0
+        self._syscalls_saved = 0
+
+    def _setup(self) -> None:
+        """Open inotify and the poller, on the first value read."""
+        self._libc = _load_inotify() if self._use_inotify else None
+        self._poller = select.poll() if hasattr(select, "poll") else None
+        self._wake_read, self._wake_write = os.pipe()
+        if self._libc is not None and self._poller is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                self._logger.warning(
+                    "inotify unavailable, polling files instead: %s",
+                    os.strerror(ctypes.get_errno()),
+                )
+            else:
+                self._inotify_fd = fd
+                self._poller.register(fd, select.POLLIN)
+        if self._poller is not None:
+            self._poller.register(self._wake_read, select.POLLIN)
+
+    @property
+    def running(self) -> bool:
+        """Is the watcher thread running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def syscalls_avoided(self) -> int:
+        """Syscalls avoided by cache hits, less those spent watching."""
+        return self._syscalls_saved - self.syscalls_spent
+
+    def hit(self, cost: int) -> None:
+        """Count a cache hit, saving a load of the given syscall cost."""
+        self.hits += 1
+        self._syscalls_saved += cost
+
+    def loaded(self) -> None:
+        """Count a load."""
+        self.loads += 1
+
+    def cached(
+        self,
+        paths: str | Sequence[str],
+        loader: Callable[[], T],
+        cost: int = 3,
+    ) -> WatchedValue[T]:
+        """Cache the result of a loader until one of its files changes.
+
+        Cost is the number of syscalls the loader makes, for the
+        syscalls_avoided count. The files are watched from the first get.
+        """
+        if isinstance(paths, str):
+            paths = (paths,)
+        return WatchedValue(
+            self, tuple(os.path.abspath(path) for path in paths), loader, cost
+        )
+
+    def watch(self, value: WatchedValue) -> None:
+        """Start watching a value's files, and the watcher if needed."""
+        with self._lock:
+            if self._wake_read is None:
+                self._setup()
+            for path in value.paths:
+                self._values[path].append(value)
+                if not self._watch(path):
+                    value.cacheable = False
+        self._start()
+
+    def _watch(self, path: str) -> bool:
+        """Start watching a path, if it can be watched."""
+        if path in PRIORITY_FILES and self._poller is not None:
+            if path in self._priority_files.values():
+                return True
+            try:
+                fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+                self._drain(fd)
+            except OSError:
+                pass
+            else:
+                self._priority_files[fd] = path
+                self._poller.register(fd, select.POLLPRI | select.POLLERR)
+                return True
+        if path.startswith("/proc/"):
+            # No change notification, and an mtime that never changes
+            return False
+
+        if self._inotify_fd is not None:
+            directory = os.path.dirname(path)
+            if directory in self._directories:
+                return True
+            wd = self._libc.inotify_add_watch(  # type: ignore[union-attr]
+                self._inotify_fd, os.fsencode(directory), WATCH_MASK
+            )
+            if wd >= 0:
+                self._directories[directory] = wd
+                self._watch_descriptors[wd] = directory
+                return True
+        if path not in self._polled:
+            self._polled[path] = self._stat(path)
+        return True
+
+    def _stat(self, path: str) -> tuple[int, int, int] | None:
+        """Get the identity of a file's current contents."""
+        self.syscalls_spent += 1
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _drain(self, fd: int) -> None:
+        """Read a priority file to the end, re-arming its notification."""
+        os.lseek(fd, 0, os.SEEK_SET)
+        self.syscalls_spent += 1
+        while os.read(fd, 65536):
+            self.syscalls_spent += 1
+
+    def _invalidate(self, path: str) -> None:
+        """Invalidate the values loaded from a path."""
+        for value in self._values.get(path, ()):
+            value.invalidate()
+
+    def _invalidate_directory(self, directory: str, name: str | None) -> None:
+        """Invalidate the values loaded from a directory, or a file in it."""
+        for path in list(self._values):
+            if os.path.dirname(path) == directory and (
+                name is None or os.path.basename(path) == name
+            ):
+                self._invalidate(path)
+
+    def _read_inotify(self) -> None:
+        """Handle the pending inotify events."""
+        try:
+            data = os.read(self._inotify_fd, 65536)  # type: ignore[arg-type]
+        except BlockingIOError:
+            return
+        finally:
+            self.syscalls_spent += 1
+        offset = 0
+        while offset + EVENT.size <= len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size : offset + EVENT.size + length]
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                for path in self._values:
+                    self._invalidate(path)
+                continue
+            if (directory := self._watch_descriptors.get(wd)) is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                # The directory went away, poll its files from now on
+                self._watch_descriptors.pop(wd, None)
+                self._directories.pop(directory, None)
+                for path in self._values:
+                    if os.path.dirname(path) == directory:
+                        self._polled[path] = self._stat(path)
+                self._invalidate_directory(directory, None)
+                continue
+            self._invalidate_directory(
+                directory, os.fsdecode(name.rstrip(b"\0")) if name else None
+            )
+
+    def _check_polled(self) -> None:
+        """Check the polled files for changes."""
+        for path, identity in self._polled.items():
+            if (current := self._stat(path)) != identity:
+                self._polled[path] = current
+                self._invalidate(path)
+
+    def _start(self) -> None:
+        """Start the watcher thread."""
+        if self._thread is not None:
+            os.write(self._wake_write, b"\0")  # type: ignore[arg-type]
+            return
+        self._thread = threading.Thread(
+            target=self._run, name="FileWatcher", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Handle file changes until stopped."""
+        while not self._stopped.is_set():
+            timeout = self._poll_interval if self._polled else None
+            if self._poller is None:
+                self._stopped.wait(timeout or self._poll_interval)
+                events = []
+            else:
+                events = self._poller.poll(None if timeout is None else timeout * 1000)
+            self.syscalls_spent += 1
+            with self._lock:
+                for fd, _ in events:
+                    if fd == self._wake_read:
+                        os.read(self._wake_read, 64)
+                    elif fd == self._inotify_fd:
+                        self._read_inotify()
+                    elif (path := self._priority_files.get(fd)) is not None:
+                        self._drain(fd)
+                        self._invalidate(path)
+                now = time.monotonic()
+                if self._polled and now >= self._next_poll:
+                    self._next_poll = now + self._poll_interval
+                    self._check_polled()
+
+    def close(self) -> None:
+        """Stop watching."""
+        self._stopped.set()
+        if self._thread is not None:
+            os.write(self._wake_write, b"\0")  # type: ignore[arg-type]
+            self._thread.join()
+            self._thread = None
+        for fd in (
+            self._wake_read,
+            self._wake_write,
+            self._inotify_fd,
+            *self._priority_files,
+        ):
+            if fd is not None:
+                os.close(fd)
+        self._priority_files.clear()
+        self._inotify_fd = self._wake_read = self._wake_write = None
+
+
+_FILE_WATCHER: FileWatcher | None = None
+_FILE_WATCHER_LOCK = threading.Lock()
+
+
+def get_file_watcher() -> FileWatcher:
+    """Get the file watcher shared by the data modules."""
+    global _FILE_WATCHER  # noqa: PLW0603  # pylint: disable=global-statement
+    with _FILE_WATCHER_LOCK:
+        if _FILE_WATCHER is None:
+            _FILE_WATCHER = FileWatcher()
+        return _FILE_WATCHER
@@ -0,0 +1,271 @@
+"""Persistent metric history."""
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from dataclasses import dataclass
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Final
+
+from systembridgeshared.base import Base
+from systembridgeshared.common import get_user_data_directory
+
+MAGIC: Final[bytes] = b"SBMH"
+VERSION: Final[int] = 1
+
+# Magic, version, archive count, series capacity, series name size
+HEADER: Final = struct.Struct("<4sHHII")
+# Resolution in seconds, rows
+ARCHIVE: Final = struct.Struct("<II")
+# Bucket, samples, mean, maximum
+RECORD: Final = struct.Struct("<IIdd")
+
+NAME_SIZE: Final[int] = 64
+
+# Series besides the per CPU ones, which are added per CPU by default
+BASE_SERIES: Final[int] = 128
+
+# 1s for an hour, 1m for a week, 1h for a year
+DEFAULT_ARCHIVES: Final[tuple[tuple[int, int], ...]] = (
+    (1, 3600),
+    (60, 10080),
+    (3600, 8760),
+)
+
+
+@dataclass(slots=True)
+class HistoryPoint:
+    """A consolidated point in a metric's history."""
+
+    timestamp: float
+    value: float
+    maximum: float
+
+
+class MetricHistory(Base):
+    """Fixed size, memory mapped round robin archives of metrics.
+
+    Each series keeps one ring per archive. A sample updates the running mean
+    and maximum of the bucket it falls in for every archive, so appends are
+    O(1) and the file never grows. Nothing is synced per sample; the kernel
+    writes the pages back, and flush forces it.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        archives: Sequence[tuple[int, int]] = DEFAULT_ARCHIVES,
+        max_series: int | None = None,
+    ) -> None:
+        """Initialise.
+
+        By default there is room for BASE_SERIES series plus one per CPU,
+        for the per CPU usage series.
+        """
+        super().__init__()
+        if max_series is None:
+            max_series = BASE_SERIES + (os.cpu_count() or 1)
+        self.path = path or os.path.join(get_user_data_directory(), "history.bin")
+        self._archives = tuple(sorted(archives))
+        self._max_series = max_series
+        self._lock = threading.Lock()
+
+        self._names_offset = HEADER.size + ARCHIVE.size * len(self._archives)
+        data_offset = self._names_offset + NAME_SIZE * max_series
+        # Keep the rings page aligned
+        self._data_offset = -(-data_offset // mmap.PAGESIZE) * mmap.PAGESIZE
+        self._archive_offsets: list[int] = []
+        offset = 0
+        for _, rows in self._archives:
+            self._archive_offsets.append(offset)
+            offset += rows * RECORD.size
+        self._series_size = offset
+        size = self._data_offset + self._series_size * max_series
+
+        self._file = self._open(size)
+        self._mmap = mmap.mmap(self._file.fileno(), size)
+        self._series: dict[str, int] = {}
+        # Series that did not fit, so each is only warned about once
+        self._dropped: set[str] = set()
+        for index in range(max_series):
+            offset = self._names_offset + index * NAME_SIZE
+            raw = self._mmap[offset : offset + NAME_SIZE].rstrip(b"\0")
+            if raw:
+                self._series[raw.decode()] = index
+
+    def _header(self) -> bytes:
+        """Build the file header."""
+        return HEADER.pack(
+            MAGIC, VERSION, len(self._archives), self._max_series, NAME_SIZE
+        ) + b"".join(ARCHIVE.pack(*archive) for archive in self._archives)
+
+    def _open(self, size: int):
+        """Open the history file, starting over if its layout differs."""
+        header = self._header()
+        try:
+            file = open(self.path, "r+b")  # noqa: SIM115
+        except FileNotFoundError:
+            pass
+        else:
+            if (
+                file.read(len(header)) == header
+                and os.fstat(file.fileno()).st_size == size
+            ):
+                return file
+            file.close()
+            self._logger.warning("History layout changed, recreating %s", self.path)
+
+        file = open(self.path, "w+b")  # noqa: SIM115
+        # Sparse on most filesystems, pages are only allocated once written
+        file.truncate(size)
+        file.write(header)
+        file.flush()
+        return file
+
+    def _index(self, name: str) -> int | None:
+        """Get or register the index of a series."""
+        if (index := self._series.get(name)) is not None:
+            return index
+        if name in self._dropped:
+            return None
+        encoded = name.encode()
+        if len(encoded) > NAME_SIZE:
+            self._logger.warning("Series name too long, dropping %s", name)
+            self._dropped.add(name)
+            return None
+        if len(self._series) >= self._max_series:
+            self._logger.warning("History is full, dropping series %s", name)
+            self._dropped.add(name)
+            return None
+        index = len(self._series)
+        offset = self._names_offset + index * NAME_SIZE
+        self._mmap[offset : offset + len(encoded)] = encoded
+        self._series[name] = index
+        return index
+
+    def append(
+        self,
+        name: str,
+        value: float,
+        timestamp: float | None = None,
+    ) -> None:
+        """Append a sample to a series."""
+        self.append_many({name: value}, timestamp)
+
+    def append_many(
+        self,
+        values: Mapping[str, float | None],
+        timestamp: float | None = None,
+    ) -> None:
+        """Append a sample to each of several series."""
+        if timestamp is None:
+            timestamp = time.time()
+        buffer = self._mmap
+        with self._lock:
+            for name, value in values.items():
+                if value is None or (index := self._index(name)) is None:
+                    continue
+                base = self._data_offset + index * self._series_size
+                for (resolution, rows), archive_offset in zip(
+                    self._archives, self._archive_offsets, strict=True
+                ):
+                    bucket = int(timestamp // resolution)
+                    offset = base + archive_offset + bucket % rows * RECORD.size
+                    stored, count, mean, maximum = RECORD.unpack_from(buffer, offset)
+                    if stored == bucket and count:
+                        count += 1
+                        mean += (value - mean) / count
+                        maximum = max(maximum, value)
+                    else:
+                        count, mean, maximum = 1, value, value
+                    RECORD.pack_into(buffer, offset, bucket, count, mean, maximum)
+
+    def get_series(self) -> list[str]:
+        """Get the names of the recorded series."""
+        return list(self._series)
+
+    def query(
+        self,
+        name: str,
+        start: float,
+        end: float | None = None,
+        resolution: int | None = None,
+    ) -> list[HistoryPoint]:
+        """Get a series between two times.
+
+        Uses the finest archive still covering start, unless a resolution is
+        given. Only the rows in range are read from the mapping.
+        """
+        if end is None:
+            end = time.time()
+        if (index := self._series.get(name)) is None or end < start:
+            return []
+
+        archive = self._select_archive(start, resolution)
+        (resolution, rows), archive_offset = (
+            self._archives[archive],
+            self._archive_offsets[archive],
+        )
+        last = int(end // resolution)
+        first = max(int(start // resolution), last - rows + 1)
+        base = self._data_offset + index * self._series_size + archive_offset
+
+        # At most two contiguous runs, split where the ring wraps
+        points: list[HistoryPoint] = []
+        view = memoryview(self._mmap)
+        try:
+            bucket = first
+            while bucket <= last:
+                slot = bucket % rows
+                count = min(last - bucket + 1, rows - slot)
+                offset = base + slot * RECORD.size
+                run = view[offset : offset + count * RECORD.size]
+                for expected, (stored, samples, mean, maximum) in enumerate(
+                    RECORD.iter_unpack(run), bucket
+                ):
+                    if stored == expected and samples:
+                        points.append(
+                            HistoryPoint(expected * resolution, mean, maximum)
+                        )
+                run.release()
+                bucket += count
+        finally:
+            view.release()
+        return points
+
+    def _select_archive(self, start: float, resolution: int | None) -> int:
+        """Pick the archive to answer a query from."""
+        if resolution is not None:
+            for archive, (archive_resolution, _) in enumerate(self._archives):
+                if archive_resolution == resolution:
+                    return archive
+            raise ValueError(f"No archive with a resolution of {resolution}s")
+        age = time.time() - start
+        for archive, (archive_resolution, rows) in enumerate(self._archives):
+            if archive_resolution * rows >= age:
+                return archive
+        return len(self._archives) - 1
+
+    def flush(self) -> None:
+        """Write the mapped pages back to disk."""
+        self._mmap.flush()
+
+    def close(self) -> None:
+        """Close the history."""
+        if self._mmap.closed:
+            return
+        self._mmap.flush()
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> MetricHistory:
+        """Enter."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit."""
+        self.close()
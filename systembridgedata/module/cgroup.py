@@ -0,0 +1,448 @@
+"""Cgroup."""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+import contextlib
+from dataclasses import dataclass, field
+import errno
+import os
+from typing import Final
+
+from systembridgeshared.base import Base
+
+CGROUP_ROOT: Final[str] = "/sys/fs/cgroup"
+PROC_SELF_CGROUP: Final[str] = "/proc/self/cgroup"
+
+PRESSURE_RESOURCES: Final[tuple[str, ...]] = ("cpu", "memory", "io")
+
+READ_SIZE: Final[int] = 65536
+
+# Descriptors the scanner keeps open, well under the usual limit of 1024
+MAX_OPEN_FILES: Final[int] = 512
+
+# Scans before files found missing are tried again, for controllers enabled
+# after the cgroup was created
+MISSING_RETRY_SCANS: Final[int] = 60
+
+
+@dataclass(slots=True)
+class CgroupCPU:
+    """Cgroup CPU."""
+
+    quota: int | None = None
+    period: int | None = None
+    effective_cpus: float | None = None
+    usage_usec: int | None = None
+    user_usec: int | None = None
+    system_usec: int | None = None
+    nr_periods: int | None = None
+    nr_throttled: int | None = None
+    throttled_usec: int | None = None
+
+
+@dataclass(slots=True)
+class CgroupMemory:
+    """Cgroup Memory."""
+
+    current: int | None = None
+    limit: int | None = None
+    inactive_file: int | None = None
+
+    @property
+    def working_set(self) -> int | None:
+        """Memory in use, excluding reclaimable page cache."""
+        if self.current is None:
+            return None
+        return max(self.current - (self.inactive_file or 0), 0)
+
+
+@dataclass(slots=True)
+class CgroupPressureLine:
+    """Cgroup Pressure Line."""
+
+    avg10: float
+    avg60: float
+    avg300: float
+    total: int
+
+
+@dataclass(slots=True)
+class CgroupPressure:
+    """Cgroup Pressure."""
+
+    some: CgroupPressureLine | None = None
+    full: CgroupPressureLine | None = None
+
+
+@dataclass(slots=True)
+class CgroupIOStat:
+    """Cgroup IO Stat."""
+
+    rbytes: int = 0
+    wbytes: int = 0
+    rios: int = 0
+    wios: int = 0
+    dbytes: int = 0
+    dios: int = 0
+
+
+@dataclass(slots=True)
+class CgroupStats:
+    """Cgroup Stats."""
+
+    path: str
+    cpu: CgroupCPU | None = None
+    memory: CgroupMemory | None = None
+    pressure: dict[str, CgroupPressure] = field(default_factory=dict)
+    io: dict[str, CgroupIOStat] = field(default_factory=dict)
+
+
+def _parse_max(value: str | None) -> tuple[int | None, int | None]:
+    """Parse a "<limit> [<period>]" file where the limit may be "max"."""
+    if not value:
+        return (None, None)
+    parts = value.split()
+    limit = None if parts[0] == "max" else int(parts[0])
+    period = int(parts[1]) if len(parts) > 1 else None
+    return (limit, period)
+
+
+def _parse_flat_keyed(value: str | None) -> dict[str, int]:
+    """Parse a flat keyed file such as cpu.stat or memory.stat."""
+    result: dict[str, int] = {}
+    if not value:
+        return result
+    for line in value.splitlines():
+        key, _, number = line.partition(" ")
+        if number:
+            result[key] = int(number)
+    return result
+
+
+def _parse_pressure(value: str | None) -> CgroupPressure | None:
+    """Parse a PSI pressure file."""
+    if not value:
+        return None
+    pressure = CgroupPressure()
+    for line in value.splitlines():
+        kind, *pairs = line.split()
+        values = dict(pair.split("=", 1) for pair in pairs)
+        pressure_line = CgroupPressureLine(
+            avg10=float(values.get("avg10", 0)),
+            avg60=float(values.get("avg60", 0)),
+            avg300=float(values.get("avg300", 0)),
+            total=int(values.get("total", 0)),
+        )
+        if kind == "some":
+            pressure.some = pressure_line
+        elif kind == "full":
+            pressure.full = pressure_line
+    return pressure
+
+
+def _parse_io_stat(value: str | None) -> dict[str, CgroupIOStat]:
+    """Parse io.stat, keyed by "major:minor"."""
+    result: dict[str, CgroupIOStat] = {}
+    if not value:
+        return result
+    for line in value.splitlines():
+        device, *pairs = line.split()
+        stat = CgroupIOStat()
+        for pair in pairs:
+            key, _, number = pair.partition("=")
+            if key in CgroupIOStat.__slots__:
+                setattr(stat, key, int(number))
+        result[device] = stat
+    return result
+
+
+def _build_stats(path: str, read: Callable[[str], str | None]) -> CgroupStats:
+    """Build stats for a cgroup from a file reader."""
+    quota, period = _parse_max(read("cpu.max"))
+    cpu_stat = _parse_flat_keyed(read("cpu.stat"))
+    memory_stat = _parse_flat_keyed(read("memory.stat"))
+    memory_current = read("memory.current")
+    memory_limit, _ = _parse_max(read("memory.max"))
+
+    stats = CgroupStats(
+        path=path,
+        cpu=CgroupCPU(
+            quota=quota,
+            period=period,
+            effective_cpus=quota / period if quota is not None and period else None,
+            usage_usec=cpu_stat.get("usage_usec"),
+            user_usec=cpu_stat.get("user_usec"),
+            system_usec=cpu_stat.get("system_usec"),
+            nr_periods=cpu_stat.get("nr_periods"),
+            nr_throttled=cpu_stat.get("nr_throttled"),
+            throttled_usec=cpu_stat.get("throttled_usec"),
+        ),
+        memory=CgroupMemory(
+            current=int(memory_current) if memory_current else None,
+            limit=memory_limit,
+            inactive_file=memory_stat.get("inactive_file"),
+        ),
+        io=_parse_io_stat(read("io.stat")),
+    )
+    for resource in PRESSURE_RESOURCES:
+        if (pressure := _parse_pressure(read(f"{resource}.pressure"))) is not None:
+            stats.pressure[resource] = pressure
+    return stats
+
+
+def _count_cpuset(value: str | None) -> int | None:
+    """Count the CPUs in a cpuset list such as "0-3,8"."""
+    if not value:
+        return None
+    count = 0
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        count += int(end) - int(start) + 1 if end else 1
+    return count
+
+
+class Cgroup(Base):
+    """Cgroup v2 data for the current (or a given) cgroup."""
+
+    def __init__(
+        self,
+        root: str = CGROUP_ROOT,
+        path: str | None = None,
+        proc_self_cgroup: str = PROC_SELF_CGROUP,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._root = root
+        self._path = (
+            path if path is not None else self._read_self_path(proc_self_cgroup)
+        )
+        self._directory = os.path.join(root, self._path.lstrip("/"))
+
+    def _read_self_path(self, proc_self_cgroup: str) -> str:
+        """Get the cgroup v2 path of the current process."""
+        try:
+            with open(proc_self_cgroup, encoding="utf-8") as file:
+                for line in file:
+                    # cgroup v2 has a single "0::<path>" entry
+                    if line.startswith("0::"):
+                        return line[3:].strip()
+        except OSError as error:
+            self._logger.debug("Could not read %s", proc_self_cgroup, exc_info=error)
+        return "/"
+
+    def _read(self, name: str, directory: str | None = None) -> str | None:
+        """Read a cgroup file."""
+        try:
+            with open(
+                os.path.join(directory or self._directory, name),
+                encoding="utf-8",
+            ) as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def _ancestors(self) -> list[str]:
+        """Directories from the current cgroup up to (excluding) the root."""
+        directories: list[str] = []
+        root = os.path.normpath(self._root)
+        directory = os.path.normpath(self._directory)
+        while directory.startswith(root) and directory != root:
+            directories.append(directory)
+            directory = os.path.dirname(directory)
+        return directories
+
+    @property
+    def available(self) -> bool:
+        """Is a cgroup v2 hierarchy mounted."""
+        return os.path.exists(os.path.join(self._root, "cgroup.controllers"))
+
+    @property
+    def path(self) -> str:
+        """Cgroup path, relative to the hierarchy root."""
+        return self._path
+
+    def get_cpu(self) -> CgroupCPU:
+        """CPU quota and throttling."""
+        cpu = _build_stats(self._path, self._read).cpu or CgroupCPU()
+
+        # The effective quota is the tightest limit in the ancestry
+        for directory in self._ancestors():
+            quota, period = _parse_max(self._read("cpu.max", directory))
+            if quota is not None and period:
+                limit = quota / period
+                if cpu.effective_cpus is None or limit < cpu.effective_cpus:
+                    cpu.quota = quota
+                    cpu.period = period
+                    cpu.effective_cpus = limit
+        cpuset = _count_cpuset(self._read("cpuset.cpus.effective"))
+        if cpuset is not None and (
+            cpu.effective_cpus is None or cpuset < cpu.effective_cpus
+        ):
+            cpu.effective_cpus = float(cpuset)
+        return cpu
+
+    def get_io_stat(self) -> dict[str, CgroupIOStat]:
+        """IO stat per device."""
+        return _parse_io_stat(self._read("io.stat"))
+
+    def get_memory(self) -> CgroupMemory:
+        """Memory limit and usage."""
+        current = self._read("memory.current")
+        memory = CgroupMemory(
+            current=int(current) if current else None,
+            inactive_file=_parse_flat_keyed(self._read("memory.stat")).get(
+                "inactive_file"
+            ),
+        )
+        # The effective limit is the tightest limit in the ancestry
+        for directory in self._ancestors():
+            limit, _ = _parse_max(self._read("memory.max", directory))
+            if limit is not None and (memory.limit is None or limit < memory.limit):
+                memory.limit = limit
+        return memory
+
+    def get_pressure(self, resource: str) -> CgroupPressure | None:
+        """PSI pressure for "cpu", "memory" or "io"."""
+        return _parse_pressure(self._read(f"{resource}.pressure"))
+
+    def get_stats(self) -> CgroupStats:
+        """All stats for the cgroup."""
+        stats = _build_stats(self._path, self._read)
+        stats.cpu = self.get_cpu()
+        stats.memory = self.get_memory()
+        return stats
+
+
+class CgroupScanner(Base):
+    """Bulk stats for every cgroup in a subtree, reusing open file descriptors.
+
+    At most max_open_files descriptors are kept; files past that are opened
+    for each read. Scans read the files in the same order every time, so
+    evicting descriptors to make room would leave none to reuse.
+    """
+
+    def __init__(
+        self,
+        root: str = CGROUP_ROOT,
+        subtree: str = "/",
+        max_open_files: int = MAX_OPEN_FILES,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._root = os.path.normpath(root)
+        self._top = os.path.join(self._root, subtree.lstrip("/"))
+        self._max_open_files = max_open_files
+        self._fds: dict[str, int] = {}
+        # Files that did not exist, skipped until the next retry
+        self._missing: set[str] = set()
+        self._scans = 0
+        self._warned = False
+
+    def __enter__(self) -> CgroupScanner:
+        """Enter."""
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit."""
+        self.close()
+
+    @property
+    def open_files(self) -> int:
+        """Number of cached file descriptors."""
+        return len(self._fds)
+
+    def _read(self, file_path: str) -> str | None:
+        """Read a file through a cached descriptor."""
+        if (fd := self._fds.get(file_path)) is None:
+            if file_path in self._missing:
+                return None
+            try:
+                fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_CLOEXEC", 0))
+            except FileNotFoundError:
+                self._missing.add(file_path)
+                return None
+            except OSError as error:
+                if error.errno in (errno.EMFILE, errno.ENFILE) and not self._warned:
+                    self._warned = True
+                    self._logger.warning(
+                        "Out of file descriptors reading cgroups, with %s cached: %s",
+                        len(self._fds),
+                        error,
+                    )
+                return None
+            if len(self._fds) >= self._max_open_files:
+                # Full, so read without keeping the descriptor
+                try:
+                    return os.pread(fd, READ_SIZE, 0).decode().strip()
+                except OSError:
+                    return None
+                finally:
+                    os.close(fd)
+            self._fds[file_path] = fd
+        try:
+            return os.pread(fd, READ_SIZE, 0).decode().strip()
+        except OSError:
+            # The cgroup was removed since the descriptor was opened
+            self._close_fd(file_path)
+            return None
+
+    def _close_fd(self, file_path: str) -> None:
+        """Close a cached descriptor."""
+        if (fd := self._fds.pop(file_path, None)) is not None:
+            with contextlib.suppress(OSError):
+                os.close(fd)
+
+    def _walk(self) -> list[str]:
+        """Find every cgroup directory in the subtree."""
+        directories: list[str] = []
+        stack = [self._top]
+        while stack:
+            directory = stack.pop()
+            directories.append(directory)
+            try:
+                with os.scandir(directory) as entries:
+                    stack.extend(
+                        entry.path
+                        for entry in entries
+                        if entry.is_dir(follow_symlinks=False)
+                    )
+            except OSError:
+                continue
+        return directories
+
+    def close(self) -> None:
+        """Close all cached descriptors."""
+        for file_path in list(self._fds):
+            self._close_fd(file_path)
+        self._missing.clear()
+
+    def scan(self) -> dict[str, CgroupStats]:
+        """Stats for every cgroup in the subtree, keyed by cgroup path."""
+        result: dict[str, CgroupStats] = {}
+        seen: set[str] = set()
+        self._scans += 1
+        if self._scans % MISSING_RETRY_SCANS == 0:
+            self._missing.clear()
+        self._warned = False
+        for directory in self._walk():
+            path = "/" + os.path.relpath(directory, self._root).replace(os.sep, "/")
+            if path == "/.":
+                path = "/"
+
+            def read(name: str, directory: str = directory) -> str | None:
+                file_path = os.path.join(directory, name)
+                seen.add(file_path)
+                return self._read(file_path)
+
+            result[path] = _build_stats(path, read)
+
+        # Drop descriptors for cgroups that no longer exist
+        for file_path in set(self._fds) - seen:
+            self._close_fd(file_path)
+        self._missing &= seen
+
+        self._logger.debug(
+            "Scanned %s cgroups with %s open files", len(result), len(self._fds)
+        )
+        return result
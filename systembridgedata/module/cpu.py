@@ -1,35 +1,108 @@
 """CPU."""
 
-from psutil import (
-    cpu_count,
-    cpu_freq,
-    cpu_percent,
-    cpu_stats,
-    cpu_times,
-    cpu_times_percent,
-    getloadavg,
-)
+from collections.abc import Callable, Sequence
+import math
+import time
+from typing import Any, Final, TypeVar
+
 from psutil._common import shwtemp
 from systembridgemodels.modules.cpu import CPUFrequency, CPUStats, CPUTimes
 from systembridgemodels.modules.sensors import Sensors
 
 from systembridgeshared.base import Base
 
+from ..backend import Backend, get_backend
+from ..history import MetricHistory
+from ..pool import ModelPool
+from .cgroup import Cgroup
+
+M = TypeVar("M")
+
+# Per CPU models, pooled by CPU index in reuse mode
+PER_CPU_MODELS: Final[dict[str, type]] = {
+    "frequency": CPUFrequency,
+    "times": CPUTimes,
+    "times_percent": CPUTimes,
+}
+
+
+def _set_frequency(model: CPUFrequency, data: Any) -> CPUFrequency:
+    """Copy a psutil CPU frequency onto a model."""
+    model.current = data.current
+    model.min = data.min
+    model.max = data.max
+    return model
+
+
+def _set_times(model: CPUTimes, data: Any) -> CPUTimes:
+    """Copy psutil CPU times onto a model."""
+    model.user = data.user
+    model.system = data.system
+    model.idle = data.idle
+    model.interrupt = data.interrupt if hasattr(data, "interrupt") else None
+    model.dpc = data.dpc if hasattr(data, "dpc") else None
+    return model
+
 
 class CPU(Base):
     """CPU data."""
 
-    def __init__(self) -> None:
-        """Initialise."""
+    def __init__(
+        self,
+        cgroup: Cgroup | None = None,
+        reuse: bool = False,
+        backend: Backend | None = None,
+    ) -> None:
+        """Initialise.
+
+        With reuse, per CPU models are updated in place by the next call
+        rather than allocated again, so copy any that need keeping.
+        """
         super().__init__()
+        self._backend = backend or get_backend()
+
+        # When running in a container, report against the cgroup's limits
+        self._cgroup: Cgroup | None = (
+            cgroup if cgroup is not None and cgroup.available else None
+        )
+        self._effective_cpus: float | None = None
+        # (usage_usec, monotonic time) at the previous cgroup usage reading
+        self._cgroup_usage: tuple[int | None, float] | None = None
+        if self._cgroup is not None:
+            self._effective_cpus = self._cgroup.get_cpu().effective_cpus
+
+        self._count: int = self._backend.cpu_count()
+        if self._effective_cpus is not None:
+            self._count = max(1, min(self._count, math.ceil(self._effective_cpus)))
 
-        self._count: int = cpu_count()
+        self._pools: dict[str, ModelPool[int, Any]] | None = None
+        if reuse:
+            self._pools = {
+                name: ModelPool(lambda _, model=model: model())
+                for name, model in PER_CPU_MODELS.items()
+            }
 
         self.sensors: Sensors | None = None
+        self.history: MetricHistory | None = None
+
+    def _per_cpu(
+        self,
+        name: str,
+        data: Sequence[Any],
+        update: Callable[[M, Any], M],
+    ) -> list[M]:
+        """Build per CPU models, reusing the previous call's in reuse mode."""
+        if self._pools is None:
+            model = PER_CPU_MODELS[name]
+            return [update(model(), item) for item in data]
+        pool = self._pools[name]
+        models = [update(pool.get(index), item) for index, item in enumerate(data)]
+        pool.sweep()
+        return models
 
     def get_frequency(self) -> CPUFrequency:
         """CPU frequency."""
-        data = cpu_freq()
+        data = self._backend.cpu_freq()
         return CPUFrequency(
             current=data.current,
             min=data.min,
@@ -40,20 +113,13 @@ class CPU(Base):
         self,
     ) -> list[CPUFrequency]:
         """CPU frequency per CPU."""
-        data = cpu_freq(percpu=True)
+        data = self._backend.cpu_freq(percpu=True)
 
-        return [
-            CPUFrequency(
-                current=item.current,  # type: ignore
-                min=item.min,  # type: ignore
-                max=item.max,  # type: ignore
-            )
-            for item in data
-        ]
+        return self._per_cpu("frequency", data, _set_frequency)  # type: ignore
 
     def get_load_average(self) -> float:
         """Get load average."""
-        avg_tuple = getloadavg()
+        avg_tuple = self._backend.getloadavg()
         return sum([avg_tuple[0], avg_tuple[1], avg_tuple[2]]) / 3
 
     def get_power_package(self) -> float | None:
@@ -131,7 +197,7 @@ class CPU(Base):
 
     def get_stats(self) -> CPUStats:
         """CPU stats."""
-        data = cpu_stats()
+        data = self._backend.cpu_stats()
         return CPUStats(
             ctx_switches=data.ctx_switches,
             interrupts=data.interrupts,
@@ -213,7 +279,7 @@ class CPU(Base):
 
     def get_times(self) -> CPUTimes:
         """CPU times."""
-        data = cpu_times(percpu=False)
+        data = self._backend.cpu_times(percpu=False)
         return CPUTimes(
             user=data.user,
             system=data.system,
@@ -224,7 +290,7 @@ class CPU(Base):
 
     def get_times_percent(self) -> CPUTimes:
         """CPU times percent."""
-        data = cpu_times_percent(interval=1, percpu=False)
+        data = self._backend.cpu_times_percent(interval=1, percpu=False)
         return CPUTimes(
             user=data.user,
             system=data.system,
@@ -239,47 +305,61 @@ class CPU(Base):
         self,
     ) -> list[CPUTimes]:
         """CPU times per CPU."""
-        data = cpu_times(percpu=True)
-
-        return [
-            CPUTimes(
-                user=item.user,
-                system=item.system,
-                idle=item.idle,
-                interrupt=item.interrupt if hasattr(
-                    item, "interrupt") else None,
-                dpc=item.dpc if hasattr(item, "dpc") else None,
-            )
-            for item in data
-        ]
+        data = self._backend.cpu_times(percpu=True)
+
+        return self._per_cpu("times", data, _set_times)
 
     def get_times_per_cpu_percent(
         self,
     ) -> list[CPUTimes]:
         """CPU times per CPU percent."""
-        data = cpu_times_percent(interval=1, percpu=True)
-
-        return [
-            CPUTimes(
-                user=item.user,
-                system=item.system,
-                idle=item.idle,
-                interrupt=item.interrupt if hasattr(
-                    item, "interrupt") else None,
-                dpc=item.dpc if hasattr(item, "dpc") else None,
+        data = self._backend.cpu_times_percent(interval=1, percpu=True)
+
+        return self._per_cpu("times_percent", data, _set_times)
+
+    def get_usage(self, interval: float | None = 1) -> float:
+        """CPU usage, over the interval or, with None, since the previous call."""
+        if self._cgroup is not None and self._effective_cpus is not None:
+            usage = self._get_usage_cgroup(
+                self._cgroup, self._effective_cpus, interval=interval
             )
-            for item in data
-        ]
+        else:
+            usage = self._backend.cpu_percent(interval=interval, percpu=False)
+        if self.history is not None:
+            self.history.append("cpu.usage", usage)
+        return usage
 
-    def get_usage(self) -> float:
-        """CPU usage."""
-        return cpu_percent(interval=1, percpu=False)
+    def _get_usage_cgroup(
+        self,
+        cgroup: Cgroup,
+        effective_cpus: float,
+        interval: float | None,
+    ) -> float:
+        """CPU usage of the cgroup, as a percentage of its quota."""
+        if interval is not None:
+            self._cgroup_usage = (cgroup.get_cpu().usage_usec, time.monotonic())
+            time.sleep(interval)
+        start, start_time = self._cgroup_usage or (None, 0.0)
+        end = cgroup.get_cpu().usage_usec
+        end_time = time.monotonic()
+        self._cgroup_usage = (end, end_time)
+        elapsed = end_time - start_time
+        if start is None or end is None or elapsed <= 0:
+            return self._backend.cpu_percent(interval=None, percpu=False)
+        usage = (end - start) / (elapsed * 1_000_000 * effective_cpus) * 100
+        return round(min(max(usage, 0.0), 100.0), 1)
 
     def get_usage_per_cpu(
         self,
+        interval: float | None = 1,
     ) -> list[float]:
-        """CPU usage per CPU."""
-        return cpu_percent(interval=1, percpu=True)  # type: ignore
+        """CPU usage per CPU, over the interval or since the previous call."""
+        usage: list[float] = self._backend.cpu_percent(interval=interval, percpu=True)  # type: ignore
+        if self.history is not None:
+            self.history.append_many(
+                {f"cpu.usage.{index}": value for index, value in enumerate(usage)}
+            )
+        return usage
 
     def get_voltages(self) -> tuple[float | None, list[float]]:
         """CPU voltage."""
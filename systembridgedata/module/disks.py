@@ -1,19 +1,357 @@
 """Disks."""
 
-from psutil import disk_io_counters, disk_partitions, disk_usage
+from __future__ import annotations
+
+from collections.abc import Collection, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import heapq
+import os
+import sys
+import threading
+from typing import Literal
+
 from systembridgemodels.modules.disks import DiskIOCounters, DiskPartition, DiskUsage
 
 from systembridgeshared.base import Base
 
+from ..backend import Backend, get_backend
+from ..filewatch import FileWatcher, WatchedValue, get_file_watcher
+from ..history import MetricHistory
+from ..names import NameFilter, NamePattern
+from ..pool import ModelPool
+
+MOUNTINFO_PATH = "/proc/self/mountinfo"
+
+BlockDeviceKind = Literal["disk", "partition", "loop", "ram", "dm", "md"]
+
+# Kinds named by prefix, everything else whole is a disk
+BLOCK_DEVICE_PREFIXES: tuple[tuple[str, BlockDeviceKind], ...] = (
+    ("loop", "loop"),
+    ("ram", "ram"),
+    ("zram", "ram"),
+    ("dm-", "dm"),
+    ("md", "md"),
+)
+
+
+class DirectoryScanCancelledError(Exception):
+    """A directory scan was cancelled."""
+
+
+@dataclass(slots=True)
+class DirectorySize:
+    """Size of a directory tree."""
+
+    path: str
+    size: int
+    files: int
+    depth: int
+
+
+@dataclass(slots=True)
+class _ScannedDirectory:
+    """A directory's own contents, cached against its mtime."""
+
+    mtime_ns: int
+    size: int
+    files: int
+    subdirectories: list[str]
+
+
+class DirectoryScanner(Base):
+    """Measure directory trees, like du, walking subtrees in parallel.
+
+    A directory's listing is cached against its mtime, which changes when
+    entries are added, removed or renamed. Repeat scans stat each directory
+    but only list the ones that changed. Files growing in place do not
+    change their directory's mtime, so their new size is only seen once the
+    directory changes. Sizes are allocated blocks where available, and hard
+    links are counted once per link.
+    """
+
+    def __init__(self, workers: int = 8, one_filesystem: bool = True) -> None:
+        """Initialise."""
+        super().__init__()
+        self._one_filesystem = one_filesystem
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="directory_scanner"
+        )
+        self._cache: dict[str, _ScannedDirectory] = {}
+
+        # Directories listed, and skipped as unchanged
+        self.directories_listed = 0
+        self.directories_cached = 0
+
+    def _scan_directory(
+        self,
+        path: str,
+        device: int | None,
+        cancel_event: threading.Event | None,
+    ) -> _ScannedDirectory | None:
+        """Read a directory's own files, or reuse them if unchanged."""
+        if cancel_event is not None and cancel_event.is_set():
+            raise DirectoryScanCancelledError(path)
+        try:
+            stat = os.stat(path, follow_symlinks=False)
+        except OSError:
+            return None
+        if device is not None and stat.st_dev != device:
+            return None
+        cached = self._cache.get(path)
+        if cached is not None and cached.mtime_ns == stat.st_mtime_ns:
+            self.directories_cached += 1
+            return cached
+
+        self.directories_listed += 1
+        size = files = 0
+        subdirectories: list[str] = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirectories.append(entry.path)
+                            continue
+                        entry_stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    blocks = getattr(entry_stat, "st_blocks", None)
+                    size += blocks * 512 if blocks is not None else entry_stat.st_size
+                    files += 1
+        except OSError as error:
+            self._logger.debug("Cannot list %s: %s", path, error)
+        scanned = _ScannedDirectory(stat.st_mtime_ns, size, files, subdirectories)
+        self._cache[path] = scanned
+        return scanned
+
+    def scan(
+        self,
+        path: str,
+        cancel_event: threading.Event | None = None,
+    ) -> dict[str, DirectorySize]:
+        """Measure every directory under a path.
+
+        Set cancel_event to stop the scan with DirectoryScanCancelledError.
+        Directories already listed stay cached, so a later scan resumes
+        quickly.
+        """
+        root = os.path.abspath(path)
+        device = os.stat(root).st_dev if self._one_filesystem else None
+
+        # Walk a level at a time, listing each level's directories in parallel
+        found: dict[str, tuple[int, _ScannedDirectory]] = {}
+        frontier = [root]
+        depth = 0
+        while frontier:
+            scanned = self._executor.map(
+                lambda directory: self._scan_directory(directory, device, cancel_event),
+                frontier,
+            )
+            next_frontier: list[str] = []
+            for directory, result in zip(frontier, scanned, strict=True):
+                if result is not None:
+                    found[directory] = (depth, result)
+                    next_frontier.extend(result.subdirectories)
+            frontier = next_frontier
+            depth += 1
+
+        # Forget directories under the root that no longer exist
+        prefix = os.path.join(root, "")
+        for directory in [
+            directory
+            for directory in self._cache
+            if directory.startswith(prefix) and directory not in found
+        ]:
+            del self._cache[directory]
+
+        # Add each directory to its parent, deepest first
+        sizes = {
+            directory: DirectorySize(directory, result.size, result.files, depth)
+            for directory, (depth, result) in found.items()
+        }
+        for directory in sorted(sizes, key=lambda item: -sizes[item].depth):
+            if directory != root:
+                parent = sizes[os.path.dirname(directory)]
+                parent.size += sizes[directory].size
+                parent.files += sizes[directory].files
+        return sizes
+
+    def get_largest(
+        self,
+        path: str,
+        count: int = 10,
+        max_depth: int | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> list[DirectorySize]:
+        """Get the largest directories under a path, down to a depth."""
+        return heapq.nlargest(
+            count,
+            (
+                size
+                for size in self.scan(path, cancel_event).values()
+                if size.depth > 0 and (max_depth is None or size.depth <= max_depth)
+            ),
+            key=lambda size: size.size,
+        )
+
+    def close(self) -> None:
+        """Shut down the scanner's threads."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+@dataclass(slots=True)
+class BlockDevice:
+    """A block device, and the devices it sits on."""
+
+    name: str
+    kind: BlockDeviceKind
+    # The disk of a partition, or the devices under a device mapper or RAID
+    parents: tuple[str, ...] = ()
+    # The disks at the bottom of the stack, which count all of its I/O
+    disks: tuple[str, ...] = ()
+
+
+class BlockDevices(Base):
+    """Block devices and how they stack, read from /sys/block.
+
+    The model is read once, and again when get is given names it was not
+    read for, as happens when a device is plugged in or removed.
+    """
+
+    def __init__(self, sysfs_path: str = "/sys") -> None:
+        """Initialise."""
+        super().__init__()
+        self._path = os.path.join(sysfs_path, "block")
+        self._devices: dict[str, BlockDevice] = {}
+        self._names: frozenset[str] | None = None
+        self.refreshes = 0
+
+    def get(self, names: Collection[str] | None = None) -> dict[str, BlockDevice]:
+        """Get the devices, reading them again if the names changed."""
+        if self._names is None or (names is not None and self._names != names):
+            self._devices = self._read()
+            self._names = frozenset(self._devices if names is None else names)
+            self.refreshes += 1
+        return self._devices
+
+    def _read(self) -> dict[str, BlockDevice]:
+        """Read the devices from /sys/block."""
+        devices: dict[str, BlockDevice] = {}
+        try:
+            entries = os.listdir(self._path)
+        except OSError:
+            return devices
+        for entry in entries:
+            # Names with a slash, like cciss/c0d0, use ! in sysfs
+            name = entry.replace("!", "/")
+            path = os.path.join(self._path, entry)
+            try:
+                parents = tuple(
+                    sorted(
+                        slave.replace("!", "/")
+                        for slave in os.listdir(os.path.join(path, "slaves"))
+                    )
+                )
+            except OSError:
+                parents = ()
+            kind: BlockDeviceKind = next(
+                (
+                    kind
+                    for prefix, kind in BLOCK_DEVICE_PREFIXES
+                    if name.startswith(prefix)
+                ),
+                "disk",
+            )
+            devices[name] = BlockDevice(name, kind, parents)
+            try:
+                with os.scandir(path) as children:
+                    for child in children:
+                        if os.path.exists(os.path.join(child.path, "partition")):
+                            partition = child.name.replace("!", "/")
+                            devices[partition] = BlockDevice(
+                                partition, "partition", (name,)
+                            )
+            except OSError:
+                continue
+        for device in devices.values():
+            device.disks = self._resolve(devices, device.name, set())
+        return devices
+
+    def _resolve(
+        self,
+        devices: dict[str, BlockDevice],
+        name: str,
+        seen: set[str],
+    ) -> tuple[str, ...]:
+        """Find the disks at the bottom of a device's stack."""
+        device = devices.get(name)
+        if device is None or not device.parents or name in seen:
+            return (name,)
+        disks: dict[str, None] = {}
+        for parent in device.parents:
+            disks.update(dict.fromkeys(self._resolve(devices, parent, seen | {name})))
+        return tuple(disks)
+
 
 class Disks(Base):
     """Disks data."""
 
+    def __init__(
+        self,
+        file_watcher: FileWatcher | None = None,
+        reuse: bool = False,
+        backend: Backend | None = None,
+        block_devices: BlockDevices | None = None,
+    ) -> None:
+        """Initialise.
+
+        With reuse, per disk and per partition models are updated in place
+        by the next call rather than allocated again, so copy any that need
+        keeping.
+        """
+        super().__init__()
+        self._backend = backend or get_backend()
+        self.history: MetricHistory | None = None
+
+        # How devices stack, for filtering and rolling up per disk counters
+        self.block_devices = block_devices or BlockDevices()
+        # The devices to report for each set of filters, until a hotplug
+        self._selections: dict[tuple, dict[str, tuple[str, ...]]] = {}
+        self._selections_for: dict[str, BlockDevice] | None = None
+
+        # Keyed by disk name, and by (device, mount point)
+        self._io_counters_pool: ModelPool[str, DiskIOCounters] | None = None
+        self._partitions_pool: ModelPool[tuple[str, str], DiskPartition] | None = None
+        if reuse:
+            self._io_counters_pool = ModelPool(
+                lambda _: DiskIOCounters(0, 0, 0, 0, 0, 0)
+            )
+            self._partitions_pool = ModelPool(
+                lambda key: DiskPartition(key[0], key[1], "", "", -1, -1)
+            )
+
+        # The mount table only changes when something is (un)mounted
+        self._disk_partitions: WatchedValue | None = None
+        if sys.platform == "linux":
+            self._disk_partitions = (file_watcher or get_file_watcher()).cached(
+                MOUNTINFO_PATH, self._get_disk_partitions, cost=8
+            )
+
+        self._directory_scanner: DirectoryScanner | None = None
+
     def get_io_counters(self) -> DiskIOCounters | None:
         """Disk IO counters."""
-        if (data := disk_io_counters()) is None:
+        if (data := self._backend.disk_io_counters()) is None:
             return None
 
+        if self.history is not None:
+            self.history.append_many(
+                {
+                    "disks.read_bytes": data.read_bytes,
+                    "disks.write_bytes": data.write_bytes,
+                }
+            )
         return DiskIOCounters(
             read_bytes=data.read_bytes,
             write_bytes=data.write_bytes,
@@ -23,45 +361,178 @@ class Disks(Base):
             write_time=data.write_time,
         )
 
-    def get_io_counters_per_disk(self) -> dict[str, DiskIOCounters]:
-        """Disk IO counters per disk."""
+    def _select_disks(
+        self,
+        names: Collection[str],
+        include: tuple[NamePattern, ...] | None,
+        exclude: tuple[NamePattern, ...] | None,
+        kinds: frozenset[str] | None,
+        rollup: bool,
+    ) -> dict[str, tuple[str, ...]]:
+        """Map each device to the names to report it under, if any."""
+        devices = self.block_devices.get(names)
+        if devices is not self._selections_for:
+            # Devices were plugged in or removed
+            self._selections.clear()
+            self._selections_for = devices
+        key = (include, exclude, kinds, rollup)
+        if (selection := self._selections.get(key)) is not None:
+            return selection
+
+        name_filter = NameFilter(include, exclude)
+        selection = {}
+        for name in names:
+            device = devices.get(name) or BlockDevice(name, "disk", (), (name,))
+            if (kinds is not None and device.kind not in kinds) or (
+                name_filter.classify(name) is None
+            ):
+                selection[name] = ()
+            elif rollup:
+                # The kernel counts I/O to a partition or mapper on its disks
+                selection[name] = device.disks or (name,)
+            else:
+                selection[name] = (name,)
+        self._selections[key] = selection
+        return selection
+
+    def get_io_counters_per_disk(
+        self,
+        include: Iterable[NamePattern] | None = None,
+        exclude: Iterable[NamePattern] | None = None,
+        kinds: Iterable[BlockDeviceKind] | None = None,
+        rollup: bool = False,
+    ) -> dict[str, DiskIOCounters]:
+        """Disk IO counters per disk.
+
+        Devices can be filtered by name, with globs or compiled regular
+        expressions, and by kind, like ["disk", "partition"] to skip loop
+        and RAM disks. With rollup, partitions, device mappers and RAID
+        arrays are reported as the disks under them, each disk once with
+        its own counters, which already include theirs.
+        """
         result: dict[str, DiskIOCounters] = {}
-        if (data := disk_io_counters(perdisk=True)) is None:
+        if (data := self._backend.disk_io_counters(perdisk=True)) is None:
             return result
 
-        for disk, counters in data.items():
-            result[disk] = DiskIOCounters(
-                read_bytes=counters.read_bytes,
-                write_bytes=counters.write_bytes,
-                read_count=counters.read_count,
-                write_count=counters.write_count,
-                read_time=counters.read_time,
-                write_time=counters.write_time,
+        if include is not None or exclude is not None or kinds is not None or rollup:
+            selection = self._select_disks(
+                data.keys(),
+                tuple(include) if include is not None else None,
+                tuple(exclude) if exclude is not None else None,
+                frozenset(kinds) if kinds is not None else None,
+                rollup,
             )
+            selected = {}
+            for targets in selection.values():
+                for target in targets:
+                    if target not in selected and target in data:
+                        selected[target] = data[target]
+            data = selected
+
+        pool = self._io_counters_pool
+        for disk, counters in data.items():
+            if pool is None:
+                result[disk] = DiskIOCounters(
+                    read_bytes=counters.read_bytes,
+                    write_bytes=counters.write_bytes,
+                    read_count=counters.read_count,
+                    write_count=counters.write_count,
+                    read_time=counters.read_time,
+                    write_time=counters.write_time,
+                )
+                continue
+            model = result[disk] = pool.get(disk)
+            model.read_bytes = counters.read_bytes
+            model.write_bytes = counters.write_bytes
+            model.read_count = counters.read_count
+            model.write_count = counters.write_count
+            model.read_time = counters.read_time
+            model.write_time = counters.write_time
+        if pool is not None:
+            pool.sweep()
 
         return result
 
     def get_partitions(self) -> list[DiskPartition]:
         """Disk partitions."""
-        data = disk_partitions(all=True)
-
-        return [
-            DiskPartition(
-                device=item.device,
-                mount_point=item.mountpoint,
-                filesystem_type=item.fstype,
-                options=item.opts,
-                max_file_size=item.maxfile,
-                max_path_length=item.maxpath,
-                usage=self.get_usage(item.mountpoint),
+        data = (
+            self._disk_partitions.get()
+            if self._disk_partitions is not None
+            else self._get_disk_partitions()
+        )
+
+        if (pool := self._partitions_pool) is None:
+            return [
+                DiskPartition(
+                    device=item.device,
+                    mount_point=item.mountpoint,
+                    filesystem_type=item.fstype,
+                    options=item.opts,
+                    # Removed in psutil 6.0
+                    max_file_size=item.maxfile if hasattr(item, "maxfile") else -1,
+                    max_path_length=item.maxpath if hasattr(item, "maxpath") else -1,
+                    usage=self.get_usage(item.mountpoint),
+                )
+                for item in data
+            ]
+
+        partitions: list[DiskPartition] = []
+        for item in data:
+            partition = pool.get((item.device, item.mountpoint))
+            partition.filesystem_type = item.fstype
+            partition.options = item.opts
+            partition.max_file_size = item.maxfile if hasattr(item, "maxfile") else -1
+            partition.max_path_length = item.maxpath if hasattr(item, "maxpath") else -1
+            partition.usage = self._update_usage(partition.usage, item.mountpoint)
+            partitions.append(partition)
+        pool.sweep()
+        return partitions
+
+    def _get_disk_partitions(self) -> list:
+        """Read the mount table."""
+        return self._backend.disk_partitions(all=True)
+
+    def get_largest_directories(
+        self,
+        path: str,
+        count: int = 10,
+        max_depth: int | None = None,
+        cancel_event: threading.Event | None = None,
+    ) -> list[DirectorySize]:
+        """Get the largest directories under a path."""
+        if self._directory_scanner is None:
+            self._directory_scanner = DirectoryScanner()
+        return self._directory_scanner.get_largest(path, count, max_depth, cancel_event)
+
+    def close(self) -> None:
+        """Shut down the directory scanner's threads."""
+        if self._directory_scanner is not None:
+            self._directory_scanner.close()
+            self._directory_scanner = None
+
+    def _update_usage(self, usage: DiskUsage | None, path: str) -> DiskUsage | None:
+        """Update a partition's usage in place, if it had one."""
+        if usage is None:
+            return self.get_usage(path)
+        try:
+            data = self._backend.disk_usage(path)
+        except (FileNotFoundError, PermissionError) as error:
+            self._logger.warning(
+                "Error getting disk usage for: %s",
+                path,
+                exc_info=error,
             )
-            for item in data
-        ]
+            return None
+        usage.total = data.total
+        usage.used = data.used
+        usage.free = data.free
+        usage.percent = data.percent
+        return usage
 
     def get_usage(self, path: str) -> DiskUsage | None:
         """Disk usage."""
         try:
-            data = disk_usage(path)
+            data = self._backend.disk_usage(path)
             return DiskUsage(
                 total=data.total,
                 used=data.used,
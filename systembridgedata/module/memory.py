@@ -1,17 +1,39 @@
 """Memory."""
 
-from psutil import swap_memory, virtual_memory
 from systembridgemodels.modules.memory import MemorySwap, MemoryVirtual
 
 from systembridgeshared.base import Base
 
+from ..backend import Backend, get_backend
+from ..history import MetricHistory
+from .cgroup import Cgroup
+
 
 class Memory(Base):
     """Memory data."""
 
+    def __init__(
+        self,
+        cgroup: Cgroup | None = None,
+        backend: Backend | None = None,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._backend = backend or get_backend()
+
+        # When running in a container, report against the cgroup's limits
+        self._cgroup: Cgroup | None = (
+            cgroup if cgroup is not None and cgroup.available else None
+        )
+        self.history: MetricHistory | None = None
+
     def get_swap(self) -> MemorySwap:
         """Swap memory."""
-        data = swap_memory()
+        data = self._backend.swap_memory()
+        if self.history is not None:
+            self.history.append_many(
+                {"memory.swap.used": data.used, "memory.swap.percent": data.percent}
+            )
         return MemorySwap(
             total=data.total,
             used=data.used,
@@ -23,7 +45,31 @@ class Memory(Base):
 
     def get_virtual(self) -> MemoryVirtual:
         """Virtual memory."""
-        data = virtual_memory()
+        virtual = self._get_virtual()
+        if self.history is not None:
+            self.history.append_many(
+                {
+                    "memory.virtual.used": virtual.used,
+                    "memory.virtual.percent": virtual.percent,
+                }
+            )
+        return virtual
+
+    def _get_virtual(self) -> MemoryVirtual:
+        """Virtual memory, against the cgroup limit when set."""
+        data = self._backend.virtual_memory()
+        if self._cgroup is not None:
+            memory = self._cgroup.get_memory()
+            if memory.limit is not None and memory.limit < data.total:
+                used = memory.working_set or 0
+                available = max(memory.limit - used, 0)
+                return MemoryVirtual(
+                    total=memory.limit,
+                    available=available,
+                    percent=round(used / memory.limit * 100, 1),
+                    used=used,
+                    free=available,
+                )
         return MemoryVirtual(
             total=data.total,
             available=data.available,
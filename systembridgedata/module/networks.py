@@ -1,6 +1,11 @@
 """Network."""
 
-from psutil import net_connections, net_if_addrs, net_if_stats, net_io_counters
+from __future__ import annotations
+
+from collections.abc import Iterable, Iterator, Mapping
+from dataclasses import dataclass, field
+from typing import Any, Final, TypeVar
+
 from systembridgemodels.modules.networks import (
     NetworkAddress,
     NetworkConnection,
@@ -10,18 +15,102 @@ from systembridgemodels.modules.networks import (
 
 from systembridgeshared.base import Base
 
+from ..backend import Backend, get_backend
+from ..history import MetricHistory
+from ..names import NameFilter, NamePattern
+from ..pool import ModelPool
+
+T = TypeVar("T")
+
+NETWORK_IO_FIELDS: Final[tuple[str, ...]] = (
+    "bytes_sent",
+    "bytes_recv",
+    "packets_sent",
+    "packets_recv",
+    "errin",
+    "errout",
+    "dropin",
+    "dropout",
+)
+
+
+@dataclass(slots=True)
+class NetworkRollup:
+    """Interfaces counted as one, like the virtual interfaces of every pod."""
+
+    interfaces: int = 0
+    up: int = 0
+    down: int = 0
+    io: NetworkIO = field(
+        default_factory=lambda: NetworkIO(**dict.fromkeys(NETWORK_IO_FIELDS, 0))
+    )
+
+
+def _new_connection(key: tuple[Any, ...]) -> NetworkConnection:
+    """Build a connection model from its identity."""
+    fd, family, kind, laddr, raddr, pid = key
+    return NetworkConnection(
+        fd=fd,
+        family=family,
+        type=kind,
+        laddr=str(laddr),
+        raddr=str(raddr),
+        pid=pid,
+    )
+
 
 class Networks(Base):
     """Networks data."""
 
+    def __init__(
+        self,
+        reuse: bool = False,
+        backend: Backend | None = None,
+        include: Iterable[NamePattern] | None = None,
+        exclude: Iterable[NamePattern] | None = None,
+        rollups: Mapping[str, Iterable[NamePattern]] | None = None,
+    ) -> None:
+        """Initialise.
+
+        With reuse, connection and interface models are updated in place by
+        the next call rather than allocated again, so copy any that need
+        keeping.
+
+        Interfaces are filtered by name before any model is built, using
+        globs or compiled regular expressions. Interfaces matching a rollup,
+        such as {"pods": ["veth*", "cali*"]}, are only reported in total by
+        get_rollups.
+        """
+        super().__init__()
+        self._backend = backend or get_backend()
+        self._filter = NameFilter(include, exclude, rollups)
+        self.history: MetricHistory | None = None
+
+        # Connections keyed by everything but their status, stats by interface
+        self._connections_pool: ModelPool[tuple, NetworkConnection] | None = None
+        self._stats_pool: ModelPool[str, NetworkStats] | None = None
+        if reuse:
+            self._connections_pool = ModelPool(_new_connection)
+            self._stats_pool = ModelPool(lambda _: NetworkStats())
+
+    def _interfaces(self, data: dict[str, T]) -> Iterator[tuple[str, T]]:
+        """Iterate over the interfaces reported on their own."""
+        if not self._filter:
+            yield from data.items()
+            return
+        classify = self._filter.classify
+        for name, value in data.items():
+            if (match := classify(name)) is not None and not match[1]:
+                yield name, value
+
     def get_addresses(
         self,
     ) -> dict[str, list[NetworkAddress]]:
         """Addresses."""
-        data = net_if_addrs()
+        data = self._backend.net_if_addrs()
 
         result = {}
-        for key, value in data.items():
+        for key, value in self._interfaces(data):
             result[key] = [
                 NetworkAddress(
                     address=item.address,
@@ -36,7 +125,18 @@ class Networks(Base):
 
     def get_connections(self) -> list[NetworkConnection]:
         """Get connections."""
-        data = net_connections("all")
+        data = self._backend.net_connections("all")
+
+        if (pool := self._connections_pool) is not None:
+            connections: list[NetworkConnection] = []
+            for item in data:
+                connection = pool.get(
+                    (item.fd, item.family, item.type, item.laddr, item.raddr, item.pid)
+                )
+                connection.status = item.status
+                connections.append(connection)
+            pool.sweep()
+            return connections
 
         return [
             NetworkConnection(
@@ -53,8 +153,15 @@ class Networks(Base):
 
     def get_io_counters(self) -> NetworkIO:
         """IO Counters."""
-        data = net_io_counters()
+        data = self._backend.net_io_counters()
 
+        if self.history is not None:
+            self.history.append_many(
+                {
+                    "networks.bytes_sent": data.bytes_sent,
+                    "networks.bytes_recv": data.bytes_recv,
+                }
+            )
         return NetworkIO(
             bytes_sent=data.bytes_sent,
             bytes_recv=data.bytes_recv,
@@ -68,10 +175,21 @@ class Networks(Base):
 
     def get_stats(self) -> dict[str, NetworkStats]:
         """Stats."""
-        data = net_if_stats()
+        data = self._backend.net_if_stats()
 
         result = {}
-        for key, value in data.items():
+        if (pool := self._stats_pool) is not None:
+            for key, value in self._interfaces(data):
+                stats = result[key] = pool.get(key)
+                stats.isup = value.isup
+                stats.duplex = str(value.duplex)
+                stats.speed = value.speed
+                stats.mtu = value.mtu
+                stats.flags = value.flags.split(",") if value.flags else None
+            pool.sweep()
+            return result
+
+        for key, value in self._interfaces(data):
             result[key] = NetworkStats(
                 isup=value.isup,
                 duplex=str(value.duplex),
@@ -81,3 +199,53 @@ class Networks(Base):
             )
 
         return result
+
+    def get_io_counters_per_interface(self) -> dict[str, NetworkIO]:
+        """IO counters per interface."""
+        data = self._backend.net_io_counters(pernic=True)
+
+        return {
+            key: NetworkIO(
+                bytes_sent=value.bytes_sent,
+                bytes_recv=value.bytes_recv,
+                packets_sent=value.packets_sent,
+                packets_recv=value.packets_recv,
+                errin=value.errin,
+                errout=value.errout,
+                dropin=value.dropin,
+                dropout=value.dropout,
+            )
+            for key, value in self._interfaces(data)
+        }
+
+    def get_rollups(self) -> dict[str, NetworkRollup]:
+        """Totals for each rollup, reported even when no interface matches."""
+        rollups = {name: NetworkRollup() for name in self._filter.rollups}
+        if not rollups:
+            return rollups
+        classify = self._filter.classify
+
+        for key, value in self._backend.net_if_stats().items():
+            if (match := classify(key)) is not None and match[1]:
+                rollup = rollups[match[0]]
+                rollup.interfaces += 1
+                if value.isup:
+                    rollup.up += 1
+                else:
+                    rollup.down += 1
+
+        for key, value in self._backend.net_io_counters(pernic=True).items():
+            if (match := classify(key)) is not None and match[1]:
+                io = rollups[match[0]].io
+                for name in NETWORK_IO_FIELDS:
+                    setattr(io, name, getattr(io, name) + getattr(value, name))
+
+        if self.history is not None:
+            self.history.append_many(
+                {
+                    f"networks.rollups.{name}.{counter}": getattr(rollup.io, counter)
+                    for name, rollup in rollups.items()
+                    for counter in ("bytes_sent", "bytes_recv")
+                }
+            )
+        return rollups
@@ -1,34 +1,557 @@
 """Processes."""
-from psutil import AccessDenied, NoSuchProcess, process_iter
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Iterable, Sequence
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import contextlib
+from dataclasses import dataclass
+import functools
+import heapq
+import time
+from typing import Any, Final, Literal
+
+import psutil
+from psutil import AccessDenied, NoSuchProcess
 from systembridgemodels.modules.processes import Process
 
 from systembridgeshared.base import Base
 
+from ..backend import Backend, get_backend
+from ..pool import ModelPool
+
+# (pid, name, cpu time, created, rss, status)
+ProcessRecord = tuple[
+    int,
+    str | None,
+    float | None,
+    float | None,
+    int | None,
+    str | None,
+]
+
+# Cheap fields, read for every process, and their psutil accessors
+EAGER_FIELDS: Final[tuple[tuple[str, str], ...]] = (
+    ("name", "name"),
+    ("cpu_usage", "cpu_percent"),
+    ("created", "create_time"),
+    ("memory_usage", "memory_percent"),
+    ("status", "status"),
+)
+
+# Expensive fields, only read when first accessed
+LAZY_FIELDS: Final[dict[str, str]] = {
+    "path": "exe",
+    "username": "username",
+}
+
+# Shards per worker, so a slow shard does not hold up the whole scan
+SHARDS_PER_WORKER = 4
+
+
+def _init_shard_worker(procfs_path: str) -> None:
+    """Initialise a shard worker process."""
+    psutil.PROCFS_PATH = procfs_path
+
+
+def _scan_shard(backend: Backend, shard: Sequence[int]) -> list[ProcessRecord]:
+    """Read the process details for a shard of PIDs."""
+    records: list[ProcessRecord] = []
+    for pid in shard:
+        try:
+            process = backend.process(pid)
+        except NoSuchProcess:
+            continue
+        values: list = []
+        try:
+            with process.oneshot():
+                values.append(process.name())
+                cpu_times = process.cpu_times()
+                values.append(cpu_times.user + cpu_times.system)
+                values.append(process.create_time())
+                values.append(process.memory_info().rss)
+                values.append(process.status())
+        except (AccessDenied, NoSuchProcess, OSError):
+            pass
+        values.extend([None] * (5 - len(values)))
+        records.append((pid, *values))  # type: ignore[arg-type]
+    return records
+
+
+@dataclass(slots=True)
+class FieldCost:
+    """Time spent reading a process field."""
+
+    calls: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+    @property
+    def average(self) -> float:
+        """Average seconds per call."""
+        return self.seconds / self.calls if self.calls else 0.0
+
+
+def _lazy_field(name: str) -> property:
+    """Build a property reading a field from psutil on first access."""
+    slot = getattr(Process, name)
+
+    def getter(self: LazyProcess) -> Any:
+        if name not in self._resolved:
+            self._resolved.add(name)
+            slot.__set__(self, self._owner.read_field(self, name))
+        return slot.__get__(self, Process)
+
+    def setter(self: LazyProcess, value: Any) -> None:
+        self._resolved.add(name)
+        slot.__set__(self, value)
+
+    return property(getter, setter)
+
+
+class LazyProcess(Process):
+    """A process whose expensive fields are read on first access.
+
+    Comparing, printing or serialising one reads every field.
+    """
+
+    __slots__ = ("_owner", "_process", "_resolved")
+
+    def __init__(
+        self,
+        owner: Processes,
+        process: Any | None,
+        **kwargs: Any,
+    ) -> None:
+        """Initialise."""
+        self._owner = owner
+        self._process = process
+        self._resolved: set[str] = set()
+        super().__init__(**kwargs)
+        self._resolved.intersection_update(kwargs)
+
+    path = _lazy_field("path")
+    username = _lazy_field("username")
+
+
+def _get_pooled(
+    pool: ModelPool[int, LazyProcess],
+    pid: int,
+    process: Any | None,
+) -> LazyProcess:
+    """Get a process's model from the pool.
+
+    Cheap fields are reset, so a read failing partway leaves them None as
+    for a new model, and expensive fields are read again on access, since
+    the pid may have been reused.
+    """
+    model = pool.get(pid)
+    model._process = process  # pylint: disable=protected-access
+    model._resolved.clear()  # pylint: disable=protected-access
+    for name, _ in EAGER_FIELDS:
+        setattr(model, name, None)
+    return model
+
 
 class Processes(Base):
     """Processes data."""
 
+    def __init__(
+        self,
+        workers: int = 0,
+        executor: Literal["process", "thread"] = "process",
+        reuse: bool = False,
+        backend: Backend | None = None,
+    ) -> None:
+        """Initialise.
+
+        With workers > 0, processes are scanned in parallel shards. With
+        reuse, each process's model is updated in place by the next call
+        rather than allocated again, so copy any that need keeping.
+        """
+        super().__init__()
+        self._backend = backend or get_backend()
+        self._workers = workers
+        self._executor_type = executor
+        self._executor: Executor | None = None
+
+        # Previous CPU time per (pid, created), for parallel CPU usage
+        self._cpu_times: dict[tuple[int, float | None], float] = {}
+        self._cpu_times_at: float | None = None
+
+        self._processes: dict[int, LazyProcess] = {}
+        self._pool: ModelPool[int, LazyProcess] | None = (
+            ModelPool(lambda pid: LazyProcess(self, None, id=pid)) if reuse else None
+        )
+        self.field_costs: dict[str, FieldCost] = {
+            name: FieldCost() for name, _ in EAGER_FIELDS
+        } | {name: FieldCost() for name in LAZY_FIELDS}
+
+    def _get_executor(self) -> Executor:
+        """Get the shard executor."""
+        if self._executor is None:
+            if self._executor_type == "thread":
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers,
+                    thread_name_prefix="processes",
+                )
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._workers,
+                    initializer=_init_shard_worker,
+                    initargs=(psutil.PROCFS_PATH,),
+                )
+        return self._executor
+
+    def close(self) -> None:
+        """Shut down the shard executor."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def _read(self, process: Any, name: str, accessor: str) -> Any:
+        """Read a field from psutil, recording its cost."""
+        cost = self.field_costs[name]
+        started = time.perf_counter()
+        try:
+            return getattr(process, accessor)()
+        except (AccessDenied, NoSuchProcess, OSError):
+            cost.errors += 1
+            raise
+        finally:
+            cost.calls += 1
+            cost.seconds += time.perf_counter() - started
+
+    def read_field(self, model: LazyProcess, name: str) -> Any:
+        """Read an expensive field of a process."""
+        process = model._process  # pylint: disable=protected-access
+        try:
+            if process is None:
+                # Scanned in a worker, so check the pid was not reused since
+                process = self._backend.process(int(model.id))
+                created = process.create_time()
+                if model.created is not None and created != model.created:
+                    return None
+                model._process = process  # pylint: disable=protected-access
+            return self._read(process, name, LAZY_FIELDS[name])
+        except (AccessDenied, NoSuchProcess, OSError):
+            return None
+
+    def resolve(
+        self,
+        fields: Iterable[str],
+        pids: Iterable[int],
+    ) -> dict[int, LazyProcess]:
+        """Read expensive fields for a few processes from the last list."""
+        fields = [field for field in fields if field in LAZY_FIELDS]
+        resolved: dict[int, LazyProcess] = {}
+        for pid in pids:
+            if (model := self._processes.get(pid)) is None:
+                continue
+            process = model._process  # pylint: disable=protected-access
+            if process is not None and hasattr(process, "oneshot"):
+                with process.oneshot():
+                    for field in fields:
+                        getattr(model, field)
+            else:
+                for field in fields:
+                    getattr(model, field)
+            resolved[pid] = model
+        return resolved
+
     def get_processes(self) -> list[Process]:
         """Update all data."""
-        process_list = list(process_iter())
+        if self._workers > 0:
+            return self._get_processes_parallel()
 
         # Get names of processes
-        items = []
-        for process in process_list:
-            model = Process(id=process.pid)
+        items: list[LazyProcess] = []
+        for process in self._backend.process_iter():
+            if self._pool is None:
+                model = LazyProcess(self, process, id=process.pid)
+            else:
+                model = _get_pooled(self._pool, process.pid, process)
 
             try:
-                model.name = process.name()
-                model.cpu_usage = process.cpu_percent()
-                model.created = process.create_time()
-                model.memory_usage = process.memory_percent()
-                model.path = process.exe()
-                model.status = process.status()
-                model.username = process.username()
-            except (AccessDenied, NoSuchProcess, OSError):
+                for name, accessor in EAGER_FIELDS:
+                    setattr(model, name, self._read(process, name, accessor))
+            except NoSuchProcess:
+                # Gone, so there is nothing left to read later
+                model.path = None
+                model.username = None
+            except (AccessDenied, OSError):
                 pass
             items.append(model)
+        if self._pool is not None:
+            self._pool.sweep()
         # Sort by name
         items = sorted(items, key=lambda item: item.name or "")
+        self._processes = {int(item.id): item for item in items}
+
+        return items  # type: ignore[return-value]
+
+    def _get_processes_parallel(self) -> list[Process]:
+        """Scan processes in shards across the worker pool."""
+        pid_list = self._backend.pids()
+        shard_size = max(1, -(-len(pid_list) // (self._workers * SHARDS_PER_WORKER)))
+        shards = [
+            pid_list[index : index + shard_size]
+            for index in range(0, len(pid_list), shard_size)
+        ]
+
+        results = self._get_executor().map(
+            functools.partial(_scan_shard, self._backend), shards
+        )
+
+        now = time.monotonic()
+        elapsed = now - self._cpu_times_at if self._cpu_times_at else None
+        memory_total = self._backend.virtual_memory().total
+        previous_cpu_times = self._cpu_times
+        cpu_times: dict[tuple[int, float | None], float] = {}
+
+        # Merge the shards in a single pass
+        items: list[LazyProcess] = []
+        for records in results:
+            for pid, name, cpu_time, created, rss, status in records:
+                if self._pool is None:
+                    model = LazyProcess(
+                        self,
+                        None,
+                        id=pid,
+                        name=name,
+                        created=created,
+                        status=status,
+                    )
+                else:
+                    model = _get_pooled(self._pool, pid, None)
+                    model.name = name
+                    model.status = status
+                    model.created = created
+                if cpu_time is not None:
+                    key = (pid, created)
+                    cpu_times[key] = cpu_time
+                    # Matches psutil: the first call for a process returns 0.0
+                    previous = previous_cpu_times.get(key)
+                    model.cpu_usage = (
+                        round((cpu_time - previous) / elapsed * 100, 1)
+                        if previous is not None and elapsed
+                        else 0.0
+                    )
+                if rss is not None:
+                    model.memory_usage = rss / memory_total * 100
+                items.append(model)
+        if self._pool is not None:
+            self._pool.sweep()
+
+        self._cpu_times = cpu_times
+        self._cpu_times_at = now
+
+        # Sort by name
+        items.sort(key=lambda item: item.name or "")
+        self._processes = {int(item.id): item for item in items}
+
+        return items  # type: ignore[return-value]
+
+
+ActivityDimension = Literal[
+    "cpu",
+    "read",
+    "write",
+    "io",
+    "read_chars",
+    "write_chars",
+    "threads",
+    "fds",
+]
+
+# Sort keys for the top consumer queries
+ACTIVITY_DIMENSIONS: Final[dict[str, Any]] = {
+    "cpu": lambda item: item.cpu_usage,
+    "read": lambda item: item.read_bytes_per_second or 0.0,
+    "write": lambda item: item.write_bytes_per_second or 0.0,
+    "io": lambda item: (item.read_bytes_per_second or 0.0)
+    + (item.write_bytes_per_second or 0.0),
+    "read_chars": lambda item: item.read_chars_per_second or 0.0,
+    "write_chars": lambda item: item.write_chars_per_second or 0.0,
+    "threads": lambda item: item.threads or 0,
+    "fds": lambda item: item.fds or 0,
+}
+
+
+@dataclass(slots=True)
+class ProcessActivity:
+    """Activity of a process over a window.
+
+    Bytes are storage I/O, characters all I/O including pipes and sockets.
+    """
+
+    pid: int
+    name: str | None
+    cpu_usage: float
+    read_bytes_per_second: float | None
+    write_bytes_per_second: float | None
+    read_chars_per_second: float | None
+    write_chars_per_second: float | None
+    threads: int | None
+    fds: int | None
+
+
+@dataclass(slots=True)
+class _ActivitySample:
+    """A sample of a process's counters."""
+
+    timestamp: float
+    cpu_time: float
+    # (read bytes, write bytes, read chars, write chars), None when denied
+    io: tuple[int, int, int, int] | None
+    threads: int | None
+    fds: int | None
+
+
+@dataclass(slots=True)
+class _TrackedProcess:
+    """A process followed by the activity tracker."""
+
+    process: Any
+    name: str | None
+    samples: deque[_ActivitySample]
+    active: bool = True
+
+
+class ProcessActivityTracker(Base):
+    """Track per process I/O, threads and open files over a sliding window.
+
+    Every sample reads each process's CPU time and thread count. I/O counters
+    and open file counts are only read for processes whose CPU time moved in
+    this or the previous sample; I/O needs syscalls, so idle processes keep
+    their last counters.
+    """
+
+    def __init__(
+        self,
+        window: float = 300.0,
+        backend: Backend | None = None,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._backend = backend or get_backend()
+        self._window = window
+        self._processes: dict[int, _TrackedProcess] = {}
+
+        # Reads of I/O counters made, and skipped for idle processes
+        self.io_reads = 0
+        self.io_skipped = 0
+
+    def sample(self) -> None:
+        """Sample every process."""
+        now = time.monotonic()
+        horizon = now - self._window
+        tracked: dict[int, _TrackedProcess] = {}
+        for pid in self._backend.pids():
+            try:
+                item = self._sample_process(pid, now)
+            except (AccessDenied, NoSuchProcess, OSError):
+                continue
+            samples = item.samples
+            # Drop samples outside the window, keeping one as the baseline
+            while len(samples) > 2 and samples[1].timestamp <= horizon:
+                samples.popleft()
+            tracked[pid] = item
+        self._processes = tracked
+
+    def _sample_process(self, pid: int, now: float) -> _TrackedProcess:
+        """Sample a process, starting to track it if new."""
+        item = self._processes.get(pid)
+        # Processes cache their start time, so check for a reused pid afresh
+        if item is not None and not item.process.is_running():
+            item = None
+        process = item.process if item is not None else self._backend.process(pid)
+        with process.oneshot():
+            if item is None:
+                item = _TrackedProcess(
+                    process=process,
+                    name=process.name(),
+                    samples=deque(),
+                )
+            cpu_times = process.cpu_times()
+            cpu_time = cpu_times.user + cpu_times.system
+            threads = process.num_threads()
+            previous = item.samples[-1] if item.samples else None
+            active = previous is None or cpu_time != previous.cpu_time
+
+            io: tuple[int, int, int, int] | None = None
+            fds: int | None = None
+            if active or item.active:
+                self.io_reads += 1
+                try:
+                    counters = process.io_counters()
+                    io = (
+                        counters.read_bytes,
+                        counters.write_bytes,
+                        getattr(counters, "read_chars", counters.read_bytes),
+                        getattr(counters, "write_chars", counters.write_bytes),
+                    )
+                except AccessDenied:
+                    pass
+                with contextlib.suppress(AccessDenied):
+                    fds = (
+                        process.num_fds()
+                        if hasattr(process, "num_fds")
+                        else process.num_handles()
+                    )
+            elif previous is not None:
+                self.io_skipped += 1
+                io, fds = previous.io, previous.fds
+            item.active = active
+            item.samples.append(_ActivitySample(now, cpu_time, io, threads, fds))
+        return item
+
+    def get_activity(self, seconds: float = 60.0) -> list[ProcessActivity]:
+        """Get the activity of every process over the last seconds."""
+        start = time.monotonic() - seconds
+        activity: list[ProcessActivity] = []
+        for pid, item in self._processes.items():
+            samples = item.samples
+            last = samples[-1]
+            # The last sample at or before the start, else the oldest
+            first = samples[0]
+            for sample in samples:
+                if sample.timestamp > start:
+                    break
+                first = sample
+            elapsed = last.timestamp - first.timestamp
+            rates: list[float | None] = [None, None, None, None]
+            cpu_usage = 0.0
+            if elapsed > 0:
+                cpu_usage = round((last.cpu_time - first.cpu_time) / elapsed * 100, 1)
+                if first.io is not None and last.io is not None:
+                    rates = [
+                        (end - begin) / elapsed
+                        for begin, end in zip(first.io, last.io, strict=True)
+                    ]
+            activity.append(
+                ProcessActivity(
+                    pid=pid,
+                    name=item.name,
+                    cpu_usage=cpu_usage,
+                    read_bytes_per_second=rates[0],
+                    write_bytes_per_second=rates[1],
+                    read_chars_per_second=rates[2],
+                    write_chars_per_second=rates[3],
+                    threads=last.threads,
+                    fds=last.fds,
+                )
+            )
+        return activity
 
-        return items
+    def get_top(
+        self,
+        dimension: ActivityDimension,
+        seconds: float = 60.0,
+        count: int = 10,
+    ) -> list[ProcessActivity]:
+        """Get the top consumers of a dimension over the last seconds."""
+        return heapq.nlargest(
+            count, self.get_activity(seconds), key=ACTIVITY_DIMENSIONS[dimension]
+        )
@@ -1,61 +1,48 @@
 """Sensors."""
 
-import json
-import subprocess
-import sys
-
-import psutil
 from psutil._common import sfan, shwtemp
 
 from systembridgeshared.base import Base
 
+from ..backend import Backend, get_backend
+from ..history import MetricHistory
+
 
 class Sensors(Base):
     """Sensors data."""
 
+    def __init__(self, backend: Backend | None = None) -> None:
+        """Initialise."""
+        super().__init__()
+        self._backend = backend or get_backend()
+        self.history: MetricHistory | None = None
+
     def get_fans(self) -> dict[str, list[sfan]] | None:
         """Get fans."""
-        if not hasattr(psutil, "sensors_fans"):
+        if (fans := self._backend.sensors_fans()) is None:
             return None
-        return psutil.sensors_fans()  # type: ignore
+        self._record("sensors.fans", fans)
+        return fans
 
     def get_temperatures(self) -> dict[str, list[shwtemp]] | None:
         """Get temperatures."""
-        if not hasattr(psutil, "sensors_temperatures"):
+        if (temperatures := self._backend.sensors_temperatures()) is None:
             return None
-        return psutil.sensors_temperatures(fahrenheit=False)  # type: ignore
+        self._record("sensors.temperatures", temperatures)
+        return temperatures
+
+    def _record(self, prefix: str, data: dict[str, list]) -> None:
+        """Record the current value of each sensor in the history."""
+        if self.history is None or not data:
+            return
+        self.history.append_many(
+            {
+                f"{prefix}.{name}.{item.label or index}": item.current
+                for name, items in data.items()
+                for index, item in enumerate(items)
+            }
+        )
 
     def get_windows_sensors(self) -> dict | None:
         """Get windows sensors."""
-        if sys.platform != "win32":
-            return None
-
-        try:
-            # Import here to not raise error when importing file on linux
-            # pylint: disable=import-error, import-outside-toplevel
-            from systembridgewindowssensors import get_windowssensors_path
-        except (ImportError, ModuleNotFoundError) as exception:
-            self._logger.warning("Windows sensors not found", exc_info=exception)
-            return None
-
-        path = get_windowssensors_path()
-
-        self._logger.debug("Windows sensors path: %s", path)
-        try:
-            with subprocess.Popen(
-                [path],
-                stdout=subprocess.PIPE,
-            ) as pipe:
-                result = pipe.communicate()[0].decode()
-            self._logger.debug("Windows sensors result: %s", result)
-        except Exception as exception:  # pylint: disable=broad-except
-            self._logger.error(
-                "Windows sensors error for path: %s", path, exc_info=exception
-            )
-            return None
-
-        try:
-            return json.loads(result)
-        except json.decoder.JSONDecodeError as exception:
-            self._logger.error("JSONDecodeError", exc_info=exception)
-            return None
+        return self._backend.windows_sensors()
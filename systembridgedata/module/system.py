@@ -1,5 +1,6 @@
 """System."""
 
+from dataclasses import dataclass
 from enum import StrEnum
 import getpass
 import os
@@ -13,13 +14,18 @@ import uuid
 import aiohttp
 from packaging.version import parse
 from plyer import uniqueid
-from psutil import boot_time, users
 from systembridgemodels.modules.system import SystemUser
 
 from systembridgeshared.base import Base
 from systembridgeshared.common import get_user_data_directory
 
 from .._version import __version__
+from ..backend import Backend, get_backend
+from ..filewatch import FileWatcher, WatchedValue, get_file_watcher
+
+MACHINE_ID_PATH = "/var/lib/dbus/machine-id"
+REBOOT_REQUIRED_PATHS = ("/var/run/reboot-required", "/var/run/reboot-required.pkgs")
+UTMP_PATH = "/var/run/utmp"
 
 
 class RunMode(StrEnum):
@@ -29,14 +35,48 @@ class RunMode(StrEnum):
     PYTHON = "python"
 
 
+@dataclass(slots=True)
+class SystemUsersChanges:
+    """Sessions that logged in or out."""
+
+    logged_in: list[SystemUser]
+    logged_out: list[SystemUser]
+
+
+def _session_key(user: SystemUser) -> tuple:
+    """Identify a session."""
+    return (user.name, user.terminal, user.host, user.started, user.pid)
+
+
 class System(Base):
     """System data."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        file_watcher: FileWatcher | None = None,
+        backend: Backend | None = None,
+    ) -> None:
         """Initialise."""
         super().__init__()
+        self._backend = backend or get_backend()
         self._mac_address: str = self.get_mac_address()
 
+        # Facts read from files, cached until the files change
+        file_watcher = file_watcher or get_file_watcher()
+        self._pending_reboot: WatchedValue[bool] | None = None
+        self._machine_id: WatchedValue[str | None] | None = None
+        self._users: WatchedValue[list[SystemUser]] | None = None
+        if sys.platform in ["darwin", "linux"]:
+            self._pending_reboot = file_watcher.cached(
+                REBOOT_REQUIRED_PATHS, self._get_reboot_required, cost=2
+            )
+        if sys.platform == "linux":
+            self._machine_id = file_watcher.cached(
+                MACHINE_ID_PATH, self._read_machine_id
+            )
+            # Parsing utmp and building the list only happens on a login/logout
+            self._users = file_watcher.cached(UTMP_PATH, self._build_users, cost=6)
+
         # Determine the run mode based on the running executable
         self._run_mode: RunMode = (
             RunMode.PYTHON if "python" in sys.executable.lower() else RunMode.STANDALONE
@@ -45,19 +85,20 @@ class System(Base):
 
         # Get the version
         self._version: str | None = None
+        self._version_file: WatchedValue[str] | None = None
         if self._run_mode == RunMode.PYTHON:
             self._version = __version__.public()
+            self._logger.info("Version: %s", self._version)
         if self._run_mode == RunMode.STANDALONE:
-            # Read the version file from the package
-            with open(
+            # Read the version file from the package on first use, again
+            # whenever it changes, logging the version as it is read
+            self._version_file = file_watcher.cached(
                 os.path.join(
                     get_user_data_directory(),
                     "systembridge-version.txt",
                 ),
-                encoding="utf-8",
-            ) as version_file:
-                self._version = version_file.read().strip()
-        self._logger.info("Version: %s", self._version)
+                self._read_version_file,
+            )
 
         # Determine the latest version URL based on the run mode
         self._version_latest_url = f"https://github.com/timmo001/{(
@@ -76,7 +117,7 @@ class System(Base):
 
     def get_boot_time(self) -> float:
         """Get boot time."""
-        return boot_time()
+        return self._backend.boot_time()
 
     def get_camera_usage(self) -> list[str]:
         """Return a list of apps that are currently using the webcam."""
@@ -218,13 +259,14 @@ class System(Base):
                     return True
             except OSError:
                 pass
-        elif sys.platform in ["darwin", "linux"]:
-            if os.path.exists("/var/run/reboot-required"):
-                return True
-            if os.path.exists("/var/run/reboot-required.pkgs"):
-                return True
+        elif self._pending_reboot is not None:
+            return self._pending_reboot.get()
         return False
 
+    def _get_reboot_required(self) -> bool:
+        """Check for the files flagging a required reboot."""
+        return any(os.path.exists(path) for path in REBOOT_REQUIRED_PATHS)
+
     def get_platform(self) -> str:
         """Get platform."""
         return platform.system()
@@ -239,6 +281,26 @@ class System(Base):
 
     def get_users(self) -> list[SystemUser]:
         """Get users."""
+        if self._users is not None:
+            return list(self._users.get())
+        return self._build_users()
+
+    def get_users_changes(self, previous: list[SystemUser]) -> SystemUsersChanges:
+        """Get the sessions that logged in or out since a previous get_users."""
+        current = self.get_users()
+        previous_keys = {_session_key(user) for user in previous}
+        current_keys = {_session_key(user) for user in current}
+        return SystemUsersChanges(
+            logged_in=[
+                user for user in current if _session_key(user) not in previous_keys
+            ],
+            logged_out=[
+                user for user in previous if _session_key(user) not in current_keys
+            ],
+        )
+
+    def _build_users(self) -> list[SystemUser]:
+        """Build the user list from utmp."""
         active_user_name = self.get_active_user_name()
         return [
             SystemUser(
@@ -249,28 +311,52 @@ class System(Base):
                 started=user.started,
                 pid=float(user.pid) if user.pid else 0.0,
             )
-            for user in users()
+            for user in self._backend.users()
         ]
 
     @property
     def _uuid(self) -> str:
         """Get UUID."""
         # cat /var/lib/dbus/machine-id
-        if sys.platform == "linux":
-            try:
-                with open(
-                    "/var/lib/dbus/machine-id",
-                    encoding="utf8",
-                ) as file:
-                    return file.read().strip()
-            except FileNotFoundError:
-                return self._mac_address
+        if self._machine_id is not None:
+            machine_id = self._machine_id.get()
+            return machine_id if machine_id is not None else self._mac_address
 
         try:
             return uniqueid.id or self._mac_address
         except Exception:  # pylint: disable=broad-except
             return self._mac_address
 
+    def _read_machine_id(self) -> str | None:
+        """Read the machine ID."""
+        try:
+            with open(
+                MACHINE_ID_PATH,
+                encoding="utf8",
+            ) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def _read_version_file(self) -> str:
+        """Read the version file."""
+        with open(
+            os.path.join(
+                get_user_data_directory(),
+                "systembridge-version.txt",
+            ),
+            encoding="utf-8",
+        ) as version_file:
+            version = version_file.read().strip()
+        self._logger.info("Version: %s", version)
+        return version
+
+    def _get_version(self) -> str | None:
+        """Get the running version."""
+        if self._version_file is not None:
+            return self._version_file.get()
+        return self._version
+
     async def _check_rate_limit(self) -> int:
         """Check the GitHub API rate limit."""
         async with aiohttp.ClientSession() as session, session.get(
@@ -310,6 +396,6 @@ class System(Base):
 
     def get_version_newer_available(self) -> bool | None:
         """Check if newer version is available."""
-        if self._version_latest is not None and self._version is not None:
-            return parse(self._version_latest) > parse(self._version)
+        if self._version_latest is not None and (version := self._get_version()):
+            return parse(self._version_latest) > parse(version)
         return None
@@ -0,0 +1,97 @@
+"""Name filters."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Mapping
+import fnmatch
+import re
+from typing import Final
+
+# A glob, or a compiled regular expression searched for in the name
+NamePattern = str | re.Pattern[str]
+
+# Cached names before the cache is dropped, as names churn with containers
+MAX_CACHED_NAMES: Final[int] = 65536
+
+
+class _Matcher:
+    """Match names against globs and regular expressions."""
+
+    __slots__ = ("_globs", "_regexes")
+
+    def __init__(self, patterns: Iterable[NamePattern]) -> None:
+        """Initialise."""
+        globs: list[str] = []
+        self._regexes: list[re.Pattern[str]] = []
+        for pattern in patterns:
+            if isinstance(pattern, re.Pattern):
+                self._regexes.append(pattern)
+            else:
+                globs.append(fnmatch.translate(pattern))
+        # One regular expression for every glob
+        self._globs = re.compile("|".join(globs)) if globs else None
+
+    def __bool__(self) -> bool:
+        """Whether there are any patterns."""
+        return self._globs is not None or bool(self._regexes)
+
+    def match(self, name: str) -> bool:
+        """Whether a name matches any pattern."""
+        if self._globs is not None and self._globs.match(name):
+            return True
+        return any(regex.search(name) for regex in self._regexes)
+
+
+class NameFilter:
+    """Include, exclude and roll up names, like network interfaces or disks.
+
+    Excluded names are dropped. Of the rest, names matching a rollup are
+    counted in the first one they match, and the others are kept if they are
+    included, or if there are no include patterns. Each name is matched once
+    and cached.
+    """
+
+    __slots__ = ("_cache", "_exclude", "_include", "_rollups", "rollups")
+
+    def __init__(
+        self,
+        include: Iterable[NamePattern] | None = None,
+        exclude: Iterable[NamePattern] | None = None,
+        rollups: Mapping[str, Iterable[NamePattern]] | None = None,
+    ) -> None:
+        """Initialise."""
+        self._include = _Matcher(include or ())
+        self._exclude = _Matcher(exclude or ())
+        self._rollups = [
+            (name, _Matcher(patterns)) for name, patterns in (rollups or {}).items()
+        ]
+        self.rollups: tuple[str, ...] = tuple(rollups or ())
+        self._cache: dict[str, tuple[str, bool] | None] = {}
+
+    def __bool__(self) -> bool:
+        """Whether the filter drops or rolls up anything."""
+        return bool(self._include or self._exclude or self._rollups)
+
+    def classify(self, name: str) -> tuple[str, bool] | None:
+        """Classify a name.
+
+        Returns None to drop it, (name, False) to keep it, or
+        (rollup, True) to count it in a rollup.
+        """
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        result: tuple[str, bool] | None = None
+        if not self._exclude.match(name):
+            for rollup, matcher in self._rollups:
+                if matcher.match(name):
+                    result = (rollup, True)
+                    break
+            else:
+                if not self._include or self._include.match(name):
+                    result = (name, False)
+        if len(self._cache) >= MAX_CACHED_NAMES:
+            self._cache.clear()
+        self._cache[name] = result
+        return result
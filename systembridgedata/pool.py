@@ -0,0 +1,52 @@
+"""Model pool."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+M = TypeVar("M")
+
+
+class ModelPool(Generic[K, M]):
+    """Model instances kept between polls, keyed by core index, device or PID.
+
+    Call get for each item of a poll, then sweep to forget the keys that were
+    not asked for. Models are created on first use and then handed out again,
+    so callers update them in place rather than allocating new ones.
+    """
+
+    __slots__ = ("_current", "_factory", "_previous", "created", "reused")
+
+    def __init__(self, factory: Callable[[K], M]) -> None:
+        """Initialise."""
+        self._factory = factory
+        self._current: dict[K, M] = {}
+        self._previous: dict[K, M] = {}
+        self.created = 0
+        self.reused = 0
+
+    def __len__(self) -> int:
+        """Models kept from the last poll."""
+        return len(self._previous) + len(self._current)
+
+    def get(self, key: K) -> M:
+        """Get the model for a key, creating it if it is new."""
+        if (model := self._current.get(key)) is not None:
+            return model
+        if (model := self._previous.pop(key, None)) is not None:
+            self.reused += 1
+        else:
+            model = self._factory(key)
+            self.created += 1
+        self._current[key] = model
+        return model
+
+    def sweep(self) -> int:
+        """End a poll, dropping models not asked for since the last sweep."""
+        dropped = len(self._previous)
+        # Swap rather than reallocate the dicts
+        self._previous, self._current = self._current, self._previous
+        self._current.clear()
+        return dropped
@@ -0,0 +1,225 @@
+"""Sampling profiler for the collector threads."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import os
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Final
+
+from systembridgeshared.base import Base
+
+from .names import NameFilter, NamePattern
+
+MODULE_PATH: Final[str] = os.path.join(os.path.dirname(__file__), "module") + os.sep
+
+# Folded stack of samples that did not fit in the table
+OVERFLOW_STACK: Final[tuple[str, ...]] = ("[overflow]",)
+
+# Tag of samples taken outside a module getter
+UNTAGGED: Final[str] = "-"
+
+# Described code objects before the cache is dropped, so code from unloaded
+# modules or generated functions is not kept alive
+MAX_CACHED_CODE: Final[int] = 16384
+
+
+@dataclass(slots=True)
+class ProfileOverhead:
+    """CPU time spent by the profiler itself."""
+
+    cpu_seconds: float
+    wall_seconds: float
+    # Of one CPU
+    percent: float
+    samples: int
+    # Seconds between samples, stretched to keep under the overhead cap
+    interval: float
+
+
+class Profiler(Base):
+    """Sample the stacks of running threads, like the collector threads.
+
+    Stacks are read from sys._current_frames and counted in a folded stack
+    table of at most max_stacks entries, which dumps in the format
+    flamegraph.pl and speedscope read. Each sample is tagged with the
+    outermost module getter on the stack, like Processes.get_processes.
+
+    The sampling thread measures its own CPU time, and waits longer between
+    samples whenever that would go over max_overhead percent of one CPU.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        max_overhead: float = 1.0,
+        max_stacks: int = 10000,
+        max_depth: int = 64,
+        threads: Iterable[NamePattern] | None = None,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self.interval = interval
+        self.max_overhead = max_overhead
+        self._max_stacks = max_stacks
+        self._max_depth = max_depth
+        # Threads to sample by name, or every thread but the profiler's own
+        self._threads = NameFilter(include=threads)
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+        # (tag, stack) to sample count, stacks root first
+        self._stacks: dict[tuple[str, tuple[str, ...]], int] = {}
+        # Code object to its frame name, and whether it is a module getter
+        self._code: dict[CodeType, tuple[str, bool]] = {}
+
+        self._started: float | None = None
+        self._cpu_seconds = 0.0
+        self._interval = interval
+        self.samples = 0
+        self.dropped = 0
+
+    def _describe(self, code: CodeType) -> tuple[str, bool]:
+        """Name a code object's frames, and whether it is a module getter."""
+        try:
+            return self._code[code]
+        except KeyError:
+            pass
+        name = f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+        getter = code.co_filename.startswith(MODULE_PATH) and (
+            code.co_name.startswith("get_")
+        )
+        if len(self._code) >= MAX_CACHED_CODE:
+            self._code.clear()
+        self._code[code] = (name, getter)
+        return name, getter
+
+    def _fold(self, frame: FrameType | None) -> tuple[str, tuple[str, ...]]:
+        """Fold a stack, root first, with its tag."""
+        names: list[str] = []
+        tag = UNTAGGED
+        while frame is not None:
+            code = frame.f_code
+            name, getter = self._describe(code)
+            if getter:
+                tag = code.co_qualname
+            names.append(name)
+            frame = frame.f_back
+        # Cut deep stacks at the leaf, so they still merge at the root
+        return tag, tuple(reversed(names[-self._max_depth :]))
+
+    def sample(self) -> int:
+        """Sample every matching thread once, returning how many there were."""
+        own = threading.get_ident()
+        threads = {
+            thread.ident
+            for thread in threading.enumerate()
+            if thread.ident != own
+            and (not self._threads or self._threads.classify(thread.name))
+        }
+        frames = sys._current_frames()  # pylint: disable=protected-access
+        folded = [
+            self._fold(frame) for ident, frame in frames.items() if ident in threads
+        ]
+        del frames
+
+        with self._lock:
+            stacks = self._stacks
+            for key in folded:
+                if key in stacks:
+                    stacks[key] += 1
+                elif len(stacks) < self._max_stacks:
+                    stacks[key] = 1
+                else:
+                    # Keep the count per tag, without the stack
+                    self.dropped += 1
+                    key = (key[0], OVERFLOW_STACK)
+                    stacks[key] = stacks.get(key, 0) + 1
+        self.samples += 1
+        return len(folded)
+
+    def get_stacks(self, tag: str | None = None) -> dict[str, int]:
+        """Get the folded stacks and their counts, prefixed by their tags."""
+        with self._lock:
+            return {
+                ";".join((key_tag, *stack)): count
+                for (key_tag, stack), count in self._stacks.items()
+                if tag is None or key_tag == tag
+            }
+
+    def get_tags(self) -> dict[str, int]:
+        """Get the sample counts per module getter."""
+        tags: dict[str, int] = {}
+        with self._lock:
+            for (tag, _), count in self._stacks.items():
+                tags[tag] = tags.get(tag, 0) + count
+        return tags
+
+    def dump(self, path: str | None = None, tag: str | None = None) -> str:
+        """Dump the folded stacks, one "stack count" line each."""
+        stacks = self.get_stacks(tag)
+        folded = "".join(
+            f"{stack} {count}\n" for stack, count in sorted(stacks.items())
+        )
+        if path is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(folded)
+        return folded
+
+    def clear(self) -> None:
+        """Clear the collected stacks."""
+        with self._lock:
+            self._stacks.clear()
+        self.dropped = 0
+
+    def get_overhead(self) -> ProfileOverhead:
+        """Get the CPU time the sampling thread has spent."""
+        wall_seconds = (
+            time.monotonic() - self._started if self._started is not None else 0.0
+        )
+        return ProfileOverhead(
+            cpu_seconds=self._cpu_seconds,
+            wall_seconds=wall_seconds,
+            percent=self._cpu_seconds / wall_seconds * 100 if wall_seconds else 0.0,
+            samples=self.samples,
+            interval=self._interval,
+        )
+
+    def start(self) -> None:
+        """Start sampling on a background thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="Profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        """Sample until stopped, keeping under the overhead cap."""
+        thread_started = time.thread_time()
+        while not self._stopped.is_set():
+            sample_started = time.thread_time()
+            try:
+                self.sample()
+            except (RuntimeError, ValueError) as error:
+                self._logger.warning("Profiler sample failed: %s", error)
+            sample_ended = time.thread_time()
+            self._cpu_seconds = sample_ended - thread_started
+            # Space samples so each one's cost stays under the cap
+            self._interval = max(
+                self.interval,
+                (sample_ended - sample_started) * 100 / self.max_overhead,
+            )
+            self._stopped.wait(self._interval)
+
+    def stop(self) -> None:
+        """Stop sampling."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
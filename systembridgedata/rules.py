@@ -0,0 +1,317 @@
+"""Threshold rules evaluated against collected data."""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass
+import fnmatch
+import heapq
+import operator
+import re
+import time
+from typing import Final, Literal
+
+from systembridgeshared.base import Base
+
+from .collector import CollectorData
+
+RuleOperator = Literal[">", ">=", "<", "<=", "==", "!="]
+RuleState = Literal["firing", "resolved"]
+
+OPERATORS: Final[dict[str, Callable[[float, float], bool]]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+# Which way hysteresis moves the threshold a firing rule must cross to resolve
+HYSTERESIS_SIGNS: Final[dict[str, int]] = {
+    ">": -1,
+    ">=": -1,
+    "<": 1,
+    "<=": 1,
+    "==": 0,
+    "!=": 0,
+}
+
+GLOB_CHARACTERS: Final[frozenset[str]] = frozenset("*?[")
+
+RULE_EXPRESSION: Final = re.compile(
+    r"^\s*(?:(?P<aggregate>any|all)\s+)?(?P<metric>\S.*?)\s*"
+    r"(?P<operator>>=|<=|==|!=|>|<)\s*(?P<threshold>-?\d+(?:\.\d+)?)"
+    r"(?:\s+for\s+(?P<duration>\d+(?:\.\d+)?)s)?"
+    r"(?:\s+hysteresis\s+(?P<hysteresis>\d+(?:\.\d+)?))?"
+    r"(?:\s+default\s+(?P<default>-?\d+(?:\.\d+)?))?\s*$"
+)
+
+
+def get_metrics(data: CollectorData) -> dict[str, float]:
+    """Flatten collected data into the metrics rules are written against.
+
+    Scalars keep their names, like memory_percent. The rest are named
+    cpu_usage.<index>, partition_percent.<mount point>,
+    process_count.<name>, process_cpu_usage.<name>,
+    process_memory_usage.<name> and sensor.<type>.<group>.<name>, with
+    processes summed by name.
+    """
+    metrics: dict[str, float] = {
+        name: value for name, value in data.scalars.items() if value is not None
+    }
+    for index, usage in enumerate(data.per_cpu_usage):
+        metrics[f"cpu_usage.{index}"] = usage
+    for _, mount_point, _, _, _, percent in data.partitions:
+        metrics[f"partition_percent.{mount_point}"] = percent
+    for _, cpu_usage, memory_usage, name in data.processes:
+        metrics[f"process_count.{name}"] = metrics.get(f"process_count.{name}", 0) + 1
+        key = f"process_cpu_usage.{name}"
+        metrics[key] = metrics.get(key, 0.0) + cpu_usage
+        key = f"process_memory_usage.{name}"
+        metrics[key] = metrics.get(key, 0.0) + memory_usage
+    for group, name, kind, value in data.sensors:
+        metrics[f"sensor.{kind.lower()}.{group}.{name}"] = value
+    return metrics
+
+
+@dataclass(slots=True)
+class Rule:
+    """A threshold on a metric, or on every metric matching a glob.
+
+    A glob rule holds when any, or all, of its metrics pass the threshold.
+    The rule fires once it has held for duration seconds, and resolves
+    once it no longer holds with the threshold moved back by hysteresis.
+    Missing metrics take the default value, if set.
+    """
+
+    name: str
+    metric: str
+    operator: RuleOperator
+    threshold: float
+    duration: float = 0.0
+    hysteresis: float = 0.0
+    aggregate: Literal["any", "all"] = "any"
+    default: float | None = None
+
+    @classmethod
+    def parse(cls, name: str, expression: str) -> Rule:
+        """Parse a rule like "any cpu_usage.* > 95 for 30s hysteresis 5"."""
+        if (match := RULE_EXPRESSION.match(expression)) is None:
+            raise ValueError(f"Invalid rule expression: {expression}")
+        return cls(
+            name=name,
+            metric=match["metric"],
+            operator=match["operator"],  # type: ignore[arg-type]
+            threshold=float(match["threshold"]),
+            duration=float(match["duration"] or 0),
+            hysteresis=float(match["hysteresis"] or 0),
+            aggregate=match["aggregate"] or "any",  # type: ignore[arg-type]
+            default=float(match["default"]) if match["default"] else None,
+        )
+
+
+@dataclass(slots=True)
+class RuleEvent:
+    """A rule starting or stopping firing."""
+
+    rule: str
+    state: RuleState
+    # The value furthest past the threshold, if any
+    value: float | None
+    timestamp: float
+
+
+class _CompiledRule:
+    """A rule, its bound metrics and its state."""
+
+    __slots__ = (
+        "compare",
+        "firing",
+        "glob",
+        "index",
+        "inputs",
+        "release",
+        "rule",
+        "since",
+    )
+
+    def __init__(self, index: int, rule: Rule) -> None:
+        """Initialise."""
+        if rule.operator not in OPERATORS:
+            raise ValueError(f"Invalid rule operator: {rule.operator}")
+        self.index = index
+        self.rule = rule
+        compare = OPERATORS[rule.operator]
+        threshold = rule.threshold
+        release = threshold + HYSTERESIS_SIGNS[rule.operator] * rule.hysteresis
+        self.compare: Callable[[float], bool] = lambda value: compare(value, threshold)
+        self.release: Callable[[float], bool] = lambda value: compare(value, release)
+        self.glob = bool(GLOB_CHARACTERS.intersection(rule.metric))
+        self.inputs: list[str] = [] if self.glob else [rule.metric]
+        # When the rule started holding, while it has not fired yet
+        self.since: float | None = None
+        self.firing = False
+
+    def worst(self, values: list[float]) -> float | None:
+        """Get the value furthest past the threshold."""
+        if not values:
+            return None
+        if self.rule.operator in (">", ">="):
+            return max(values)
+        if self.rule.operator in ("<", "<="):
+            return min(values)
+        return values[0]
+
+
+class RuleEngine(Base):
+    """Evaluate many rules against each cycle's metrics.
+
+    Rules are indexed by the metrics they read, so a cycle only evaluates
+    the rules whose metrics changed, and those whose duration ran out.
+    State is kept per rule, not per sample, so a duration costs the same
+    whatever the sample rate. Events are only emitted when a rule starts or
+    stops firing.
+    """
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        """Initialise."""
+        super().__init__()
+        self._rules = [_CompiledRule(index, rule) for index, rule in enumerate(rules)]
+        self._by_metric: dict[str, list[_CompiledRule]] = defaultdict(list)
+        # Glob rules grouped by glob, bound to metrics when they appear
+        globs: dict[str, list[_CompiledRule]] = defaultdict(list)
+        for rule in self._rules:
+            if rule.glob:
+                globs[rule.rule.metric].append(rule)
+            else:
+                self._by_metric[rule.rule.metric].append(rule)
+        self._globs = [
+            (re.compile(fnmatch.translate(glob)), rules)
+            for glob, rules in globs.items()
+        ]
+        self._values: dict[str, float] = {}
+        # (deadline, rule index) for rules waiting out their duration
+        self._timers: list[tuple[float, int]] = []
+        # Rules with a default hold before any of their metrics appear, so
+        # the first cycle evaluates them. After that a rule's metrics all
+        # going away marks it dirty, like any other change.
+        self._unevaluated = [
+            rule for rule in self._rules if rule.rule.default is not None
+        ]
+
+        self.evaluated = 0
+
+    def _bind(self, name: str) -> None:
+        """Bind a new metric to the glob rules matching it."""
+        for pattern, rules in self._globs:
+            if pattern.match(name):
+                for rule in rules:
+                    rule.inputs.append(name)
+                    self._by_metric[name].append(rule)
+
+    def _unbind(self, name: str) -> list[_CompiledRule]:
+        """Unbind a metric that went away, returning the rules reading it."""
+        rules = self._by_metric.get(name, [])
+        kept = [rule for rule in rules if not rule.glob]
+        for rule in rules:
+            if rule.glob:
+                rule.inputs.remove(name)
+        if kept:
+            self._by_metric[name] = kept
+        else:
+            self._by_metric.pop(name, None)
+        return rules
+
+    def evaluate(
+        self,
+        values: Mapping[str, float | None],
+        timestamp: float | None = None,
+    ) -> list[RuleEvent]:
+        """Evaluate the rules affected by a cycle's metrics."""
+        now = time.time() if timestamp is None else timestamp
+        current = self._values
+        dirty: dict[int, _CompiledRule] = {
+            rule.index: rule for rule in self._unevaluated
+        }
+        self._unevaluated = []
+
+        for name, value in values.items():
+            if value is None:
+                continue
+            previous = current.get(name)
+            if previous == value:
+                continue
+            if previous is None:
+                self._bind(name)
+            current[name] = value
+            for rule in self._by_metric.get(name, ()):
+                dirty[rule.index] = rule
+        for name in [name for name in current if values.get(name) is None]:
+            del current[name]
+            for rule in self._unbind(name):
+                dirty[rule.index] = rule
+
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            _, index = heapq.heappop(timers)
+            dirty[index] = self._rules[index]
+
+        events: list[RuleEvent] = []
+        for rule in dirty.values():
+            self._update(rule, now, events)
+        self.evaluated += len(dirty)
+        return events
+
+    def evaluate_data(
+        self,
+        data: CollectorData,
+        timestamp: float | None = None,
+    ) -> list[RuleEvent]:
+        """Evaluate the rules against a cycle's collected data."""
+        return self.evaluate(get_metrics(data), timestamp)
+
+    def _update(
+        self,
+        rule: _CompiledRule,
+        now: float,
+        events: list[RuleEvent],
+    ) -> None:
+        """Update a rule's state, adding an event if it changed."""
+        current = self._values
+        values = [current[name] for name in rule.inputs if name in current]
+        if not values and rule.rule.default is not None:
+            values = [rule.rule.default]
+        check = any if rule.rule.aggregate == "any" else all
+
+        if rule.firing:
+            if not values or not check(rule.release(value) for value in values):
+                rule.firing = False
+                events.append(
+                    RuleEvent(rule.rule.name, "resolved", rule.worst(values), now)
+                )
+            return
+
+        if not values or not check(rule.compare(value) for value in values):
+            rule.since = None
+            return
+        if rule.since is None:
+            rule.since = now
+            if rule.rule.duration > 0:
+                heapq.heappush(self._timers, (now + rule.rule.duration, rule.index))
+        if now - rule.since >= rule.rule.duration:
+            rule.since = None
+            rule.firing = True
+            events.append(
+                RuleEvent(
+                    rule.rule.name,
+                    "firing",
+                    rule.worst([value for value in values if rule.compare(value)]),
+                    now,
+                )
+            )
+
+    def get_firing(self) -> list[str]:
+        """Get the names of the rules firing."""
+        return [rule.rule.name for rule in self._rules if rule.firing]
@@ -0,0 +1,234 @@
+"""Snapshots of the data modules taken in one collection pass."""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterable
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+import os
+import threading
+import time
+from typing import Any
+
+from systembridgeshared.base import Base
+
+from .backend import Backend
+from .module.cpu import CPU
+from .module.disks import Disks
+from .module.memory import Memory
+from .module.networks import Networks
+
+
+@dataclass(slots=True)
+class SnapshotSource:
+    """A source's value and what collecting it cost."""
+
+    value: Any
+    # Middle of the call, the best estimate of when the value was read
+    monotonic: float
+    wall: float
+    duration: float
+    # Read and write syscalls made by the call's thread, None if unknown.
+    # Other syscalls, like open or stat, are not counted
+    io_syscalls: int | None = None
+    error: str | None = None
+
+
+@dataclass(slots=True)
+class Snapshot:
+    """The sources collected in one pass."""
+
+    # Start of the pass
+    monotonic: float
+    wall: float
+    duration: float
+    sources: dict[str, SnapshotSource] = field(default_factory=dict)
+
+    @property
+    def window(self) -> float:
+        """Seconds between the first and last source being read."""
+        times = [source.monotonic for source in self.sources.values()]
+        return max(times) - min(times) if times else 0.0
+
+    def get_value(self, name: str) -> Any:
+        """Get a source's value, None if it failed or is missing."""
+        source = self.sources.get(name)
+        return source.value if source is not None else None
+
+    def elapsed(self, previous: Snapshot, name: str) -> float | None:
+        """Get the seconds between a source's reads in two snapshots."""
+        if (current := self.sources.get(name)) is None or (
+            before := previous.sources.get(name)
+        ) is None:
+            return None
+        return current.monotonic - before.monotonic
+
+
+@dataclass(slots=True)
+class _Source:
+    """A registered source."""
+
+    function: Callable[[], Any]
+    # Sources that must be collected first
+    after: tuple[str, ...] = ()
+
+
+def get_default_sources(
+    backend: Backend | None = None,
+) -> dict[str, Callable[[], Any]]:
+    """Get the counters rates are usually computed from."""
+    return {
+        "cpu": CPU(backend=backend).get_times,
+        "disks": Disks(backend=backend).get_io_counters,
+        "memory": Memory(backend=backend).get_virtual,
+        "networks": Networks(backend=backend).get_io_counters,
+    }
+
+
+class SnapshotCollector(Base):
+    """Collect sources into snapshots, concurrently where they allow.
+
+    Each source is called in a worker thread as soon as the sources it
+    depends on are done, so independent sources are read at nearly the same
+    moment. Read and write syscalls are counted from /proc/self/task/<tid>/io,
+    so they only cover those made on the worker thread itself.
+    """
+
+    def __init__(
+        self,
+        sources: dict[str, Callable[[], Any]] | None = None,
+        procfs_path: str = "/proc",
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._procfs_path = procfs_path
+        self._sources: dict[str, _Source] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # Syscalls made by reading the counters themselves
+        self._io_syscall_overhead: int | None = None
+        for name, function in (sources or {}).items():
+            self.register(name, function)
+
+    def register(
+        self,
+        name: str,
+        function: Callable[[], Any],
+        after: Iterable[str] = (),
+    ) -> None:
+        """Register a source, collected once the sources in after are."""
+        after = tuple(after)
+        if missing := [source for source in after if source not in self._sources]:
+            raise ValueError(f"Unknown sources for {name}: {', '.join(missing)}")
+        with self._lock:
+            # Registering again can make a source wait on itself
+            if self._depends_on(after, name):
+                raise ValueError(f"Sources for {name} depend on it")
+            self._sources[name] = _Source(function, after)
+            # Resize the pool to run every source at once
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _depends_on(self, sources: Iterable[str], name: str) -> bool:
+        """Whether any of the sources is, or waits on, the named source."""
+        pending = list(sources)
+        seen: set[str] = set()
+        while pending:
+            source = pending.pop()
+            if source == name:
+                return True
+            if source not in seen:
+                seen.add(source)
+                pending.extend(self._sources[source].after)
+        return False
+
+    def _read_io_syscalls(self) -> int | None:
+        """Read the read and write syscalls made by the calling thread."""
+        path = os.path.join(
+            self._procfs_path, "self", "task", str(threading.get_native_id()), "io"
+        )
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+        except OSError:
+            return None
+        syscalls = 0
+        for line in data.splitlines():
+            name, _, value = line.partition(b":")
+            if name in (b"syscr", b"syscw"):
+                syscalls += int(value)
+        return syscalls
+
+    def _call(self, name: str, source: _Source) -> SnapshotSource:
+        """Call a source on a worker thread, measuring it."""
+        io_syscalls_before = self._read_io_syscalls()
+        wall = time.time()
+        started = time.monotonic()
+        value: Any = None
+        error: str | None = None
+        try:
+            value = source.function()
+        except Exception as exception:  # pylint: disable=broad-except
+            self._logger.warning("Error collecting %s", name, exc_info=exception)
+            error = repr(exception)
+        duration = time.monotonic() - started
+        io_syscalls_after = self._read_io_syscalls()
+
+        io_syscalls: int | None = None
+        if io_syscalls_before is not None and io_syscalls_after is not None:
+            io_syscalls = max(
+                io_syscalls_after
+                - io_syscalls_before
+                - (self._io_syscall_overhead or 0),
+                0,
+            )
+        return SnapshotSource(
+            value=value,
+            monotonic=started + duration / 2,
+            wall=wall + duration / 2,
+            duration=duration,
+            io_syscalls=io_syscalls,
+            error=error,
+        )
+
+    def _calibrate(self) -> None:
+        """Measure the syscalls made by reading the counters."""
+        before = self._read_io_syscalls()
+        after = self._read_io_syscalls()
+        if before is not None and after is not None:
+            self._io_syscall_overhead = after - before
+
+    def collect(self) -> Snapshot:
+        """Collect every source into a snapshot."""
+        with self._lock:
+            sources = dict(self._sources)
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(len(sources), 1),
+                    thread_name_prefix="snapshot",
+                )
+            executor = self._executor
+        if self._io_syscall_overhead is None:
+            self._calibrate()
+
+        snapshot = Snapshot(monotonic=time.monotonic(), wall=time.time(), duration=0)
+        waiting = dict(sources)
+        running: dict[Future[SnapshotSource], str] = {}
+        while waiting or running:
+            for name, source in list(waiting.items()):
+                if all(dependency in snapshot.sources for dependency in source.after):
+                    del waiting[name]
+                    running[executor.submit(self._call, name, source)] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                snapshot.sources[running.pop(future)] = future.result()
+        snapshot.duration = time.monotonic() - snapshot.monotonic
+        return snapshot
+
+    def close(self) -> None:
+        """Stop the worker threads."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
@@ -0,0 +1,464 @@
+"""Record and replay the raw data behind the data modules."""
+
+from __future__ import annotations
+
+import abc
+from collections import defaultdict, deque
+from collections.abc import Callable, Iterator
+import contextlib
+from dataclasses import dataclass
+import gzip
+import pickle
+import threading
+import time
+from typing import Any, Final, NoReturn
+
+from psutil import AccessDenied, NoSuchProcess
+from psutil._common import (
+    scpustats,
+    sdiskpart,
+    sdiskusage,
+    sfan,
+    shwtemp,
+    snicaddr,
+    snicstats,
+    suser,
+)
+
+from .backend import Backend, get_backend
+
+# Errors recorded and raised again on replay, most specific first
+RECORDED_ERRORS: Final[dict[str, type[Exception]]] = {
+    "AccessDenied": AccessDenied,
+    "NoSuchProcess": NoSuchProcess,
+    "OSError": OSError,
+}
+
+
+class TraceExhaustedError(Exception):
+    """The trace has no more recorded calls for a function."""
+
+
+@dataclass(slots=True)
+class TraceRecord:
+    """A recorded call."""
+
+    # Seconds since the start of the recording
+    offset: float
+    duration: float
+    function: str
+    arguments: str
+    result: Any
+
+
+@dataclass(slots=True)
+class _RecordedError:
+    """An error raised by a recorded call."""
+
+    name: str
+    pid: int | None = None
+    errno: int | None = None
+    strerror: str | None = None
+
+    @classmethod
+    def from_error(cls, error: Exception) -> _RecordedError:
+        """Record an error."""
+        name = next(
+            name for name, kind in RECORDED_ERRORS.items() if isinstance(error, kind)
+        )
+        return cls(
+            name=name,
+            pid=getattr(error, "pid", None),
+            errno=getattr(error, "errno", None),
+            strerror=getattr(error, "strerror", None),
+        )
+
+    def raise_error(self) -> NoReturn:
+        """Raise the error again."""
+        if self.name == "OSError":
+            # With an errno, OSError builds the matching subclass
+            raise OSError(self.errno, self.strerror)
+        raise RECORDED_ERRORS[self.name](self.pid)
+
+
+def _arguments_key(args: tuple, kwargs: dict) -> str:
+    """Key calls by their arguments, so percpu=True and False replay apart."""
+    return repr((args, sorted(kwargs.items())))
+
+
+class _TraceBackend(Backend, abc.ABC):
+    """A backend passing each call through _call.
+
+    Processes are passed through too, so only the accessors the modules
+    call are recorded, and lazily read fields stay lazy.
+    """
+
+    name = "trace"
+
+    @abc.abstractmethod
+    def _call(self, function: str, *args: Any, **kwargs: Any) -> Any:
+        """Call a backend function."""
+
+    @abc.abstractmethod
+    def start(self) -> None:
+        """Start the trace."""
+
+    @abc.abstractmethod
+    def stop(self) -> None:
+        """Stop the trace."""
+
+    def __enter__(self):
+        """Enter."""
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        """Exit."""
+        self.stop()
+
+    def __getstate__(self) -> dict[str, Any]:
+        """Refuse to be sent to worker processes, which have their own trace."""
+        raise TypeError(f"{type(self).__name__} only works with thread workers")
+
+    def boot_time(self) -> float:
+        """Boot time, in seconds since the epoch."""
+        return self._call("boot_time")
+
+    def cpu_count(self) -> int:
+        """Count logical CPUs."""
+        return self._call("cpu_count")
+
+    def cpu_freq(self, percpu: bool = False) -> Any:
+        """CPU frequencies, in MHz."""
+        return self._call("cpu_freq", percpu=percpu)
+
+    def cpu_percent(self, interval: float | None = None, percpu: bool = False) -> Any:
+        """CPU usage, over the interval or since the previous call."""
+        return self._call("cpu_percent", interval=interval, percpu=percpu)
+
+    def cpu_stats(self) -> scpustats:
+        """CPU context switches and interrupts."""
+        return self._call("cpu_stats")
+
+    def cpu_times(self, percpu: bool = False) -> Any:
+        """CPU times, in seconds."""
+        return self._call("cpu_times", percpu=percpu)
+
+    def cpu_times_percent(
+        self,
+        interval: float | None = None,
+        percpu: bool = False,
+    ) -> Any:
+        """CPU times usage, over the interval or since the previous call."""
+        return self._call("cpu_times_percent", interval=interval, percpu=percpu)
+
+    def getloadavg(self) -> tuple[float, float, float]:
+        """Load average over 1, 5 and 15 minutes."""
+        return self._call("getloadavg")
+
+    def virtual_memory(self) -> Any:
+        """Virtual memory."""
+        return self._call("virtual_memory")
+
+    def swap_memory(self) -> Any:
+        """Swap memory."""
+        return self._call("swap_memory")
+
+    def disk_io_counters(self, perdisk: bool = False) -> Any:
+        """Disk I/O counters, in total or per disk."""
+        return self._call("disk_io_counters", perdisk=perdisk)
+
+    def disk_partitions(self, all: bool = False) -> list[sdiskpart]:  # noqa: A002
+        """Mounted partitions."""
+        return self._call("disk_partitions", all=all)
+
+    def disk_usage(self, path: str) -> sdiskusage:
+        """Usage of the filesystem holding a path."""
+        return self._call("disk_usage", path)
+
+    def net_connections(self, kind: str = "inet") -> list:
+        """Network connections."""
+        return self._call("net_connections", kind=kind)
+
+    def net_if_addrs(self) -> dict[str, list[snicaddr]]:
+        """Network interface addresses."""
+        return self._call("net_if_addrs")
+
+    def net_if_stats(self) -> dict[str, snicstats]:
+        """Network interface stats."""
+        return self._call("net_if_stats")
+
+    def net_io_counters(self, pernic: bool = False) -> Any:
+        """Network I/O counters, in total or per interface."""
+        return self._call("net_io_counters", pernic=pernic)
+
+    def pids(self) -> list[int]:
+        """Get the running process IDs."""
+        return self._call("pids")
+
+    def sensors_fans(self) -> dict[str, list[sfan]] | None:
+        """Fan speeds, or None where not supported."""
+        return self._call("sensors_fans")
+
+    def sensors_temperatures(self) -> dict[str, list[shwtemp]] | None:
+        """Temperatures in celsius, or None where not supported."""
+        return self._call("sensors_temperatures")
+
+    def users(self) -> list[suser]:
+        """Get the logged in users."""
+        return self._call("users")
+
+    def windows_sensors(self) -> dict | None:
+        """Sensors from the Windows sensors binary, or None elsewhere."""
+        return self._call("windows_sensors")
+
+
+class _RecordedProcess:
+    """A process whose accessor calls are recorded."""
+
+    __slots__ = ("pid", "_process", "_recorder")
+
+    def __init__(self, recorder: TraceRecorder, process: Any) -> None:
+        """Initialise."""
+        self.pid = process.pid
+        self._process = process
+        self._recorder = recorder
+
+    def oneshot(self) -> contextlib.AbstractContextManager[None]:
+        """Read each file once for the block."""
+        return self._process.oneshot()
+
+    def __getattr__(self, name: str) -> Any:
+        """Get an accessor, recording its calls."""
+        accessor = getattr(self._process, name)
+        if name.startswith("_") or not callable(accessor):
+            return accessor
+        function = f"process.{name}"
+
+        def recorded(*args, **kwargs):
+            return self._recorder.record(
+                function,
+                _arguments_key((self.pid, *args), kwargs),
+                lambda: accessor(*args, **kwargs),
+            )
+
+        return recorded
+
+
+class TraceRecorder(_TraceBackend):
+    """Record every raw response of a backend into a compressed trace file.
+
+    Pass the recorder to the data modules as their backend.
+    """
+
+    def __init__(self, path: str, backend: Backend | None = None) -> None:
+        """Initialise."""
+        super().__init__()
+        self._path = path
+        self._backend = backend or get_backend()
+        self._file: gzip.GzipFile | None = None
+        self._started = 0.0
+        self._lock = threading.Lock()
+        self.records = 0
+
+    def record(
+        self,
+        function: str,
+        arguments: str,
+        call: Callable[[], Any],
+        summary: Callable[[Any], Any] | None = None,
+    ) -> Any:
+        """Make a call, recording its result, or what it is summarised as."""
+        started = time.monotonic()
+        try:
+            result = call()
+        except (AccessDenied, NoSuchProcess, OSError) as error:
+            recorded: Any = _RecordedError.from_error(error)
+            self._write(started, function, arguments, recorded)
+            raise
+        self._write(
+            started,
+            function,
+            arguments,
+            summary(result) if summary is not None else result,
+        )
+        return result
+
+    def _call(self, function: str, *args: Any, **kwargs: Any) -> Any:
+        """Call the backend, recording the result."""
+        method = getattr(self._backend, function)
+        return self.record(
+            function, _arguments_key(args, kwargs), lambda: method(*args, **kwargs)
+        )
+
+    def process(self, pid: int) -> _RecordedProcess:
+        """Get a process."""
+        process = self.record(
+            "process",
+            _arguments_key((pid,), {}),
+            lambda: self._backend.process(pid),
+            lambda _: None,
+        )
+        return _RecordedProcess(self, process)
+
+    def process_iter(self) -> Iterator[_RecordedProcess]:
+        """Every running process, reused between calls while it runs."""
+        processes = self.record(
+            "process_iter",
+            _arguments_key((), {}),
+            lambda: list(self._backend.process_iter()),
+            lambda processes: [process.pid for process in processes],
+        )
+        return iter([_RecordedProcess(self, process) for process in processes])
+
+    def _write(
+        self, started: float, function: str, arguments: str, result: Any
+    ) -> None:
+        """Append a record to the trace."""
+        duration = time.monotonic() - started
+        with self._lock:
+            if self._file is None:
+                return
+            pickle.dump(
+                (started - self._started, duration, function, arguments, result),
+                self._file,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+            self.records += 1
+
+    def start(self) -> None:
+        """Start recording."""
+        with self._lock:
+            self._file = gzip.open(self._path, "wb")  # noqa: SIM115
+            self._started = time.monotonic()
+        self._logger.info("Recording trace to %s", self._path)
+
+    def stop(self) -> None:
+        """Stop recording."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        self._logger.info("Recorded %s calls to %s", self.records, self._path)
+
+
+def read_trace(path: str) -> list[TraceRecord]:
+    """Read a trace file. Traces are pickles, so only load trusted files."""
+    records: list[TraceRecord] = []
+    with gzip.open(path, "rb") as file:
+        while True:
+            try:
+                offset, duration, function, arguments, result = pickle.load(file)
+            except EOFError:
+                break
+            records.append(TraceRecord(offset, duration, function, arguments, result))
+    return records
+
+
+class ReplayProcess:
+    """A process with recorded accessor results."""
+
+    __slots__ = ("pid", "_replayer")
+
+    def __init__(self, replayer: TraceReplayer, pid: int) -> None:
+        """Initialise."""
+        self.pid = pid
+        self._replayer = replayer
+
+    def oneshot(self) -> contextlib.AbstractContextManager[None]:
+        """Read each file once for the block."""
+        return contextlib.nullcontext()
+
+    def __getattr__(self, name: str) -> Callable[..., Any]:
+        """Get a recorded accessor."""
+        function = f"process.{name}"
+        if function not in self._replayer.functions:
+            raise AttributeError(name)
+
+        def accessor(*args, **kwargs):
+            return self._replayer.replay(
+                function, _arguments_key((self.pid, *args), kwargs)
+            )
+
+        return accessor
+
+
+class TraceReplayer(_TraceBackend):
+    """Feed a recorded trace back through the data modules.
+
+    Pass the replayer to the data modules as their backend. With speed set,
+    calls are paced to the trace's timeline and take their recorded
+    duration, both divided by speed. With speed None, calls return
+    immediately. Set loop to start the trace over once a function runs out.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        speed: float | None = 1.0,
+        loop: bool = False,
+    ) -> None:
+        """Initialise."""
+        super().__init__()
+        self._speed = speed
+        self._loop = loop
+        self._records = read_trace(path)
+        self._queues: dict[tuple[str, str], deque[TraceRecord]] = defaultdict(deque)
+        self._started = 0.0
+        self._lock = threading.Lock()
+        # Functions in the trace, so processes only have recorded accessors
+        self.functions = {record.function for record in self._records}
+        self.replayed = 0
+
+    def _reset(self) -> None:
+        """Queue every record for replay."""
+        self._queues.clear()
+        for record in self._records:
+            self._queues[(record.function, record.arguments)].append(record)
+
+    def _next(self, function: str, arguments: str) -> TraceRecord:
+        """Get the next recorded call of a function."""
+        with self._lock:
+            queue = self._queues.get((function, arguments))
+            if not queue and self._loop:
+                self._reset()
+                self._started = time.monotonic()
+                queue = self._queues.get((function, arguments))
+            if not queue:
+                raise TraceExhaustedError(f"No more recorded calls for {function}")
+            self.replayed += 1
+            return queue.popleft()
+
+    def replay(self, function: str, arguments: str) -> Any:
+        """Replay the next recorded result of a call."""
+        record = self._next(function, arguments)
+        if self._speed:
+            # Wait for the call's place on the timeline, then its duration
+            delay = self._started + record.offset / self._speed - time.monotonic()
+            time.sleep(max(delay, 0) + record.duration / self._speed)
+        if isinstance(record.result, _RecordedError):
+            record.result.raise_error()
+        return record.result
+
+    def _call(self, function: str, *args: Any, **kwargs: Any) -> Any:
+        """Replay a backend call."""
+        return self.replay(function, _arguments_key(args, kwargs))
+
+    def process(self, pid: int) -> ReplayProcess:
+        """Get a process."""
+        self.replay("process", _arguments_key((pid,), {}))
+        return ReplayProcess(self, pid)
+
+    def process_iter(self) -> Iterator[ReplayProcess]:
+        """Every running process, reused between calls while it runs."""
+        pids = self.replay("process_iter", _arguments_key((), {}))
+        return iter([ReplayProcess(self, pid) for pid in pids])
+
+    def start(self) -> None:
+        """Start replaying."""
+        with self._lock:
+            self._reset()
+            self._started = time.monotonic()
+
+    def stop(self) -> None:
+        """Stop replaying."""
@@ -0,0 +1,365 @@
+"""Fake data sources for benchmarks and tests."""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+import contextlib
+import importlib
+import os
+import random
+import socket
+from typing import Any, Final
+
+import psutil
+from psutil._common import (
+    addr,
+    sconn,
+    scpufreq,
+    sdiskusage,
+    sfan,
+    shwtemp,
+    snicaddr,
+    snicstats,
+)
+
+BOOT_TIME: Final[int] = 1_700_000_000
+MEMORY_TOTAL_KB: Final[int] = 64 * 1024 * 1024
+
+PROCESS_NAMES: Final[tuple[str, ...]] = (
+    "bash",
+    "containerd-shim",
+    "java",
+    "nginx",
+    "node",
+    "postgres",
+    "python3",
+    "sshd",
+)
+
+
+# Modules whose psutil imports FakePsutil replaces, which only the psutil
+# backend uses
+PATCHED_MODULES: Final[tuple[str, ...]] = ("systembridgedata.backend.psutil",)
+
+
+def interface_names(count: int) -> list[str]:
+    """Name network interfaces like a container host."""
+    names = ["lo", "eth0"]
+    prefixes = ("veth", "cali", "docker")
+    for index in range(max(count - len(names), 0)):
+        names.append(f"{prefixes[index % len(prefixes)]}{index:07x}")
+    return names[:count]
+
+
+def disk_names(count: int) -> list[str]:
+    """Name block devices."""
+    return [f"nvme{index}n1" for index in range(count)]
+
+
+def create_procfs(
+    path: str,
+    process_count: int,
+    cpu_count: int = 8,
+    seed: int = 0,
+    interface_count: int = 4,
+    disk_count: int = 2,
+    mount_count: int = 4,
+) -> str:
+    """Create a synthetic /proc tree that psutil can read through PROCFS_PATH."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.join(path, "net"), exist_ok=True)
+    os.makedirs(os.path.join(path, "self"), exist_ok=True)
+
+    with open(os.path.join(path, "stat"), "w", encoding="utf-8") as file:
+        file.write("cpu  1000 0 500 100000 0 0 0 0 0 0\n")
+        for index in range(cpu_count):
+            file.write(f"cpu{index} 100 0 50 10000 0 0 0 0 0 0\n")
+        file.write(
+            f"intr 50000 0 0\nctxt 1000\nbtime {BOOT_TIME}\n"
+            f"processes {process_count}\nprocs_running 1\nprocs_blocked 0\n"
+            "softirq 20000 0 0\n"
+        )
+    with open(os.path.join(path, "loadavg"), "w", encoding="utf-8") as file:
+        file.write(f"1.00 1.50 2.00 1/{process_count} {process_count}\n")
+    with open(os.path.join(path, "meminfo"), "w", encoding="utf-8") as file:
+        file.write(
+            f"MemTotal:       {MEMORY_TOTAL_KB} kB\n"
+            f"MemFree:        {MEMORY_TOTAL_KB // 2} kB\n"
+            f"MemAvailable:   {MEMORY_TOTAL_KB // 2} kB\n"
+            "Buffers:        1024 kB\n"
+            "Cached:         4096 kB\n"
+            "Shmem:          0 kB\n"
+            "SReclaimable:   0 kB\n"
+            "Active:         1024 kB\n"
+            "Inactive:       1024 kB\n"
+            "SwapTotal:      0 kB\n"
+            "SwapFree:       0 kB\n"
+        )
+    with open(os.path.join(path, "vmstat"), "w", encoding="utf-8") as file:
+        file.write("pswpin 0\npswpout 0\n")
+    with open(os.path.join(path, "filesystems"), "w", encoding="utf-8") as file:
+        file.write("\text4\n\txfs\nnodev\ttmpfs\nnodev\toverlay\n")
+
+    with open(os.path.join(path, "net", "dev"), "w", encoding="utf-8") as file:
+        file.write(
+            "Inter-|   Receive                            "
+            "                    |  Transmit\n"
+            " face |bytes    packets errs drop fifo frame compressed multicast|"
+            "bytes    packets errs drop fifo colls carrier compressed\n"
+        )
+        for name in interface_names(interface_count):
+            received = rng.randint(0, 10**12)
+            sent = rng.randint(0, 10**12)
+            file.write(
+                f"{name:>16}: {received} {received // 1500} 0 0 0 0 0 0 "
+                f"{sent} {sent // 1500} 0 0 0 0 0 0\n"
+            )
+
+    with open(os.path.join(path, "diskstats"), "w", encoding="utf-8") as file:
+        for index, name in enumerate(disk_names(disk_count)):
+            for device, minor in ((name, 0), (f"{name}p1", 1)):
+                reads = rng.randint(0, 10**8)
+                writes = rng.randint(0, 10**8)
+                file.write(
+                    f" 259 {index * 16 + minor} {device} {reads} 0 {reads * 8} "
+                    f"{reads // 10} {writes} 0 {writes * 8} {writes // 10} "
+                    f"0 {(reads + writes) // 20} {(reads + writes) // 10}\n"
+                )
+
+    with open(os.path.join(path, "self", "mounts"), "w", encoding="utf-8") as file:
+        file.write("/dev/root / ext4 rw,relatime 0 0\n")
+        for index in range(mount_count - 1):
+            if disk_count and index % 4 == 0:
+                disk = disk_names(disk_count)[index // 4 % disk_count]
+                file.write(f"/dev/{disk}p1 /mnt/volume{index} xfs rw,noatime 0 0\n")
+            elif index % 4 == 1:
+                file.write(f"tmpfs /run/secrets/{index} tmpfs ro,relatime 0 0\n")
+            else:
+                file.write(
+                    f"overlay /run/containers/{index}/rootfs overlay rw,relatime 0 0\n"
+                )
+
+    for pid in range(1, process_count + 1):
+        write_process(
+            path,
+            pid,
+            name=rng.choice(PROCESS_NAMES),
+            utime=rng.randint(0, 100_000),
+            stime=rng.randint(0, 10_000),
+            start=rng.randint(0, 1_000_000),
+            rss_pages=rng.randint(100, 100_000),
+            threads=rng.randint(1, 64),
+            fds=rng.randint(3, 8),
+            read_bytes=rng.randint(0, 10**9),
+            write_bytes=rng.randint(0, 10**9),
+            cpu_count=cpu_count,
+        )
+
+    return path
+
+
+def create_sysfs(path: str, disk_count: int = 2) -> str:
+    """Create a synthetic /sys/block tree for the disks from create_procfs."""
+    for name in disk_names(disk_count):
+        partition = os.path.join(path, "block", name, f"{name}p1")
+        os.makedirs(partition, exist_ok=True)
+        with open(os.path.join(partition, "partition"), "w", encoding="utf-8") as file:
+            file.write("1\n")
+    return path
+
+
+def write_process(
+    path: str,
+    pid: int,
+    name: str,
+    utime: int = 0,
+    stime: int = 0,
+    start: int = 0,
+    rss_pages: int = 100,
+    threads: int = 1,
+    fds: int = 3,
+    read_bytes: int = 0,
+    write_bytes: int = 0,
+    cpu_count: int = 8,
+) -> None:
+    """Write, or rewrite, a process in a synthetic /proc tree."""
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    directory = os.path.join(path, str(pid))
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "stat"), "w", encoding="utf-8") as file:
+        file.write(
+            f"{pid} ({name}) S 1 {pid} {pid} 0 -1 4194560 0 0 0 0 "
+            f"{utime} {stime} 0 0 20 0 {threads} 0 {start} {rss_pages * 4096} "
+            f"{rss_pages} 18446744073709551615 0 0 0 0 0 0 0 0 0 0 0 0 17 "
+            f"{pid % cpu_count} 0 0 0 0 0\n"
+        )
+    with open(os.path.join(directory, "status"), "w", encoding="utf-8") as file:
+        file.write(
+            f"Name:\t{name}\nState:\tS (sleeping)\nPid:\t{pid}\nPPid:\t1\n"
+            f"Uid:\t{uid}\t{uid}\t{uid}\t{uid}\n"
+            f"Gid:\t{uid}\t{uid}\t{uid}\t{uid}\n"
+            f"Threads:\t{threads}\n"
+            "voluntary_ctxt_switches:\t10\n"
+            "nonvoluntary_ctxt_switches:\t1\n"
+        )
+    with open(os.path.join(directory, "statm"), "w", encoding="utf-8") as file:
+        file.write(f"{rss_pages * 2} {rss_pages} 100 10 0 {rss_pages} 0\n")
+    with open(os.path.join(directory, "cmdline"), "w", encoding="utf-8") as file:
+        file.write(f"/usr/bin/{name}\0")
+    with open(os.path.join(directory, "io"), "w", encoding="utf-8") as file:
+        # Characters include pipes and sockets, bytes only storage
+        file.write(
+            f"rchar: {read_bytes * 2}\nwchar: {write_bytes * 2}\n"
+            f"syscr: {read_bytes // 4096}\nsyscw: {write_bytes // 4096}\n"
+            f"read_bytes: {read_bytes}\nwrite_bytes: {write_bytes}\n"
+            "cancelled_write_bytes: 0\n"
+        )
+    exe = os.path.join(directory, "exe")
+    if not os.path.lexists(exe):
+        os.symlink(f"/usr/bin/{name}", exe)
+    fd_directory = os.path.join(directory, "fd")
+    os.makedirs(fd_directory, exist_ok=True)
+    existing = len(os.listdir(fd_directory))
+    for fd in range(existing, fds):
+        os.symlink(os.devnull, os.path.join(fd_directory, str(fd)))
+    for fd in range(fds, existing):
+        os.unlink(os.path.join(fd_directory, str(fd)))
+
+
+class FakePsutil:
+    """psutil functions that read /sys or make syscalls, so ignore PROCFS_PATH.
+
+    Everything else is left to psutil reading a tree from create_procfs.
+    """
+
+    def __init__(
+        self,
+        cpu_count: int = 8,
+        interface_count: int = 4,
+        connection_count: int = 100,
+        sensor_count: int = 4,
+        seed: int = 0,
+    ) -> None:
+        """Initialise."""
+        rng = random.Random(seed)
+        self._cpu_count = cpu_count
+        self._interfaces = interface_names(interface_count)
+        self._frequencies = [
+            scpufreq(float(rng.randint(800, 4800)), 800.0, 4800.0)
+            for _ in range(cpu_count)
+        ]
+        self._connections = [
+            sconn(
+                fd=index,
+                family=socket.AF_INET,
+                type=socket.SOCK_STREAM,
+                laddr=addr("10.0.0.1", 1024 + index % 60000),
+                raddr=addr(f"10.{index // 65536 % 256}.{index // 256 % 256}.1", 443),
+                status="ESTABLISHED",
+                pid=index % 1000 + 1,
+            )
+            for index in range(connection_count)
+        ]
+        self._temperatures = {
+            "coretemp": [
+                shwtemp(f"Core {index}", float(rng.randint(30, 90)), 95.0, 100.0)
+                for index in range(sensor_count)
+            ]
+        }
+        self._fans = {
+            "it8728": [
+                sfan(f"fan{index}", rng.randint(500, 3000))
+                for index in range(max(sensor_count // 4, 1))
+            ]
+        }
+
+    def cpu_count(self, logical: bool = True) -> int:
+        """Count CPUs."""
+        return self._cpu_count
+
+    def cpu_freq(self, percpu: bool = False) -> Any:
+        """CPU frequencies."""
+        if percpu:
+            return list(self._frequencies)
+        return scpufreq(
+            sum(item.current for item in self._frequencies) / self._cpu_count,
+            800.0,
+            4800.0,
+        )
+
+    def cpu_percent(self, interval: float | None = None, percpu: bool = False) -> Any:
+        """CPU usage, without sleeping for the interval."""
+        return psutil.cpu_percent(interval=None, percpu=percpu)
+
+    def cpu_times_percent(
+        self,
+        interval: float | None = None,
+        percpu: bool = False,
+    ) -> Any:
+        """CPU times usage, without sleeping for the interval."""
+        return psutil.cpu_times_percent(interval=None, percpu=percpu)
+
+    def disk_usage(self, path: str) -> sdiskusage:
+        """Disk usage."""
+        return sdiskusage(10**12, 4 * 10**11, 6 * 10**11, 40.0)
+
+    def getloadavg(self) -> tuple[float, float, float]:
+        """Load average."""
+        return (1.0, 1.5, 2.0)
+
+    def net_connections(self, kind: str = "inet") -> list[sconn]:
+        """Network connections."""
+        return list(self._connections)
+
+    def net_if_addrs(self) -> dict[str, list[snicaddr]]:
+        """Network interface addresses."""
+        return {
+            name: [
+                snicaddr(
+                    socket.AF_INET,
+                    f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+                    "255.255.255.0",
+                    None,
+                    None,
+                )
+            ]
+            for index, name in enumerate(self._interfaces)
+        }
+
+    def net_if_stats(self) -> dict[str, snicstats]:
+        """Network interface stats."""
+        return {
+            name: snicstats(True, psutil.NIC_DUPLEX_FULL, 10000, 1500, "up,running")
+            for name in self._interfaces
+        }
+
+    def sensors_fans(self) -> dict[str, list[sfan]]:
+        """Fans."""
+        return self._fans
+
+    def sensors_temperatures(self, fahrenheit: bool = False) -> dict:
+        """Temperatures."""
+        return self._temperatures
+
+    @contextlib.contextmanager
+    def patch(self) -> Iterator[FakePsutil]:
+        """Replace psutil with these fakes in the psutil backend."""
+        originals: list[tuple[Any, str, Any]] = []
+
+        def replace(target: Any, name: str, value: Any) -> None:
+            originals.append((target, name, getattr(target, name)))
+            setattr(target, name, value)
+
+        try:
+            for module_name in PATCHED_MODULES:
+                module = importlib.import_module(module_name)
+                for name in list(vars(module)):
+                    if not name.startswith("_") and callable(
+                        getattr(type(self), name, None)
+                    ):
+                        replace(module, name, getattr(self, name))
+            yield self
+        finally:
+            while originals:
+                target, name, value = originals.pop()
+                setattr(target, name, value)
@@ -0,0 +1,131 @@
+"""Test backends."""
+
+import os
+import pickle
+import sys
+
+import psutil
+import pytest
+
+from systembridgedata.backend import BACKENDS, Backend, LinuxBackend, PsutilBackend
+from systembridgedata.module.processes import Processes
+from tests.fake import create_procfs
+
+# How to call each interface method, and whether to compare on a fake /proc.
+# The rest read the live host, as psutil reads some of them without /proc.
+PARITY_CALLS: dict[str, tuple[tuple, bool]] = {
+    "boot_time": ((), True),
+    "cpu_count": ((), False),
+    "cpu_freq": ((), False),
+    "cpu_percent": ((0.05,), False),
+    "cpu_stats": ((), True),
+    "cpu_times": ((), True),
+    "cpu_times_percent": ((0.05,), False),
+    "disk_io_counters": ((), True),
+    "disk_partitions": ((), True),
+    "disk_usage": (("/",), False),
+    "getloadavg": ((), False),
+    "net_connections": ((), False),
+    "net_if_addrs": ((), False),
+    "net_if_stats": ((), False),
+    "net_io_counters": ((), True),
+    "pids": ((), True),
+    "process": ((os.getpid(),), False),
+    "process_iter": ((), True),
+    "sensors_fans": ((), False),
+    "sensors_temperatures": ((), False),
+    "swap_memory": ((), False),
+    "users": ((), False),
+    "virtual_memory": ((), True),
+}
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Reads /proc")
+@pytest.mark.parametrize("name", sorted(Backend.__abstractmethods__))
+def test_backend_parity(name, tmp_path, monkeypatch):
+    """Test every interface method of the Linux backend matches psutil."""
+    args, fake = PARITY_CALLS[name]
+    procfs_path = "/proc"
+    if fake:
+        procfs_path = create_procfs(str(tmp_path), 50, mount_count=12)
+        monkeypatch.setattr(psutil, "PROCFS_PATH", procfs_path)
+        psutil.process_iter.cache_clear()
+    else:
+        # Process create times use the boot time psutil cached last, which
+        # may be a fake one
+        psutil.boot_time()
+    linux = getattr(LinuxBackend(procfs_path=procfs_path), name)(*args)
+    default = getattr(PsutilBackend(), name)(*args)
+
+    if name == "process":
+        for accessor in ("name", "create_time", "exe", "username", "status"):
+            assert getattr(linux, accessor)() == getattr(default, accessor)()
+    elif name == "process_iter":
+        assert [item.pid for item in linux] == [item.pid for item in default]
+    elif name in ("cpu_percent", "cpu_times_percent"):
+        # Sampled over separate intervals, so only the ranges can match
+        for value in (linux, default):
+            values = [value] if isinstance(value, float) else list(value)
+            assert all(0 <= item <= 100 for item in values)
+    elif name == "getloadavg":
+        # /proc/loadavg is rounded to hundredths
+        assert linux == pytest.approx(default, abs=0.05)
+    elif name == "net_connections":
+        assert sorted(linux) == sorted(default)
+    else:
+        assert linux == default
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_backend_process(name):
+    """Test each backend reads this process like psutil."""
+    if name == "linux" and sys.platform != "linux":
+        pytest.skip("Reads /proc")
+    backend = BACKENDS[name]()
+    process = backend.process(os.getpid())
+    expected = psutil.Process(os.getpid())
+    for accessor in ("name", "create_time", "exe", "username", "num_threads"):
+        assert getattr(process, accessor)() == getattr(expected, accessor)()
+    assert process.memory_info().rss > 0
+    assert process.is_running()
+    assert os.getpid() in backend.pids()
+    assert os.getpid() in [item.pid for item in backend.process_iter()]
+    with pytest.raises(psutil.NoSuchProcess):
+        backend.process(2**22 + 1)
+
+    assert backend.boot_time() == pytest.approx(psutil.boot_time(), abs=1)
+    assert len(backend.cpu_times(percpu=True)) == backend.cpu_count()
+    assert backend.virtual_memory().total == psutil.virtual_memory().total
+    assert 0 <= backend.cpu_percent(interval=0.1) <= 100
+    # Settings survive the trip to a worker process
+    assert type(pickle.loads(pickle.dumps(backend))) is type(backend)
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Reads /proc")
+def test_backend_linux_procfs(tmp_path, monkeypatch):
+    """Test the Linux backend matches psutil reading the same /proc."""
+    path = create_procfs(str(tmp_path), 50, mount_count=12)
+    monkeypatch.setattr(psutil, "PROCFS_PATH", path)
+    psutil.process_iter.cache_clear()
+    linux = LinuxBackend(procfs_path=path)
+    default = PsutilBackend()
+
+    for name in ("boot_time", "cpu_stats", "virtual_memory", "pids"):
+        assert getattr(linux, name)() == getattr(default, name)()
+    for percpu in (False, True):
+        assert linux.cpu_times(percpu=percpu) == default.cpu_times(percpu=percpu)
+    assert linux.disk_io_counters(perdisk=True) == default.disk_io_counters(
+        perdisk=True
+    )
+    for every in (False, True):
+        assert linux.disk_partitions(all=every) == default.disk_partitions(all=every)
+    assert linux.net_io_counters(pernic=True) == default.net_io_counters(pernic=True)
+    assert linux.getloadavg() == (1.0, 1.5, 2.0)
+
+    assert (
+        Processes(backend=linux).get_processes()
+        == Processes(backend=default).get_processes()
+    )
+    unpickled = pickle.loads(pickle.dumps(linux))
+    assert unpickled.procfs_path == path
+    assert unpickled.pids() == linux.pids()
@@ -0,0 +1,66 @@
+"""Test burst sampling."""
+
+import os
+import sys
+import time
+
+import pytest
+
+from systembridgedata.burst import BurstSampler
+from tests.fake import MEMORY_TOTAL_KB, create_procfs
+
+
+def _write(procfs: str, busy: int, idle: int, available_kb: int) -> None:
+    """Rewrite the CPU ticks and available memory in place."""
+    with open(os.path.join(procfs, "stat"), "w", encoding="utf-8") as file:
+        file.write(f"cpu  {busy} 0 0 {idle} 0 0 0 0 0 0\nbtime 0\n")
+    with open(os.path.join(procfs, "meminfo"), "w", encoding="utf-8") as file:
+        file.write(
+            f"MemTotal: {MEMORY_TOTAL_KB} kB\nMemFree: 0 kB\n"
+            f"MemAvailable: {available_kb} kB\n"
+        )
+
+
+def test_burst_summaries(tmp_path):
+    """Test samples are summarised per second, and kept in the buffer."""
+    procfs = create_procfs(str(tmp_path), 1)
+    sampler = BurstSampler(rate=10, buffer_seconds=1, procfs_path=procfs)
+    try:
+        _write(procfs, 0, 0, MEMORY_TOTAL_KB)
+        sampler.sample(1000.0)
+        # A spike inside the second, then idle
+        for index, (busy, idle) in enumerate(((10, 0), (10, 90), (10, 190))):
+            _write(procfs, busy, idle, MEMORY_TOTAL_KB // (index + 2))
+            sampler.sample(1000.25 + index * 0.25)
+        assert sampler.get_summaries() == []
+        sampler.sample(1001.0)
+
+        (summary,) = sampler.get_summaries()
+        assert summary.timestamp == 1000.0
+        assert summary.samples == 4
+        assert (summary.cpu_min, summary.cpu_max, summary.cpu_p99) == (0, 100, 100)
+        assert summary.memory_min == 0
+        assert summary.memory_max == pytest.approx(75)
+        assert [sample.timestamp for sample in sampler.get_samples(0.5)] == [
+            1000.5,
+            1000.75,
+            1001.0,
+        ]
+        assert len(sampler.get_samples()) == 5
+    finally:
+        sampler.close()
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Reads /proc")
+def test_burst_overhead():
+    """Test sampling the live host in the background, and its overhead."""
+    sampler = BurstSampler(rate=100)
+    sampler.start()
+    try:
+        time.sleep(0.3)
+    finally:
+        sampler.close()
+    overhead = sampler.get_overhead()
+    assert overhead.samples + overhead.missed >= 20
+    assert 0 < overhead.cpu_seconds < overhead.wall_seconds
+    assert all(0 <= sample.cpu_usage <= 100 for sample in sampler.get_samples())
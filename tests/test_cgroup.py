@@ -0,0 +1,198 @@
+"""Test cgroup."""
+
+import errno
+import logging
+import os
+from pathlib import Path
+import time
+
+import pytest
+
+from systembridgedata.module.cgroup import Cgroup, CgroupScanner
+from systembridgedata.module.cpu import CPU
+from systembridgedata.module.memory import Memory
+
+
+def _write_cgroup(
+    directory: Path,
+    cpu_max: str = "max 100000",
+    memory_max: str = "max",
+    memory_current: int = 0,
+) -> None:
+    """Write a fake cgroup directory."""
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / "cpu.max").write_text(f"{cpu_max}\n")
+    (directory / "cpu.stat").write_text(
+        "usage_usec 5000\n"
+        "user_usec 3000\n"
+        "system_usec 2000\n"
+        "nr_periods 10\n"
+        "nr_throttled 4\n"
+        "throttled_usec 1200\n"
+    )
+    (directory / "memory.max").write_text(f"{memory_max}\n")
+    (directory / "memory.current").write_text(f"{memory_current}\n")
+    (directory / "memory.stat").write_text("anon 100\ninactive_file 1024\n")
+    (directory / "io.stat").write_text(
+        "8:0 rbytes=4096 wbytes=8192 rios=1 wios=2 dbytes=0 dios=0\n"
+    )
+    (directory / "cpu.pressure").write_text(
+        "some avg10=1.50 avg60=0.75 avg300=0.25 total=123\n"
+        "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+    )
+    (directory / "memory.pressure").write_text(
+        "some avg10=0.00 avg60=0.00 avg300=0.00 total=7\n"
+    )
+
+
+def _create_tree(tmp_path: Path) -> Path:
+    """Create a fake cgroupfs with a pod and a container."""
+    root = tmp_path / "cgroup"
+    _write_cgroup(root)
+    (root / "cgroup.controllers").write_text("cpu memory io\n")
+    _write_cgroup(root / "kubepods" / "pod1", cpu_max="200000 100000")
+    _write_cgroup(
+        root / "kubepods" / "pod1" / "container",
+        cpu_max="50000 100000",
+        memory_max="4096",
+        memory_current=3072,
+    )
+    return root
+
+
+def test_cgroup_self_path(tmp_path: Path):
+    """Test resolving the current cgroup from /proc/self/cgroup."""
+    root = _create_tree(tmp_path)
+    proc_self_cgroup = tmp_path / "cgroup_self"
+    proc_self_cgroup.write_text("0::/kubepods/pod1/container\n")
+
+    cgroup = Cgroup(root=str(root), proc_self_cgroup=str(proc_self_cgroup))
+
+    assert cgroup.available
+    assert cgroup.path == "/kubepods/pod1/container"
+
+
+def test_cgroup_stats(tmp_path: Path):
+    """Test reading stats for a single cgroup."""
+    root = _create_tree(tmp_path)
+    cgroup = Cgroup(root=str(root), path="/kubepods/pod1/container")
+
+    cpu = cgroup.get_cpu()
+    assert cpu.effective_cpus == 0.5
+    assert cpu.nr_throttled == 4
+    assert cpu.throttled_usec == 1200
+
+    memory = cgroup.get_memory()
+    assert memory.limit == 4096
+    assert memory.working_set == 2048
+
+    pressure = cgroup.get_pressure("cpu")
+    assert pressure is not None
+    assert pressure.some is not None
+    assert pressure.some.avg10 == 1.5
+    assert pressure.full is not None
+    assert cgroup.get_pressure("io") is None
+
+    assert cgroup.get_io_stat()["8:0"].wbytes == 8192
+
+
+def test_cgroup_inherits_limits(tmp_path: Path):
+    """Test the tightest ancestor limit is used."""
+    root = _create_tree(tmp_path)
+    (root / "kubepods" / "pod1" / "memory.max").write_text("2048\n")
+    (root / "kubepods" / "pod1" / "cpu.max").write_text("25000 100000\n")
+    cgroup = Cgroup(root=str(root), path="/kubepods/pod1/container")
+
+    assert cgroup.get_cpu().effective_cpus == 0.25
+    assert cgroup.get_memory().limit == 2048
+
+
+def test_cgroup_cpu_usage_since(tmp_path: Path):
+    """Test cgroup CPU usage since the previous call, without blocking."""
+    root = _create_tree(tmp_path)
+    container = root / "kubepods" / "pod1" / "container"
+    cpu = CPU(cgroup=Cgroup(root=str(root), path="/kubepods/pod1/container"))
+
+    cpu.get_usage(interval=None)
+    started = time.monotonic()
+    time.sleep(0.05)
+    # 0.5 CPUs, fully used since the previous call
+    (container / "cpu.stat").write_text(
+        f"usage_usec {5000 + int((time.monotonic() - started) * 500_000)}\n"
+    )
+    assert 50 <= cpu.get_usage(interval=None) <= 100
+
+
+def test_cgroup_memory_virtual(tmp_path: Path):
+    """Test virtual memory is reported against the cgroup limit."""
+    root = _create_tree(tmp_path)
+    memory = Memory(cgroup=Cgroup(root=str(root), path="/kubepods/pod1/container"))
+
+    virtual = memory.get_virtual()
+    assert virtual.total == 4096
+    assert virtual.used == 2048
+    assert virtual.percent == 50.0
+
+
+def test_cgroup_scanner(tmp_path: Path):
+    """Test scanning a subtree reuses descriptors and drops removed cgroups."""
+    root = _create_tree(tmp_path)
+    for index in range(50):
+        _write_cgroup(root / "kubepods" / f"pod{index + 2}", memory_current=index)
+
+    with CgroupScanner(root=str(root), subtree="/kubepods") as scanner:
+        result = scanner.scan()
+        assert len(result) == 53
+        assert result["/kubepods/pod1/container"].cpu.effective_cpus == 0.5
+        assert result["/kubepods/pod10"].memory.current == 8
+        open_files = scanner.open_files
+        assert open_files > 0
+
+        scanner.scan()
+        assert scanner.open_files == open_files
+
+        for file in (root / "kubepods" / "pod2").iterdir():
+            file.unlink()
+        (root / "kubepods" / "pod2").rmdir()
+        result = scanner.scan()
+        assert "/kubepods/pod2" not in result
+        assert scanner.open_files < open_files
+
+    assert scanner.open_files == 0
+
+
+def test_cgroup_scanner_limits(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+):
+    """Test descriptors are bounded, missing files skipped and EMFILE logged."""
+    root = _create_tree(tmp_path)
+    opened: list[str] = []
+    open_file = os.open
+
+    def count_open(path: str, flags: int) -> int:
+        opened.append(os.path.basename(path))
+        return open_file(path, flags)
+
+    monkeypatch.setattr(os, "open", count_open)
+    with CgroupScanner(root=str(root), max_open_files=5) as scanner:
+        result = scanner.scan()
+        assert scanner.open_files == 5
+        assert result["/kubepods/pod1/container"].memory.current == 3072
+        assert "io.pressure" in opened
+
+        opened.clear()
+        assert scanner.scan() == result
+        assert "io.pressure" not in opened
+
+    def fail_open(path: str, flags: int) -> int:
+        raise OSError(errno.EMFILE, "Too many open files")
+
+    monkeypatch.setattr(os, "open", fail_open)
+    with caplog.at_level(logging.WARNING), CgroupScanner(root=str(root)) as scanner:
+        scanner.scan()
+    assert [record.message for record in caplog.records].count(
+        "Out of file descriptors reading cgroups, with 0 cached: "
+        "[Errno 24] Too many open files"
+    ) == 1
@@ -0,0 +1,80 @@
+"""Test codec."""
+
+import pytest
+from systembridgemodels.modules.cpu import CPUFrequency, CPUTimes, PerCPU
+from systembridgemodels.modules.disks import DiskIOCounters
+from systembridgemodels.modules.networks import NetworkStats
+from systembridgemodels.modules.processes import Process
+
+from systembridgedata.codec import Schema, SnapshotDecoder, SnapshotEncoder
+
+
+def _snapshot(tick: int) -> dict:
+    """Build a snapshot."""
+    return {
+        "cpu": {
+            "count": 2,
+            "per_cpu": [
+                PerCPU(
+                    id=index,
+                    frequency=CPUFrequency(current=3200.0) if index else None,
+                    times=CPUTimes(user=100.0 + tick, system=50.0, idle=1000.5),
+                    usage=1.5 * tick,
+                )
+                for index in range(2)
+            ],
+            "usage_per_cpu": [10.0, 20.5 + tick],
+        },
+        "disks": {
+            "sda": DiskIOCounters(
+                read_count=10 + tick,
+                write_count=20,
+                read_bytes=4096 * tick,
+                write_bytes=2**40,
+                read_time=1,
+                write_time=2,
+            )
+        },
+        "networks": {"eth0": NetworkStats(isup=True, mtu=1500, flags=["up"])},
+        "processes": [
+            Process(id=1, name="init", cpu_usage=0.0, username="root"),
+            Process(id=2, name=None, status="sleeping"),
+        ],
+        "temperatures": {"k10temp": [("Tdie", 45.0, None, None)]},
+        "version": "5.0.0",
+        "pending_reboot": None,
+    }
+
+
+def test_codec_round_trip():
+    """Test encoding and decoding a snapshot."""
+    snapshot = _snapshot(1)
+    frame = SnapshotEncoder().encode(snapshot)
+
+    assert SnapshotDecoder().decode(frame) == snapshot
+
+
+def test_codec_delta():
+    """Test delta frames decode against the previous frame."""
+    encoder = SnapshotEncoder(delta=True, key_frame_interval=3)
+    decoder = SnapshotDecoder()
+    frames = [encoder.encode(_snapshot(tick)) for tick in range(4)]
+
+    for tick, frame in enumerate(frames):
+        assert decoder.decode(frame) == _snapshot(tick)
+    assert len(frames[1]) < len(frames[0])
+    # Key frames are full frames
+    assert len(frames[3]) == len(frames[0])
+
+    with pytest.raises(ValueError):
+        SnapshotDecoder().decode(frames[2])
+
+
+def test_codec_schema():
+    """Test the schema must match on both ends."""
+    frame = SnapshotEncoder().encode(_snapshot(1))
+
+    with pytest.raises(ValueError):
+        SnapshotDecoder(Schema([Process])).decode(frame)
+    with pytest.raises(TypeError):
+        SnapshotEncoder(Schema([Process])).encode(_snapshot(1))
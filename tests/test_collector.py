@@ -0,0 +1,106 @@
+"""Test collector."""
+
+from multiprocessing.shared_memory import SharedMemory
+import time
+
+from systembridgedata.collector import (
+    MAX_STRING_LENGTH,
+    SEQUENCE,
+    SEQUENCE_OFFSET,
+    Collector,
+    CollectorData,
+    SnapshotReader,
+    SnapshotWriter,
+    encode_data,
+)
+
+
+def test_collector_snapshot():
+    """Test publishing and reading snapshots through shared memory."""
+    data = CollectorData(
+        scalars={"cpu_usage": 12.5, "memory_total": 1024},
+        per_cpu_usage=[10.0, 15.0],
+        partitions=[("/dev/sda1", "/", 100, 40, 60, 40.0)],
+        processes=[(1, 0.5, 0.25, "init")],
+        connections=[(2, 1, -1, "LISTEN", "addr(ip='0.0.0.0', port=22)", "()")],
+        sensors=[("k10temp", "Tdie", "temperature", 45.0)],
+    )
+    shared_memory = SharedMemory(create=True, size=65536)
+    try:
+        writer = SnapshotWriter(shared_memory)
+        reader = SnapshotReader(shared_memory)
+        assert reader.read() is None
+
+        assert writer.write(encode_data(data), 1.0)
+        snapshot = reader.read()
+        assert snapshot is not None
+        assert snapshot.version == 1
+        assert snapshot.data.scalars["cpu_usage"] == 12.5
+        assert snapshot.data.scalars["swap_total"] is None
+        assert snapshot.data.per_cpu_usage == data.per_cpu_usage
+        assert snapshot.data.partitions == data.partitions
+        assert snapshot.data.processes == data.processes
+        assert snapshot.data.connections == data.connections
+        assert snapshot.data.sensors == data.sensors
+
+        partial = reader.read(sections=("scalars",))
+        assert partial is not None
+        assert partial.data.processes == []
+
+        # A write in progress leaves the sequence odd
+        (sequence,) = SEQUENCE.unpack_from(shared_memory.buf, SEQUENCE_OFFSET)
+        SEQUENCE.pack_into(shared_memory.buf, SEQUENCE_OFFSET, sequence + 1)
+        # The last consistent snapshot is returned until the write is done
+        assert reader.read() == snapshot
+        assert reader.torn_reads > 0
+        assert SnapshotReader(shared_memory).read() is None
+
+        del writer, reader, snapshot, partial
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+def test_collector_long_string():
+    """Test long strings are truncated on a character boundary."""
+    name = "\u00e9" * MAX_STRING_LENGTH
+    data = CollectorData(processes=[(1, 0.0, 0.0, name)])
+    shared_memory = SharedMemory(create=True, size=1024 * 1024)
+    try:
+        writer = SnapshotWriter(shared_memory)
+        reader = SnapshotReader(shared_memory)
+        assert writer.write(encode_data(data), 1.0)
+        snapshot = reader.read()
+        assert snapshot is not None
+        (process,) = snapshot.data.processes
+        assert process[3] == name[: MAX_STRING_LENGTH // 2]
+        assert reader.torn_reads == 0
+        del writer, reader, snapshot
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+
+
+def test_collector_process():
+    """Test the collector process publishes snapshots of the host."""
+    collector = Collector(interval=0.1)
+    collector.start()
+    try:
+        assert collector.running
+        snapshot = None
+        deadline = time.monotonic() + 60
+        while snapshot is None and time.monotonic() < deadline:
+            time.sleep(0.1)
+            snapshot = collector.read()
+        assert snapshot is not None
+        assert snapshot.data.scalars["memory_total"] > 0
+        assert snapshot.data.processes
+        version = snapshot.version
+        while snapshot.version == version and time.monotonic() < deadline:
+            time.sleep(0.1)
+            snapshot = collector.read()
+        assert snapshot.version > version
+    finally:
+        collector.stop()
+    assert not collector.running
+    assert collector.read() is None
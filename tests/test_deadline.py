@@ -0,0 +1,52 @@
+"""Test deadline."""
+
+import threading
+
+from systembridgedata.deadline import DeadlineCollector
+
+
+def test_deadline_stale_values():
+    """Test slow sources return their last known value and land later."""
+    release = threading.Event()
+    calls: list[int] = []
+
+    def slow() -> int:
+        calls.append(len(calls) + 1)
+        if len(calls) > 1:
+            release.wait(5)
+        return len(calls)
+
+    async def async_source() -> str:
+        return "latest"
+
+    collector = DeadlineCollector()
+    collector.register("slow", slow)
+    collector.register("async", async_source)
+
+    results = collector.collect(deadline=2)
+    assert results["slow"].value == 1
+    assert not results["slow"].stale
+    assert results["async"].value == "latest"
+
+    # The second call hangs past the deadline
+    results = collector.collect(deadline=0.05)
+    assert results["slow"].value == 1
+    assert results["slow"].stale
+    assert results["slow"].age is not None
+    assert not results["async"].stale
+    assert collector.get_timeout_counts() == {"slow": 1, "async": 0}
+
+    # Still in flight, so no new call is started
+    collector.collect(deadline=0.05)
+    assert len(calls) == 2
+
+    # The late call lands, and the next cycle starts a new one
+    release.set()
+    while collector.get_history("slow")[1].duration is None:
+        release.wait(0.01)
+    results = collector.collect(deadline=2)
+    assert results["slow"].value == 3
+    assert not results["slow"].stale
+    history = collector.get_history("slow")
+    assert history[1].timed_out
+    assert not history[2].timed_out
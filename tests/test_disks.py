@@ -0,0 +1,108 @@
+"""Test disks."""
+
+import os
+import threading
+
+import psutil
+import pytest
+
+from systembridgedata.module.disks import (
+    BlockDevices,
+    DirectoryScanCancelledError,
+    DirectoryScanner,
+    Disks,
+)
+from tests.fake import create_procfs, create_sysfs
+
+
+def test_disks_directory_scanner(tmp_path):
+    """Test directory sizes, the largest query and the mtime cache."""
+    for name, size in (("a", 10_000), ("a/b", 50_000), ("c", 20_000)):
+        directory = tmp_path / name
+        directory.mkdir()
+        (directory / "file").write_bytes(b"x" * size)
+
+    scanner = DirectoryScanner(workers=2)
+    try:
+        sizes = scanner.scan(str(tmp_path))
+        assert sizes[str(tmp_path)].files == 3
+        assert sizes[str(tmp_path / "a")].files == 2
+        assert sizes[str(tmp_path / "a")].size >= sizes[str(tmp_path / "a/b")].size
+        assert scanner.directories_listed == 4
+
+        largest = scanner.get_largest(str(tmp_path), count=2, max_depth=1)
+        assert [item.path for item in largest] == [
+            str(tmp_path / "a"),
+            str(tmp_path / "c"),
+        ]
+        # Nothing changed, so nothing was listed again
+        assert scanner.directories_listed == 4
+        assert scanner.directories_cached == 4
+
+        (tmp_path / "c" / "more").write_bytes(b"x" * 100_000)
+        sizes = scanner.scan(str(tmp_path))
+        assert sizes[str(tmp_path / "c")].files == 2
+        assert scanner.directories_listed == 5
+
+        cancel_event = threading.Event()
+        cancel_event.set()
+        with pytest.raises(DirectoryScanCancelledError):
+            scanner.scan(str(tmp_path), cancel_event)
+    finally:
+        scanner.close()
+
+
+def test_disks_close(tmp_path):
+    """Test closing stops the directory scanner's threads."""
+    (tmp_path / "a").mkdir()
+    threads = set(threading.enumerate())
+    disks = Disks()
+    assert disks.get_largest_directories(str(tmp_path))[0].path == str(tmp_path / "a")
+    assert set(threading.enumerate()) > threads
+
+    disks.close()
+    assert set(threading.enumerate()) <= threads
+    # Scanning again starts a new scanner
+    assert disks.get_largest_directories(str(tmp_path))
+    disks.close()
+
+
+def test_disks_io_counters_per_disk_filters(tmp_path, monkeypatch):
+    """Test per disk counters are filtered by kind and rolled up by disk."""
+    procfs = create_procfs(str(tmp_path / "proc"), 1, disk_count=2)
+    sysfs = create_sysfs(str(tmp_path / "sys"), disk_count=2)
+    # A loop device, and a device mapper over the second disk's partition
+    with open(os.path.join(procfs, "diskstats"), "a", encoding="utf-8") as file:
+        file.write(" 7 0 loop0 10 0 80 1 0 0 0 0 0 1 1\n")
+        file.write(" 253 0 dm-0 10 0 80 1 0 0 0 0 0 1 1\n")
+    os.makedirs(os.path.join(sysfs, "block", "loop0"))
+    os.makedirs(os.path.join(sysfs, "block", "dm-0", "slaves", "nvme1n1p1"))
+    monkeypatch.setattr(psutil, "PROCFS_PATH", procfs)
+    block_devices = BlockDevices(sysfs)
+    disks = Disks(block_devices=block_devices)
+
+    assert len(disks.get_io_counters_per_disk()) == 6
+    assert set(disks.get_io_counters_per_disk(kinds=["disk"])) == {
+        "nvme0n1",
+        "nvme1n1",
+    }
+    assert set(disks.get_io_counters_per_disk(exclude=["loop*", "ram*"])) == {
+        "nvme0n1",
+        "nvme0n1p1",
+        "nvme1n1",
+        "nvme1n1p1",
+        "dm-0",
+    }
+    rolled_up = disks.get_io_counters_per_disk(include=["dm-*"], rollup=True)
+    assert list(rolled_up) == ["nvme1n1"]
+    assert rolled_up["nvme1n1"] == disks.get_io_counters_per_disk()["nvme1n1"]
+    assert block_devices.get()["dm-0"].disks == ("nvme1n1",)
+    assert block_devices.refreshes == 1
+
+    # Removing a device reads /sys/block again
+    with open(os.path.join(procfs, "diskstats"), encoding="utf-8") as file:
+        lines = file.readlines()
+    with open(os.path.join(procfs, "diskstats"), "w", encoding="utf-8") as file:
+        file.writelines(line for line in lines if "loop0" not in line)
+    assert len(disks.get_io_counters_per_disk(exclude=["loop*"])) == 5
+    assert block_devices.refreshes == 2
@@ -0,0 +1,68 @@
+"""Test filewatch."""
+
+import os
+import time
+
+import pytest
+
+from systembridgedata.filewatch import FileWatcher
+
+
+def _wait_for(condition) -> None:
+    """Wait for a condition, failing after a few seconds."""
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_filewatch_invalidation(tmp_path, use_inotify):
+    """Test values are cached until their files change."""
+    path = tmp_path / "reboot-required"
+    loads: list[bool] = []
+
+    def load() -> bool:
+        loads.append(path.exists())
+        return loads[-1]
+
+    watcher = FileWatcher(poll_interval=0.05, use_inotify=use_inotify)
+    try:
+        value = watcher.cached(str(path), load, cost=2)
+        # Nothing is watched until the first read
+        assert not watcher.running
+        assert value.get() is False
+        assert watcher.running
+        assert value.get() is False
+        assert len(loads) == 1
+        assert watcher.hits == 1
+
+        # Created
+        path.write_text("")
+        _wait_for(lambda: value.get() is True)
+
+        # Modified
+        path.write_text("changed")
+        os.utime(path, ns=(0, 0))
+        count = len(loads)
+        _wait_for(lambda: value.get() is True and len(loads) > count)
+
+        # Deleted
+        path.unlink()
+        _wait_for(lambda: value.get() is False)
+    finally:
+        watcher.close()
+
+
+def test_filewatch_unwatchable():
+    """Test files without change notification are never cached."""
+    loads: list[int] = []
+    watcher = FileWatcher()
+    try:
+        value = watcher.cached("/proc/self/stat", lambda: loads.append(1))
+        value.get()
+        value.get()
+        assert len(loads) == 2
+        assert watcher.syscalls_avoided <= 0
+    finally:
+        watcher.close()
@@ -0,0 +1,58 @@
+"""Test history."""
+
+from systembridgedata.history import MetricHistory
+from systembridgedata.module.memory import Memory
+
+
+def test_history_archives(tmp_path):
+    """Test samples consolidate into each archive and survive reopening."""
+    path = str(tmp_path / "history.bin")
+    now = 1_700_000_000.0
+    with MetricHistory(path, archives=[(1, 60), (10, 60)]) as history:
+        for second in range(30):
+            history.append("cpu.usage", float(second), now + second)
+
+    with MetricHistory(path, archives=[(1, 60), (10, 60)]) as history:
+        assert history.get_series() == ["cpu.usage"]
+        points = history.query("cpu.usage", now, now + 29, resolution=1)
+        assert [point.value for point in points] == [float(i) for i in range(30)]
+
+        points = history.query("cpu.usage", now, now + 29, resolution=10)
+        assert [(point.value, point.maximum) for point in points] == [
+            (4.5, 9.0),
+            (14.5, 19.0),
+            (24.5, 29.0),
+        ]
+
+        # The 1s ring only holds the last minute
+        history.append("cpu.usage", 100.0, now + 120)
+        points = history.query("cpu.usage", now, now + 120, resolution=1)
+        assert [point.timestamp for point in points] == [now + 120]
+
+    # A different layout starts over
+    with MetricHistory(path, archives=[(1, 30)]) as history:
+        assert history.get_series() == []
+
+
+def test_history_module(tmp_path):
+    """Test modules write to the history."""
+    memory = Memory()
+    with MetricHistory(str(tmp_path / "history.bin")) as history:
+        memory.history = history
+        virtual = memory.get_virtual()
+
+        points = history.query("memory.virtual.used", 0)
+        assert [point.value for point in points] == [virtual.used]
+
+
+def test_history_full(tmp_path, caplog):
+    """Test series that do not fit are dropped, warning once each."""
+    with MetricHistory(str(tmp_path / "history.bin"), max_series=2) as history:
+        for second in range(3):
+            history.append_many(
+                {f"cpu.usage.{index}": 1.0 for index in range(4)} | {"x" * 65: 1.0},
+                1_700_000_000.0 + second,
+            )
+        assert history.get_series() == ["cpu.usage.0", "cpu.usage.1"]
+    warnings = [record for record in caplog.records if record.levelname == "WARNING"]
+    assert len(warnings) == 3
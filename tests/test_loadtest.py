@@ -0,0 +1,88 @@
+"""Test the load test script."""
+
+import importlib.util
+import json
+import os
+from types import ModuleType
+
+import psutil
+import pytest
+
+SCRIPT_PATH = os.path.join(os.path.dirname(__file__), "..", "script", "loadtest.py")
+
+
+TINY_HOST = [
+    *("--cpus", "2", "--processes", "5", "--mounts", "3"),
+    *("--interfaces", "3", "--disks", "2", "--connections", "4"),
+    *("--sensors", "2", "--cycles", "2"),
+]
+
+
+def _load() -> ModuleType:
+    """Load the load test script."""
+    spec = importlib.util.spec_from_file_location("loadtest", SCRIPT_PATH)
+    assert spec is not None and spec.loader is not None
+    loadtest = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(loadtest)
+    return loadtest
+
+
+def test_loadtest_smoke(tmp_path):
+    """Test a tiny load test run reports every module."""
+    loadtest = _load()
+
+    procfs_path = psutil.PROCFS_PATH
+    output = tmp_path / "report.json"
+    loadtest.main([*TINY_HOST, "--output", str(output)])
+    assert procfs_path == psutil.PROCFS_PATH
+
+    report = json.loads(output.read_text(encoding="utf-8"))
+    assert set(report) == {
+        "version",
+        "python",
+        "psutil",
+        "cpu_count",
+        "config",
+        "cycle",
+        "modules",
+        "peak_rss_bytes",
+    }
+    assert report["config"]["processes"] == 5
+    assert set(report["cycle"]) == {"p50_ms", "p99_ms", "max_ms"}
+    assert set(report["modules"]) == {
+        "CPU",
+        "Processes",
+        "Disks",
+        "Networks",
+        "Sensors",
+    }
+    for module in report["modules"].values():
+        assert set(module) == {
+            "p50_ms",
+            "p99_ms",
+            "max_ms",
+            "allocated_blocks",
+            "allocated_bytes",
+            "peak_bytes",
+        }
+        assert module["allocated_blocks"] > 0
+
+
+def test_loadtest_failure(monkeypatch):
+    """Test a failing run still restores psutil and closes the modules."""
+    loadtest = _load()
+    closed: list[str] = []
+    for module in (loadtest.Disks, loadtest.Processes):
+        monkeypatch.setattr(
+            module, "close", lambda self: closed.append(type(self).__name__)
+        )
+
+    def fail(module: object) -> list:
+        raise RuntimeError("Getter failed")
+
+    monkeypatch.setattr(loadtest, "_getters", fail)
+    procfs_path = psutil.PROCFS_PATH
+    with pytest.raises(RuntimeError):
+        loadtest.main(TINY_HOST)
+    assert procfs_path == psutil.PROCFS_PATH
+    assert sorted(closed) == ["Disks", "Processes"]
@@ -0,0 +1,39 @@
+"""Test networks."""
+
+import re
+
+import psutil
+
+from systembridgedata.module.networks import Networks
+from tests.fake import FakePsutil, create_procfs
+
+
+def test_networks_filter_rollups(tmp_path, monkeypatch):
+    """Test interfaces are filtered and rolled up by name."""
+    monkeypatch.setattr(
+        psutil, "PROCFS_PATH", create_procfs(str(tmp_path), 1, interface_count=32)
+    )
+    with FakePsutil(interface_count=32).patch():
+        networks = Networks(
+            exclude=["docker*"],
+            rollups={"pods": ["veth*", re.compile("^cali")]},
+        )
+        assert set(networks.get_stats()) == {"lo", "eth0"}
+        assert set(networks.get_addresses()) == {"lo", "eth0"}
+        io = networks.get_io_counters_per_interface()
+        assert set(io) == {"lo", "eth0"}
+
+        rollups = networks.get_rollups()
+        assert list(rollups) == ["pods"]
+        # 30 virtual interfaces, alternating veth, cali and docker
+        assert rollups["pods"].interfaces == rollups["pods"].up == 20
+        everything = Networks().get_io_counters_per_interface()
+        assert rollups["pods"].io.bytes_recv == sum(
+            value.bytes_recv
+            for key, value in everything.items()
+            if key.startswith(("veth", "cali"))
+        )
+
+        assert set(Networks(include=["eth*"]).get_stats()) == {"eth0"}
+        assert len(Networks().get_stats()) == 32
+        assert Networks().get_rollups() == {}
@@ -0,0 +1,19 @@
+"""Test model pool."""
+
+from systembridgemodels.modules.cpu import CPUTimes
+
+from systembridgedata.pool import ModelPool
+
+
+def test_pool():
+    """Test models are handed out again until a poll does not ask for them."""
+    pool: ModelPool[int, CPUTimes] = ModelPool(lambda _: CPUTimes())
+    first = [pool.get(index) for index in range(4)]
+    assert pool.sweep() == 0
+
+    assert [pool.get(index) for index in range(2)] == first[:2]
+    assert pool.get(0) is first[0]
+    assert pool.sweep() == 2
+    assert len(pool) == 2
+    assert pool.get(3) is not first[3]
+    assert (pool.created, pool.reused) == (5, 2)
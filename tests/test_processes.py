@@ -0,0 +1,166 @@
+"""Test processes."""
+
+import psutil
+import pytest
+from systembridgemodels.modules.processes import Process
+
+from systembridgedata.codec import SnapshotDecoder, SnapshotEncoder
+from systembridgedata.module.processes import (
+    LazyProcess,
+    ProcessActivityTracker,
+    Processes,
+)
+from tests.fake import create_procfs, write_process
+
+
+def test_processes_lazy(tmp_path, monkeypatch):
+    """Test expensive fields are read on first access, once."""
+    monkeypatch.setattr(psutil, "PROCFS_PATH", create_procfs(str(tmp_path), 20))
+    processes = Processes()
+
+    items = processes.get_processes()
+    assert len(items) == 20
+    assert all(isinstance(item, LazyProcess) for item in items)
+    assert all(item.name for item in items)
+    assert processes.field_costs["name"].calls == 20
+    assert processes.field_costs["path"].calls == 0
+
+    assert items[0].path is not None
+    assert items[0].path == items[0].path
+    assert processes.field_costs["path"].calls == 1
+
+    pids = [int(item.id) for item in items[1:4]]
+    resolved = processes.resolve(["path", "username"], pids)
+    assert list(resolved) == pids
+    assert processes.field_costs["path"].calls == 4
+    assert processes.field_costs["username"].calls == 3
+
+    # Proxies encode as the model they extend
+    decoded = SnapshotDecoder().decode(SnapshotEncoder().encode(items))
+    assert {type(item) for item in decoded} == {Process}
+    assert [item.username for item in decoded] == [item.username for item in items]
+
+
+def test_processes_activity(tmp_path, monkeypatch):
+    """Test top consumers, and I/O counters only read for active processes."""
+    path = create_procfs(str(tmp_path), 5)
+    monkeypatch.setattr(psutil, "PROCFS_PATH", path)
+    write_process(path, 2, "postgres", utime=100, threads=4, fds=10)
+    tracker = ProcessActivityTracker()
+
+    tracker.sample()
+    assert tracker.io_reads == 5
+    write_process(path, 2, "postgres", utime=200, threads=8, fds=20, read_bytes=10**6)
+    tracker.sample()
+    assert tracker.io_reads == 10
+    write_process(path, 2, "postgres", utime=300, threads=8, fds=20, read_bytes=10**7)
+    tracker.sample()
+
+    # Only the busy process is read once the others have been idle for a sample
+    assert tracker.io_reads == 11
+    assert tracker.io_skipped == 4
+
+    top = tracker.get_top("read", count=2)
+    assert top[0].pid == 2
+    assert top[0].read_bytes_per_second > 0
+    assert top[0].threads == 8
+    assert top[0].fds == 20
+    assert top[1].read_bytes_per_second == 0
+    assert tracker.get_top("cpu", count=1)[0].pid == 2
+
+
+def test_processes_activity_reuse(tmp_path, monkeypatch):
+    """Test a reused pid is tracked as a new process."""
+    path = create_procfs(str(tmp_path), 5)
+    monkeypatch.setattr(psutil, "PROCFS_PATH", path)
+    write_process(path, 2, "postgres", utime=1000, start=100)
+    tracker = ProcessActivityTracker()
+
+    tracker.sample()
+    write_process(path, 2, "nginx", utime=10, start=200)
+    tracker.sample()
+
+    activity = {item.pid: item for item in tracker.get_activity()}
+    assert activity[2].name == "nginx"
+    assert activity[2].cpu_usage == 0
+
+
+def test_processes_reuse(tmp_path, monkeypatch):
+    """Test models are updated in place, and stay correct when a pid is reused."""
+    path = create_procfs(str(tmp_path), 5)
+    monkeypatch.setattr(psutil, "PROCFS_PATH", path)
+    write_process(path, 2, "postgres", start=100)
+    # Drop processes other tests left in psutil's cache
+    psutil.process_iter.cache_clear()
+    processes = Processes(reuse=True)
+
+    first = {int(item.id): item for item in processes.get_processes()}
+    assert first[2].path == "/usr/bin/postgres"
+
+    write_process(path, 2, "nginx", start=200)
+    second = {int(item.id): item for item in processes.get_processes()}
+    assert all(second[pid] is first[pid] for pid in first)
+    assert second[2].name == "nginx"
+    # Expensive fields are read again, rather than kept from the old process
+    assert second[2].path is not None
+    assert processes.field_costs["path"].calls == 2
+
+
+def test_processes_reuse_failed_read(tmp_path, monkeypatch):
+    """Test a reused model does not keep values when a read fails."""
+    monkeypatch.setattr(psutil, "PROCFS_PATH", create_procfs(str(tmp_path), 5))
+    psutil.process_iter.cache_clear()
+    processes = Processes(reuse=True)
+    first = {int(item.id): item for item in processes.get_processes()}
+    assert first[2].created is not None
+
+    cpu_percent = psutil.Process.cpu_percent
+
+    def denied(self, interval=None):
+        if self.pid == 2:
+            raise psutil.AccessDenied(self.pid)
+        return cpu_percent(self, interval)
+
+    monkeypatch.setattr(psutil.Process, "cpu_percent", denied)
+    second = {int(item.id): item for item in processes.get_processes()}
+    assert second[2] is first[2]
+    assert second[2].name is not None
+    assert (second[2].cpu_usage, second[2].created, second[2].status) == (
+        None,
+        None,
+        None,
+    )
+    assert second[3].created is not None
+    fresh = {int(item.id): item for item in Processes().get_processes()}
+    assert second[2] == fresh[2]
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_processes_sharded(tmp_path, monkeypatch, executor):
+    """Test sharded scans match the serial scan of the same processes."""
+    monkeypatch.setattr(psutil, "PROCFS_PATH", create_procfs(str(tmp_path), 100))
+    psutil.process_iter.cache_clear()
+    # psutil caches the total memory memory_percent divides by
+    monkeypatch.setattr(psutil, "_TOTAL_PHYMEM", None)
+    serial = Processes().get_processes()
+    sharded_processes = Processes(workers=2, executor=executor)
+    try:
+        sharded = sharded_processes.get_processes()
+    finally:
+        sharded_processes.close()
+
+    assert len(sharded) == len(serial) == 100
+    for item, expected in zip(
+        sorted(sharded, key=lambda item: item.id),
+        sorted(serial, key=lambda item: item.id),
+        strict=True,
+    ):
+        assert (item.id, item.name, item.created, item.status) == (
+            expected.id,
+            expected.name,
+            expected.created,
+            expected.status,
+        )
+        assert item.memory_usage == pytest.approx(expected.memory_usage)
+        assert item.path == expected.path
+        assert item.username == expected.username
@@ -0,0 +1,84 @@
+"""Test the profiler."""
+
+import threading
+import time
+
+import psutil
+
+from systembridgedata.module.processes import Processes
+from systembridgedata.profiler import OVERFLOW_STACK, Profiler
+from tests.fake import create_procfs
+
+
+def test_profiler_tags(tmp_path, monkeypatch):
+    """Test stacks are folded and tagged by the module getter running."""
+    monkeypatch.setattr(psutil, "PROCFS_PATH", create_procfs(str(tmp_path), 200))
+    psutil.process_iter.cache_clear()
+    processes = Processes()
+    stopped = threading.Event()
+
+    def collect() -> None:
+        while not stopped.is_set():
+            processes.get_processes()
+
+    thread = threading.Thread(target=collect, name="collector-processes")
+    thread.start()
+    profiler = Profiler(threads=["collector-*"])
+    try:
+        # Sample until the getter is caught, however the threads are scheduled
+        deadline = time.monotonic() + 10
+        while "Processes.get_processes" not in profiler.get_tags():
+            assert time.monotonic() < deadline
+            assert profiler.sample() == 1
+            time.sleep(0.001)
+    finally:
+        stopped.set()
+        thread.join()
+
+    samples = profiler.samples
+    assert sum(profiler.get_tags().values()) == samples
+    for stack in profiler.get_stacks("Processes.get_processes"):
+        frames = stack.split(";")
+        assert frames[0] == "Processes.get_processes"
+        assert frames[1] == "threading.py:Thread._bootstrap"
+        assert "processes.py:Processes.get_processes" in frames
+
+    path = tmp_path / "profile.folded"
+    folded = profiler.dump(str(path))
+    assert path.read_text(encoding="utf-8") == folded
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in folded.splitlines()) == samples
+
+    profiler.clear()
+    assert profiler.get_stacks() == {}
+
+
+def test_profiler_bounds():
+    """Test the stack table is bounded, and sampling keeps under its cap."""
+    stopped = threading.Event()
+    threads = [
+        threading.Thread(target=stopped.wait, name=f"worker-{index}")
+        for index in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    profiler = Profiler(interval=0.001, max_overhead=5, max_stacks=1, max_depth=2)
+    try:
+        profiler.sample()
+        profiler.start()
+        time.sleep(0.3)
+        profiler.stop()
+    finally:
+        stopped.set()
+        for thread in threads:
+            thread.join()
+
+    stacks = profiler.get_stacks()
+    assert len(stacks) == 2
+    assert f"-;{OVERFLOW_STACK[0]}" in stacks
+    assert profiler.dropped > 0
+    assert all(len(stack.split(";")) <= 3 for stack in stacks)
+
+    overhead = profiler.get_overhead()
+    assert overhead.samples > 1
+    assert overhead.interval >= 0.001
+    assert 0 < overhead.cpu_seconds < overhead.wall_seconds
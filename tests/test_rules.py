@@ -0,0 +1,105 @@
+"""Test rules."""
+
+import pytest
+
+from systembridgedata.collector import CollectorData
+from systembridgedata.rules import Rule, RuleEngine, get_metrics
+
+
+def test_rules_duration_hysteresis():
+    """Test rules fire after their duration, and resolve past hysteresis."""
+    engine = RuleEngine(
+        [
+            Rule.parse("core_hot", "any cpu_usage.* > 95 for 30s hysteresis 10"),
+            Rule.parse("nginx_missing", "process_count.nginx < 1 default 0"),
+            Rule.parse("memory_full", "memory_percent >= 90"),
+        ]
+    )
+
+    data = CollectorData(
+        scalars={"memory_percent": 50.0},
+        per_cpu_usage=[10.0, 99.0],
+        processes=[(1, 0.0, 0.0, "nginx")],
+    )
+    assert engine.evaluate_data(data, 0.0) == []
+    assert engine.evaluated == 3
+    # Nothing changed, and no duration ran out, so nothing is evaluated
+    assert engine.evaluate_data(data, 10.0) == []
+    assert engine.evaluated == 3
+
+    (event,) = engine.evaluate_data(data, 30.0)
+    assert (event.rule, event.state, event.value) == ("core_hot", "firing", 99.0)
+    # Inside the hysteresis band, so still firing
+    data.per_cpu_usage = [10.0, 90.0]
+    assert engine.evaluate_data(data, 31.0) == []
+    data.per_cpu_usage = [10.0, 80.0]
+    (event,) = engine.evaluate_data(data, 32.0)
+    assert (event.rule, event.state) == ("core_hot", "resolved")
+
+    # A missing process takes the default count
+    data.processes = []
+    data.scalars["memory_percent"] = 95.0
+    events = engine.evaluate_data(data, 33.0)
+    assert {(event.rule, event.state) for event in events} == {
+        ("nginx_missing", "firing"),
+        ("memory_full", "firing"),
+    }
+    assert sorted(engine.get_firing()) == ["memory_full", "nginx_missing"]
+
+    # Dropping below the threshold before the duration resets it
+    data.per_cpu_usage = [99.0, 80.0]
+    engine.evaluate_data(data, 40.0)
+    data.per_cpu_usage = [10.0, 80.0]
+    engine.evaluate_data(data, 50.0)
+    data.per_cpu_usage = [99.0, 80.0]
+    assert engine.evaluate_data(data, 71.0) == []
+
+
+def test_rules_default_absent():
+    """Test rules with a default fire when their metrics never appear."""
+    engine = RuleEngine(
+        [
+            Rule.parse("nginx_missing", "process_count.nginx < 1 default 0"),
+            Rule.parse("no_java", "all process_count.java* < 1 for 10s default 0"),
+            Rule.parse("hot", "any sensor.temperature.* > 90"),
+        ]
+    )
+    data = CollectorData(scalars={"memory_percent": 50.0})
+    (event,) = engine.evaluate_data(data, 0.0)
+    assert (event.rule, event.state, event.value) == ("nginx_missing", "firing", 0)
+    assert engine.evaluate_data(data, 5.0) == []
+    (event,) = engine.evaluate_data(data, 10.0)
+    assert (event.rule, event.state) == ("no_java", "firing")
+    assert sorted(engine.get_firing()) == ["nginx_missing", "no_java"]
+
+    data.processes = [(1, 0.0, 0.0, "nginx"), (2, 0.0, 0.0, "java")]
+    assert len(engine.evaluate_data(data, 11.0)) == 2
+    assert engine.get_firing() == []
+    # Going away again falls back to the default
+    data.processes = []
+    assert len(engine.evaluate_data(data, 12.0)) == 1
+    assert engine.get_firing() == ["nginx_missing"]
+
+
+def test_rules_metrics():
+    """Test collected data flattens into named metrics."""
+    metrics = get_metrics(
+        CollectorData(
+            scalars={"cpu_usage": 5.0, "cpu_frequency": None},
+            partitions=[("/dev/sda1", "/", 100, 90, 10, 90.0)],
+            processes=[(1, 1.0, 2.0, "java"), (2, 3.0, 4.0, "java")],
+            sensors=[("coretemp", "Package id 0", "temperature", 80.0)],
+        )
+    )
+    assert metrics == {
+        "cpu_usage": 5.0,
+        "partition_percent./": 90.0,
+        "process_count.java": 2,
+        "process_cpu_usage.java": 4.0,
+        "process_memory_usage.java": 6.0,
+        "sensor.temperature.coretemp.Package id 0": 80.0,
+    }
+    rule = Rule.parse("hot", "sensor.temperature.coretemp.Package id 0 > 85")
+    assert rule.metric == "sensor.temperature.coretemp.Package id 0"
+    with pytest.raises(ValueError):
+        Rule.parse("bad", "cpu_usage is high")
@@ -0,0 +1,67 @@
+"""Test snapshots."""
+
+import sys
+import time
+
+import pytest
+
+from systembridgedata.snapshot import SnapshotCollector, get_default_sources
+
+
+def test_snapshot_concurrent_sources():
+    """Test independent sources run together, and dependent ones after."""
+    order: list[str] = []
+
+    def slow(name: str):
+        def source() -> str:
+            time.sleep(0.2)
+            order.append(name)
+            return name
+
+        return source
+
+    def failing() -> None:
+        raise ValueError("Unavailable")
+
+    collector = SnapshotCollector({"first": slow("first"), "second": slow("second")})
+    collector.register("after", order.copy, after=["first", "second"])
+    collector.register("failing", failing)
+    with pytest.raises(ValueError):
+        collector.register("orphan", failing, after=["missing"])
+    # Waiting on a source that waits on it would never finish
+    with pytest.raises(ValueError):
+        collector.register("first", failing, after=["after"])
+    with pytest.raises(ValueError):
+        collector.register("failing", failing, after=["failing"])
+    try:
+        snapshot = collector.collect()
+        assert snapshot.duration < 0.35
+        assert sorted(snapshot.get_value("after")) == ["first", "second"]
+        assert snapshot.sources["first"].duration >= 0.2
+        assert snapshot.sources["failing"].error == "ValueError('Unavailable')"
+        assert snapshot.get_value("failing") is None
+        assert snapshot.window < 0.35
+
+        later = collector.collect()
+        elapsed = later.elapsed(snapshot, "first")
+        assert elapsed is not None and elapsed >= 0.2
+        assert later.elapsed(snapshot, "missing") is None
+    finally:
+        collector.close()
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="Reads /proc")
+def test_snapshot_default_sources():
+    """Test the default sources are timed and their I/O syscalls counted."""
+    collector = SnapshotCollector(get_default_sources())
+    try:
+        snapshot = collector.collect()
+    finally:
+        collector.close()
+    assert set(snapshot.sources) == {"cpu", "disks", "memory", "networks"}
+    for source in snapshot.sources.values():
+        assert source.error is None
+        assert source.value is not None
+        assert snapshot.monotonic <= source.monotonic
+        assert source.wall == pytest.approx(time.time(), abs=5)
+    assert snapshot.sources["memory"].io_syscalls >= 1
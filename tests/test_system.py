@@ -0,0 +1,75 @@
+"""Test system."""
+
+from collections import namedtuple
+import logging
+import sys
+import time
+
+import pytest
+
+from systembridgedata.backend import PsutilBackend
+from systembridgedata.filewatch import FileWatcher
+from systembridgedata.module import system as system_module
+from systembridgedata.module.system import System
+
+suser = namedtuple("suser", ["name", "terminal", "host", "started", "pid"])
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="utmp is watched on Linux")
+def test_system_users(tmp_path, monkeypatch):
+    """Test users are cached until utmp changes, and the changes API."""
+    utmp = tmp_path / "utmp"
+    utmp.write_bytes(b"")
+    sessions = [suser("alice", "pts/0", "10.0.0.1", 1.0, 100)]
+    calls: list[int] = []
+
+    def users() -> list:
+        calls.append(1)
+        return list(sessions)
+
+    monkeypatch.setattr(system_module, "UTMP_PATH", str(utmp))
+    backend = PsutilBackend()
+    monkeypatch.setattr(backend, "users", users)
+    watcher = FileWatcher()
+    try:
+        system = System(watcher, backend=backend)
+        first = system.get_users()
+        assert [user.name for user in first] == ["alice"]
+        system.get_users()
+        assert len(calls) == 1
+
+        sessions.append(suser("bob", "pts/1", "10.0.0.2", 2.0, 200))
+        del sessions[0]
+        utmp.write_bytes(b"\0")
+        deadline = time.monotonic() + 5
+        while len(calls) == 1:
+            assert time.monotonic() < deadline
+            system.get_users()
+            time.sleep(0.01)
+
+        changes = system.get_users_changes(first)
+        assert [user.name for user in changes.logged_in] == ["bob"]
+        assert [user.name for user in changes.logged_out] == ["alice"]
+        assert system.get_users_changes(system.get_users()).logged_in == []
+    finally:
+        watcher.close()
+
+
+def test_system_version_lazy(tmp_path, monkeypatch, caplog):
+    """Test the standalone version file is first read on use, not on creation."""
+    (tmp_path / "systembridge-version.txt").write_text("4.1.0\n")
+    monkeypatch.setattr(sys, "executable", "/opt/systembridge/systembridge")
+    monkeypatch.setattr(system_module, "get_user_data_directory", lambda: str(tmp_path))
+    watcher = FileWatcher()
+    try:
+        with caplog.at_level(logging.INFO):
+            system = System(watcher)
+        assert not watcher.running
+        assert "Version: 4.1.0" not in caplog.messages
+
+        system._version_latest = "4.2.0"  # pylint: disable=protected-access
+        with caplog.at_level(logging.INFO):
+            assert system.get_version_newer_available()
+        assert "Version: 4.1.0" in caplog.messages
+    finally:
+        watcher.close()
@@ -0,0 +1,69 @@
+"""Test trace."""
+
+import pickle
+
+import pytest
+
+from systembridgedata.backend import BACKENDS
+from systembridgedata.module.cpu import CPU
+from systembridgedata.module.memory import Memory
+from systembridgedata.module.processes import Processes
+from systembridgedata.trace import TraceExhaustedError, TraceRecorder, TraceReplayer
+
+
+def _collect(cpu: CPU, memory: Memory, processes: Processes) -> tuple:
+    """Collect from the modules, reading one lazy field."""
+    items = processes.get_processes()
+    return (
+        cpu.get_times(),
+        cpu.get_times_per_cpu(),
+        memory.get_virtual(),
+        [(item.id, item.name, item.created) for item in items],
+        items[0].path,
+    )
+
+
+@pytest.mark.parametrize("name", list(BACKENDS))
+def test_trace_record_replay(name, tmp_path):
+    """Test a recorded trace of each backend replays the same module output."""
+    path = str(tmp_path / "trace.gz")
+
+    with TraceRecorder(path, BACKENDS[name]()) as recorder:
+        processes = Processes(backend=recorder)
+        recorded = _collect(CPU(backend=recorder), Memory(backend=recorder), processes)
+    # Only the lazy field that was read is recorded
+    assert processes.field_costs["path"].calls == 1
+    assert processes.field_costs["username"].calls == 0
+
+    with TraceReplayer(path, speed=None) as replayer:
+        memory = Memory(backend=replayer)
+        assert _collect(CPU(backend=replayer), memory, Processes(backend=replayer)) == (
+            recorded
+        )
+        assert replayer.replayed == recorder.records
+        with pytest.raises(TraceExhaustedError):
+            memory.get_virtual()
+
+    with TraceReplayer(path, speed=None, loop=True) as replayer:
+        memory = Memory(backend=replayer)
+        assert memory.get_virtual() == recorded[2]
+        assert memory.get_virtual() == recorded[2]
+
+
+def test_trace_sharded(tmp_path):
+    """Test processes scanned in thread shards are recorded and replayed."""
+    path = str(tmp_path / "trace.gz")
+
+    with TraceRecorder(path) as recorder:
+        processes = Processes(workers=2, executor="thread", backend=recorder)
+        recorded = [(item.id, item.name) for item in processes.get_processes()]
+        processes.close()
+
+    with TraceReplayer(path, speed=None) as replayer:
+        processes = Processes(workers=2, executor="thread", backend=replayer)
+        assert [(item.id, item.name) for item in processes.get_processes()] == recorded
+        processes.close()
+
+    # Worker processes would not share the trace
+    with pytest.raises(TypeError):
+        pickle.dumps(replayer)